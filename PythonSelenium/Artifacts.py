@@ -0,0 +1,208 @@
+import base64
+import gzip
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.webdriver.remote.command import Command
+
+import Browser
+
+#screenshots and DOM dumps of what the browser showed when a flow failed (and every N steps if asked)
+#the Runner captures every browser of a failed flow; a plain script does it with ARTIFACTS=1
+#ARTIFACTS=1        -> Browser.get_driver() attaches the collector, a script that dies captures its browsers
+#ARTIFACTS_EVERY=N  -> also a capture after every Nth step (click, send_keys, get, clear, execute_script)
+#ARTIFACTS_MB       -> disk budget of one run folder (default 50), the oldest captures are evicted first
+#  reports/artifacts/<run>/<flow>-<pid>-<n>-<reason>.{jpg|png,html.gz,json}
+#only the screenshot and page source commands run on the flow's thread; decoding, gzip and writing the
+#files happen on a small thread pool. Chrome is asked for a JPEG through CDP, which is cheaper to encode
+#than the PNG of the WebDriver screenshot command
+ENABLED = os.environ.get("ARTIFACTS") == "1"
+EVERY = int(os.environ.get("ARTIFACTS_EVERY", "0"))
+MAX_BYTES = int(float(os.environ.get("ARTIFACTS_MB", "50")) * 2 ** 20)
+WORKERS = 2
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports", "artifacts")
+STEPS = {Command.GET, Command.CLICK_ELEMENT, Command.SEND_KEYS_TO_ELEMENT, Command.CLEAR_ELEMENT,
+         Command.W3C_EXECUTE_SCRIPT}
+JPEG_QUALITY = 70
+#the files of one capture; flow names have dots of their own (practice.yaml), so only these are cut off
+EXTENSIONS = (".html.gz", ".json", ".jpg", ".png")
+
+
+def run_folder():
+    #one folder per run; the Runner sets ARTIFACTS_RUN so all its workers share it (and its budget)
+    run = os.environ.get("ARTIFACTS_RUN") or time.strftime("%Y%m%d-%H%M%S-") + str(os.getpid())
+    return os.path.join(ROOT, run)
+
+
+def _screenshot(driver):
+    #(extension, base64 data)
+    execute_cdp_cmd = getattr(driver, "execute_cdp_cmd", None)
+    if execute_cdp_cmd is not None:
+        try:
+            return "jpg", execute_cdp_cmd("Page.captureScreenshot", {"format": "jpeg", "quality": JPEG_QUALITY})["data"]
+        except Exception:
+            pass
+    return "png", driver.get_screenshot_as_base64()
+
+
+def _stem(name):
+    for extension in EXTENSIONS:
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+
+class Collector:
+    def __init__(self, folder=None, max_bytes=MAX_BYTES, every=EVERY, workers=WORKERS):
+        self.folder = folder or run_folder()
+        self.max_bytes = max_bytes
+        self.every = every
+        self.label = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+        self.written = []
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="artifacts")
+        self._pending = []
+        self._numbers = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def capture(self, driver, reason, label=None):
+        #reads the browser state now, writes it later; returns the future of the written paths
+        stem = "%s-%d-%03d-%s" % (label or self.label, os.getpid(), next(self._numbers), reason)
+        meta = {"reason": reason, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "session": driver.session_id}
+        screenshot = source = None
+        try:
+            meta["url"] = driver.current_url
+            screenshot = _screenshot(driver)
+            source = driver.page_source
+        except Exception as e:
+            #a dead browser still gets its meta file
+            meta["error"] = "%s: %s" % (type(e).__name__, e)
+        future = self._pool.submit(self._write, stem, meta, screenshot, source)
+        with self._lock:
+            self._pending.append(future)
+        return future
+
+    def _write(self, stem, meta, screenshot, source):
+        os.makedirs(self.folder, exist_ok=True)
+        base = os.path.join(self.folder, stem)
+        paths = []
+        if screenshot:
+            extension, data = screenshot
+            paths.append(_write(base + "." + extension, base64.b64decode(data)))
+        if source is not None:
+            paths.append(_write(base + ".html.gz", gzip.compress(source.encode("utf-8"), 6)))
+        paths.append(_write(base + ".json", json.dumps(meta, indent=2).encode("utf-8")))
+        with self._lock:
+            self.written.extend(paths)
+        self.evict()
+        return paths
+
+    def _captures(self):
+        #stem -> (newest mtime, total size, paths)
+        captures = {}
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = captures.setdefault(_stem(name), [0, 0, []])
+            entry[0] = max(entry[0], stat.st_mtime)
+            entry[1] += stat.st_size
+            entry[2].append(path)
+        return captures
+
+    def evict(self):
+        #whole captures, oldest first; the folder is shared by the Runner workers, so it is listed every time
+        with self._lock:
+            captures = sorted(self._captures().values())
+            total = sum(size for _, size, _ in captures)
+            for _, size, paths in captures:
+                if total <= self.max_bytes:
+                    break
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                print("could not write artifact:", e)
+
+    def drain(self):
+        #waits for the pending writes; the paths written since the last drain that are still on disk
+        self.flush()
+        with self._lock:
+            written, self.written = self.written, []
+        return [path for path in written if os.path.exists(path)]
+
+    def listener(self, driver):
+        counter = itertools.count(1)
+
+        def on_command(command, params, seconds, error):
+            if error is None and command in STEPS and next(counter) % self.every == 0:
+                self.capture(driver, "step")
+        return on_command
+
+    def attach(self, driver):
+        if self.every > 0:
+            Browser.on_command(driver, self.listener(driver))
+        return driver
+
+    def close(self):
+        self.flush()
+        self._pool.shutdown()
+
+
+collector = None
+
+
+def shared_collector():
+    global collector
+    if collector is None:
+        collector = Collector()
+    return collector
+
+
+def attach(driver):
+    return shared_collector().attach(driver)
+
+
+def failure(label=None):
+    #captures every browser the current flow still has open
+    for driver in Browser.live():
+        try:
+            shared_collector().capture(driver, "failure", label)
+        except Exception as e:
+            print("could not capture artifacts:", e)
+
+
+def _write(path, data):
+    with open(path, "wb") as writer:
+        writer.write(data)
+    return path
+
+
+def _excepthook(kind, value, trace):
+    if not issubclass(kind, KeyboardInterrupt):
+        failure()
+        paths = collector.drain() if collector else []
+        if paths:
+            print("artifacts:", os.path.dirname(paths[0]), file=sys.stderr)
+    _previous_excepthook(kind, value, trace)
+
+
+if ENABLED:
+    _previous_excepthook = sys.excepthook
+    sys.excepthook = _excepthook
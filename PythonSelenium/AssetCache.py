@@ -0,0 +1,347 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+#disk cache for the static assets (css, js, images, fonts) of the pages the scripts load again and
+#again, served to Chrome through CDP request interception (Fetch domain)
+#ASSET_CACHE=1 -> Browser.new_driver() attaches the cache to every Chrome it starts
+#ASSET_CACHE_MB     -> size budget, least recently used entries are evicted first (default 200)
+#ASSET_CACHE_TRUST  -> seconds an entry is served without asking the server (default 3600); after that
+#                      the request goes out with If-None-Match/If-Modified-Since and a 304 is answered
+#                      from the cache
+#entries are keyed by URL + ETag, one file pair per entry so parallel Runner workers can share the folder
+#each process keeps an index of the entries (size, last use) and a running total in memory; the folder
+#is only scanned again when that total passes the budget, then trimmed to LOW_WATER of it
+ENABLED = os.environ.get("ASSET_CACHE") == "1"
+FOLDER = os.environ.get("ASSET_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".asset-cache")
+MAX_BYTES = int(float(os.environ.get("ASSET_CACHE_MB", "200")) * 2 ** 20)
+TRUST = float(os.environ.get("ASSET_CACHE_TRUST", "3600"))
+LOW_WATER = 0.9
+RESOURCE_TYPES = ("STYLESHEET", "SCRIPT", "IMAGE", "FONT")
+#headers that describe the transfer, not the content; the cached body is stored decoded
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _max_age(headers):
+    control = (_header(headers, "cache-control") or "").lower()
+    match = re.search(r"max-age=(\d+)", control)
+    return int(match.group(1)) if match else 0
+
+
+def cacheable(method, status, headers, size, max_bytes=MAX_BYTES):
+    control = (_header(headers, "cache-control") or "").lower()
+    if method != "GET" or status != 200 or "no-store" in control or size > max_bytes // 10:
+        return False
+    return bool(_header(headers, "etag") or _header(headers, "last-modified") or _max_age(headers))
+
+
+class DiskCache:
+    def __init__(self, folder=FOLDER, max_bytes=MAX_BYTES, trust=TRUST):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.trust = trust
+        self._lock = threading.Lock()
+        self._stats = self._empty_stats()
+        #url -> [last used, size, body file], loaded from the folder on first use
+        self._index = None
+        self._total = 0
+        self._index_lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _empty_stats(self):
+        return {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0,
+                "bytes_served": 0, "bytes_stored": 0}
+
+    def _count(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                self._stats[name] += value
+
+    def _meta_path(self, url):
+        return os.path.join(self.folder, _hash(url) + ".json")
+
+    def lookup(self, url):
+        try:
+            with open(self._meta_path(url)) as reader:
+                entry = json.load(reader)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(os.path.join(self.folder, entry["body"])):
+            return None
+        return entry
+
+    def fresh(self, entry):
+        return time.time() - entry["stored"] < max(entry["max_age"], self.trust)
+
+    def read(self, entry, revalidated=False):
+        with open(os.path.join(self.folder, entry["body"]), "rb") as reader:
+            data = reader.read()
+        #the meta file's mtime is the "last used" time for LRU eviction
+        os.utime(self._meta_path(entry["url"]))
+        self._note(entry)
+        if revalidated:
+            entry["stored"] = time.time()
+            self._write_meta(entry)
+            self._count(revalidated=1, bytes_served=len(data))
+        else:
+            self._count(hits=1, bytes_served=len(data))
+        return data
+
+    def miss(self):
+        self._count(misses=1)
+
+    def store(self, url, status, headers, data):
+        headers = [[name, value] for name, value in headers if name.lower() not in DROPPED_HEADERS]
+        etag = _header(headers, "etag") or ""
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": _header(headers, "last-modified"),
+            "status": status,
+            "headers": headers,
+            "max_age": _max_age(headers),
+            "stored": time.time(),
+            "size": len(data),
+            "body": "%s-%s.body" % (_hash(url)[:32], _hash(etag)[:16]),
+        }
+        old = self.lookup(url)
+        temporary = os.path.join(self.folder, "%s.%d.tmp" % (entry["body"], os.getpid()))
+        with open(temporary, "wb") as writer:
+            writer.write(data)
+        os.replace(temporary, os.path.join(self.folder, entry["body"]))
+        self._write_meta(entry)
+        if old and old["body"] != entry["body"]:
+            _remove(os.path.join(self.folder, old["body"]))
+        self._note(entry)
+        self._count(stored=1, bytes_stored=len(data))
+        self.evict()
+        return entry
+
+    def _note(self, entry):
+        with self._index_lock:
+            if self._index is None:
+                self._load_index()
+            old = self._index.get(entry["url"])
+            self._total += entry["size"] - (old[1] if old else 0)
+            self._index[entry["url"]] = [time.time(), entry["size"], entry["body"]]
+
+    def _load_index(self):
+        #caller holds _index_lock; the one place the meta files are all read
+        self._index = {entry["url"]: [used, entry["size"], entry["body"]] for used, entry in self._entries()}
+        self._total = sum(size for _, size, _ in self._index.values())
+
+    def _write_meta(self, entry):
+        path = self._meta_path(entry["url"])
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, "w") as writer:
+            json.dump(entry, writer)
+        os.replace(temporary, path)
+
+    def size(self):
+        return sum(entry["size"] for _, entry in self._entries())
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                with open(path) as reader:
+                    entries.append((os.path.getmtime(path), json.load(reader)))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def evict(self):
+        with self._index_lock:
+            if self._index is None:
+                self._load_index()
+            if self._total <= self.max_bytes:
+                return
+            #other workers store into the folder too, their entries count from this scan on
+            self._load_index()
+            for url, (used, size, body) in sorted(self._index.items(), key=lambda item: item[1][0]):
+                if self._total <= self.max_bytes * LOW_WATER:
+                    break
+                _remove(self._meta_path(url))
+                _remove(os.path.join(self.folder, body))
+                del self._index[url]
+                self._total -= size
+                self._count(evicted=1)
+
+    def clear(self):
+        with self._index_lock:
+            for name in os.listdir(self.folder):
+                _remove(os.path.join(self.folder, name))
+            self._index = {}
+            self._total = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        looked_up = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["revalidated"]) / looked_up, 3) if looked_up else None
+        return stats
+
+    def drain_stats(self):
+        stats = self.stats()
+        with self._lock:
+            self._stats = self._empty_stats()
+        return stats
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Interceptor:
+    #one CDP connection per browser in a background thread (selenium's CDP client runs on trio)
+    def __init__(self, driver, cache):
+        self.driver = driver
+        self.cache = cache
+        self.error = None
+        self._ready = threading.Event()
+        self._token = None
+        self._scope = None
+        self._thread = threading.Thread(target=self._main, daemon=True)
+
+    def start(self, timeout=10):
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self.error:
+            raise self.error
+        return self
+
+    def stop(self):
+        import trio
+        if self._token and self._scope:
+            try:
+                trio.from_thread.run_sync(self._scope.cancel, trio_token=self._token)
+            except trio.RunFinishedError:
+                pass
+        self._thread.join(5)
+
+    def _main(self):
+        import trio
+        try:
+            trio.run(self._serve)
+        except Exception as e:
+            #the browser went away (quit) or CDP is not available
+            self.error = e
+        finally:
+            self._ready.set()
+
+    async def _serve(self):
+        import trio
+        async with self.driver.bidi_connection() as connection:
+            session, devtools = connection.session, connection.devtools
+            fetch = devtools.fetch
+            patterns = [fetch.RequestPattern(url_pattern="http*", request_stage=fetch.RequestStage.REQUEST,
+                                             resource_type=getattr(devtools.network.ResourceType, name))
+                        for name in RESOURCE_TYPES]
+            await session.execute(fetch.enable(patterns=patterns))
+            self._token = trio.lowlevel.current_trio_token()
+            async with trio.open_nursery() as nursery:
+                self._scope = nursery.cancel_scope
+                self._ready.set()
+                async for event in session.listen(fetch.RequestPaused, buffer_size=256):
+                    nursery.start_soon(self._handle, session, fetch, event)
+
+    async def _handle(self, session, fetch, event):
+        try:
+            if event.response_status_code is None and event.response_error_reason is None:
+                await self._request(session, fetch, event)
+            else:
+                await self._response(session, fetch, event)
+        except Exception:
+            #never leave the browser waiting for a paused request
+            try:
+                await session.execute(fetch.continue_request(request_id=event.request_id))
+            except Exception:
+                pass
+
+    async def _request(self, session, fetch, event):
+        request = event.request
+        entry = self.cache.lookup(request.url) if request.method == "GET" else None
+        if entry and self.cache.fresh(entry):
+            await self._fulfill(session, fetch, event, entry, self.cache.read(entry))
+            return
+        headers = None
+        if entry:
+            #stale: let the server confirm the cached copy with a 304
+            headers = [fetch.HeaderEntry(name=name, value=value) for name, value in dict(request.headers).items()]
+            if entry["etag"]:
+                headers.append(fetch.HeaderEntry(name="If-None-Match", value=entry["etag"]))
+            if entry["last_modified"]:
+                headers.append(fetch.HeaderEntry(name="If-Modified-Since", value=entry["last_modified"]))
+        await session.execute(fetch.continue_request(request_id=event.request_id, headers=headers,
+                                                     intercept_response=True))
+
+    async def _response(self, session, fetch, event):
+        request = event.request
+        headers = [(h.name, h.value) for h in event.response_headers or []]
+        entry = self.cache.lookup(request.url)
+        if event.response_status_code == 304 and entry:
+            await self._fulfill(session, fetch, event, entry, self.cache.read(entry, revalidated=True))
+            return
+        self.cache.miss()
+        length = _header(headers, "content-length")
+        if not cacheable(request.method, event.response_status_code, headers,
+                         int(length) if length and length.isdigit() else 0, self.cache.max_bytes):
+            await session.execute(fetch.continue_request(request_id=event.request_id))
+            return
+        body, encoded = await session.execute(fetch.get_response_body(request_id=event.request_id))
+        data = base64.b64decode(body) if encoded else body.encode("utf-8")
+        if cacheable(request.method, event.response_status_code, headers, len(data), self.cache.max_bytes):
+            entry = self.cache.store(request.url, event.response_status_code, headers, data)
+            await self._fulfill(session, fetch, event, entry, data)
+        else:
+            await session.execute(fetch.continue_request(request_id=event.request_id))
+
+    async def _fulfill(self, session, fetch, event, entry, data):
+        await session.execute(fetch.fulfill_request(
+            request_id=event.request_id,
+            response_code=entry["status"],
+            response_headers=[fetch.HeaderEntry(name=name, value=value) for name, value in entry["headers"]],
+            body=base64.b64encode(data).decode("ascii"),
+        ))
+
+
+cache = None
+
+
+def shared_cache():
+    global cache
+    if cache is None:
+        cache = DiskCache()
+    return cache
+
+
+def attach(driver):
+    #returns the running Interceptor, or None where the driver has no CDP (other browsers, the mock)
+    try:
+        interceptor = Interceptor(driver, shared_cache()).start()
+    except Exception as e:
+        print("asset cache not available:", e)
+        return None
+    driver._asset_cache = interceptor
+    return interceptor
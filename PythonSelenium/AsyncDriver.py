@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import json
+import shutil
+import socket
+import sys
+import time
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import (ElementClickInterceptedException, ElementNotInteractableException,
+                                        InvalidSelectorException, JavascriptException, NoSuchElementException,
+                                        NoSuchWindowException, StaleElementReferenceException, TimeoutException,
+                                        WebDriverException)
+from selenium.webdriver.common.by import By
+
+import Browser
+from PageObjects import ClientLoginPage, ForgotPasswordPage
+
+#asyncio WebDriver client: speaks the W3C WebDriver HTTP protocol directly over a pool of keep-alive
+#connections, so one python process can drive dozens of browser sessions at the same time
+#
+#  async with ChromeDriverService() as url:
+#      http = HttpPool(url)
+#      driver = await AsyncDriver.start(http)
+#      await driver.get("https://rahulshettyacademy.com/client")
+#      await (await driver.find_element(By.LINK_TEXT, "Forgot password?")).click()
+#      await driver.quit()
+#
+#  python AsyncDriver.py -n 20    -> 20 forgot-password flows (LocatorsExtension.py) at once
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+ERRORS = {
+    "no such element": NoSuchElementException,
+    "stale element reference": StaleElementReferenceException,
+    "element click intercepted": ElementClickInterceptedException,
+    "element not interactable": ElementNotInteractableException,
+    "invalid selector": InvalidSelectorException,
+    "javascript error": JavascriptException,
+    "no such window": NoSuchWindowException,
+    "timeout": TimeoutException,
+    "script timeout": TimeoutException,
+}
+
+
+class HttpPool:
+    #minimal HTTP/1.1 client for JSON requests with a bounded pool of keep-alive connections
+    def __init__(self, base_url, size=64, timeout=120):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        #seconds one request (connect, send, whole response) may take, like selenium's own client
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def request(self, method, path, body=None):
+        if body is None and method == "POST":
+            #W3C commands like click still need a JSON object as body
+            body = {}
+        data = b"" if body is None else json.dumps(body).encode()
+        async with self._slots:
+            reused = bool(self._idle)
+            connection = self._idle.pop() if reused else await self._connect()
+            try:
+                try:
+                    status, keep_alive, payload = await self._send(connection, method, path, data)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if not reused:
+                        raise
+                    #the server closed an idle connection, try once more on a new one
+                    connection[1].close()
+                    connection = await self._connect()
+                    status, keep_alive, payload = await self._send(connection, method, path, data)
+            except BaseException:
+                #timeouts, cancellation, a failed retry: a half-read connection is never reused
+                connection[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+        return status, json.loads(payload) if payload else None
+
+    async def _connect(self):
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+
+    async def _send(self, connection, method, path, data):
+        return await asyncio.wait_for(self._exchange(connection, method, path, data), self.timeout)
+
+    async def _exchange(self, connection, method, path, data):
+        reader, writer = connection
+        head = "%s %s%s HTTP/1.1\r\nHost: %s:%d\r\nContent-Type: application/json;charset=UTF-8\r\n" \
+               "Content-Length: %d\r\nConnection: keep-alive\r\n\r\n" % (
+                   method, self.prefix, path, self.host, self.port, len(data))
+        writer.write(head.encode() + data)
+        await writer.drain()
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            payload = b"".join(chunks)
+        else:
+            payload = await reader.readexactly(int(headers.get("content-length", "0")))
+        keep_alive = headers.get("connection", "").lower() != "close"
+        return status, keep_alive, payload
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for reader, writer in idle:
+            writer.close()
+
+
+def w3c_locator(by, value):
+    #the W3C protocol only knows css/xpath/link text/tag name, selenium maps the rest to css the same way
+    if by == By.ID:
+        return "css selector", '[id="%s"]' % value.replace("\\", "\\\\").replace('"', '\\"')
+    if by == By.NAME:
+        return "css selector", '[name="%s"]' % value.replace("\\", "\\\\").replace('"', '\\"')
+    if by == By.CLASS_NAME:
+        return "css selector", "." + value
+    return by, value
+
+
+class AsyncDriver:
+    def __init__(self, http, session_id, capabilities):
+        self.http = http
+        self.session_id = session_id
+        self.capabilities = capabilities
+
+    @classmethod
+    async def start(cls, http, capabilities=None):
+        if capabilities is None:
+            capabilities = Browser.chrome_options().to_capabilities()
+        status, response = await http.request("POST", "/session", {"capabilities": {"alwaysMatch": capabilities}})
+        value = _value(status, response)
+        return cls(http, value["sessionId"], value.get("capabilities", {}))
+
+    async def execute(self, method, path, body=None):
+        status, response = await self.http.request(method, "/session/%s%s" % (self.session_id, path), body)
+        return _value(status, response)
+
+    async def get(self, url):
+        await self.execute("POST", "/url", {"url": url})
+
+    async def title(self):
+        return await self.execute("GET", "/title")
+
+    async def current_url(self):
+        return await self.execute("GET", "/url")
+
+    async def find_element(self, by=By.ID, value=None):
+        using, value = w3c_locator(by, value)
+        return AsyncElement(self, (await self.execute("POST", "/element", {"using": using, "value": value}))[ELEMENT_KEY])
+
+    async def find_elements(self, by=By.ID, value=None):
+        using, value = w3c_locator(by, value)
+        found = await self.execute("POST", "/elements", {"using": using, "value": value})
+        return [AsyncElement(self, element[ELEMENT_KEY]) for element in found]
+
+    async def execute_script(self, script, *args):
+        args = [{ELEMENT_KEY: a.id} if isinstance(a, AsyncElement) else a for a in args]
+        return await self.execute("POST", "/execute/sync", {"script": script, "args": args})
+
+    async def delete_all_cookies(self):
+        await self.execute("DELETE", "/cookie")
+
+    async def quit(self):
+        await self.execute("DELETE", "")
+
+
+class AsyncElement:
+    def __init__(self, driver, element_id):
+        self.driver = driver
+        self.id = element_id
+
+    async def _execute(self, method, path, body=None):
+        return await self.driver.execute(method, "/element/%s%s" % (self.id, path), body)
+
+    async def click(self):
+        await self._execute("POST", "/click")
+
+    async def clear(self):
+        await self._execute("POST", "/clear")
+
+    async def send_keys(self, text):
+        await self._execute("POST", "/value", {"text": str(text)})
+
+    async def text(self):
+        return await self._execute("GET", "/text")
+
+    async def get_attribute(self, name):
+        return await self._execute("GET", "/attribute/%s" % name)
+
+    async def find_element(self, by=By.ID, value=None):
+        using, value = w3c_locator(by, value)
+        return AsyncElement(self.driver, (await self._execute("POST", "/element", {"using": using, "value": value}))[ELEMENT_KEY])
+
+
+def _value(status, response):
+    value = (response or {}).get("value")
+    if status >= 400 or (isinstance(value, dict) and "error" in value):
+        value = value or {}
+        error = ERRORS.get(value.get("error"), WebDriverException)
+        raise error(value.get("message", "HTTP %d" % status), None, value.get("stacktrace"))
+    return value
+
+
+class ChromeDriverService:
+    #one chromedriver process serves every session of the event loop
+    def __init__(self, path=None, port=None):
+        self.path = path or shutil.which("chromedriver") or "chromedriver"
+        self.port = port or _free_port()
+        self.process = None
+
+    async def __aenter__(self):
+        self.process = await asyncio.create_subprocess_exec(
+            self.path, "--port=%d" % self.port,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        url = "http://127.0.0.1:%d" % self.port
+        http = HttpPool(url, size=1, timeout=1)
+        ready = False
+        for _ in range(100):
+            try:
+                status, response = await http.request("GET", "/status")
+                ready = bool(response["value"].get("ready"))
+            except OSError:
+                pass
+            if ready:
+                break
+            await asyncio.sleep(0.05)
+        await http.close()
+        if not ready:
+            await self.__aexit__()
+            raise WebDriverException("chromedriver (%s) did not become ready on port %d" % (self.path, self.port))
+        return url
+
+    async def __aexit__(self, *exc):
+        if self.process.returncode is None:
+            self.process.terminate()
+        await self.process.wait()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def forgot_password_flow(http, name):
+    #LocatorsExtension.py on the async driver, same locators as PageObjects
+    start = time.perf_counter()
+    driver = await AsyncDriver.start(http)
+    try:
+        await driver.get(ClientLoginPage.URL)
+        await (await driver.find_element(*ClientLoginPage.forgot_password_link.locator())).click()
+        confirm = None
+        for _ in range(100):
+            try:
+                confirm = await driver.find_element(*ForgotPasswordPage.confirm_password.locator())
+                break
+            except NoSuchElementException:
+                await asyncio.sleep(0.1)
+        if confirm is None:
+            raise TimeoutException("forgot password form did not show up")
+        await (await driver.find_element(*ForgotPasswordPage.email.locator())).send_keys(name)
+        await (await driver.find_element(*ForgotPasswordPage.password.locator())).send_keys("1234567890")
+        await confirm.send_keys("1234567890")
+        await (await driver.find_element(*ForgotPasswordPage.save.locator())).click()
+    finally:
+        await driver.quit()
+    return time.perf_counter() - start
+
+
+async def run_flows(count, concurrency, url=None):
+    async def limited(i, slots, http):
+        async with slots:
+            try:
+                return await forgot_password_flow(http, "Rohan%d" % i)
+            except (WebDriverException, OSError) as e:
+                return e
+
+    async def run(url):
+        http = HttpPool(url)
+        slots = asyncio.Semaphore(concurrency)
+        try:
+            return await asyncio.gather(*(limited(i, slots, http) for i in range(count)))
+        finally:
+            await http.close()
+
+    if url:
+        return await run(url)
+    async with ChromeDriverService() as url:
+        return await run(url)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many forgot-password flows concurrently in one process")
+    parser.add_argument("-n", "--count", type=int, default=10)
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="sessions open at the same time")
+    parser.add_argument("--url", help="existing chromedriver/grid URL instead of starting chromedriver")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_flows(args.count, args.concurrency, args.url))
+    failed = [r for r in results if isinstance(r, Exception)]
+    for r in failed:
+        print("failed:", type(r).__name__, getattr(r, "msg", None) or r)
+    print("%d flows, %d failed, %.2fs total" % (len(results), len(failed), time.perf_counter() - start))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
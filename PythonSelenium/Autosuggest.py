@@ -0,0 +1,136 @@
+from selenium.common.exceptions import (JavascriptException, NoSuchElementException, TimeoutException,
+                                        WebDriverException)
+
+import JsLocators
+import Waits
+
+#autosuggest/autocomplete boxes: type a query, wait until the suggestion list stops changing and
+#get every suggestion text (and its element) back from a single execute_async_script
+#
+#  country = Autosuggest(driver, DropdownsPractisePage.autosuggest, DropdownsPractisePage.suggestions)
+#  country.type("ind")        -> ["India", "Indonesia", "British Indian Ocean Territory"]
+#  country.choose("India")    -> clicks the suggestion, returns its text
+#
+#the list counts as settled when a MutationObserver saw no change for `quiet` seconds, there is at
+#least one visible suggestion and jQuery (when the page has it) has no request running.
+#Without JavaScript (mock WebDriver) it falls back to Waits and one .text per suggestion
+SETTLE_JS = JsLocators.FIND_JS + r"""
+var by = arguments[0], value = arguments[1], quiet = arguments[2] * 1000, timeout = arguments[3] * 1000;
+var done = arguments[arguments.length - 1];
+var started = Date.now();
+var timer = null;
+var observer;
+function visible(element) {
+    return !!(element.offsetWidth || element.offsetHeight || element.getClientRects().length);
+}
+function suggestions() {
+    return find(by, value, document, true).filter(visible).map(function (element) {
+        return {text: (element.innerText || element.textContent).trim(), element: element};
+    });
+}
+function idle() {
+    return !(window.jQuery && window.jQuery.active);
+}
+function finish(found) {
+    observer.disconnect();
+    clearTimeout(timer);
+    done(found);
+}
+function check() {
+    var found = suggestions();
+    if (found.length && idle()) return finish(found);
+    if (Date.now() - started >= timeout) return finish(found);
+    //nothing yet (or a request is still running): look again after the next quiet period
+    settle();
+}
+function settle() {
+    clearTimeout(timer);
+    timer = setTimeout(check, quiet);
+}
+observer = new MutationObserver(settle);
+observer.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+settle();
+"""
+
+
+class Autosuggest:
+    def __init__(self, driver, field, options, quiet=0.15, timeout=None):
+        self.driver = driver
+        self.field = JsLocators.locator(field)
+        self.options = JsLocators.locator(options)
+        self.quiet = quiet
+        self.timeout = Waits.DEFAULT_TIMEOUT if timeout is None else timeout
+        self._found = []
+
+    def type(self, query, clear=True):
+        #returns the suggestion texts for the query
+        field = self.driver.find_element(*self.field)
+        if clear:
+            field.clear()
+        field.send_keys(query)
+        return self.suggestions()
+
+    def suggestions(self):
+        try:
+            found = self._settle()
+        except (JavascriptException, TimeoutException):
+            found = self._poll()
+        except WebDriverException as e:
+            #drivers without execute_async_script answer with an unknown command / unsupported error
+            if "javascript" not in str(e.msg).lower() and "unknown command" not in str(e.msg).lower():
+                raise
+            found = self._poll()
+        self._found = found
+        return [text for text, element in found]
+
+    def _settle(self):
+        #the in-page timeout fires first, the script timeout is only a safety net. A pooled driver
+        #goes on to other flows, so its own script timeout is put back afterwards
+        previous = self.driver.timeouts.script
+        self.driver.set_script_timeout(self.timeout + 5)
+        try:
+            found = self.driver.execute_async_script(SETTLE_JS, self.options[0], self.options[1], self.quiet,
+                                                     self.timeout)
+        finally:
+            self.driver.set_script_timeout(previous)
+        return [(item["text"], item["element"]) for item in found or []]
+
+    def _poll(self):
+        elements = Waits.all_visible(self.driver, *self.options, timeout=self.timeout)
+        return [(element.text.strip(), element) for element in elements]
+
+    def choose(self, wanted, exact=False):
+        #exact text first, then (unless exact) case-insensitive prefix, then substring
+        if not self._found:
+            self.suggestions()
+        found = self._found
+        match = _match(found, wanted, exact)
+        if match is None:
+            raise NoSuchElementException("no suggestion matching %r in %r" % (wanted, [text for text, _ in found]))
+        text, element = match
+        element.click()
+        self._found = []
+        return text
+
+    def pick(self, query, wanted=None, exact=False):
+        #type + choose; without `wanted` the first suggestion is taken
+        texts = self.type(query)
+        if wanted is None:
+            if not texts:
+                raise NoSuchElementException("no suggestions for %r" % query)
+            wanted = texts[0]
+        return self.choose(wanted, exact)
+
+
+def _match(found, wanted, exact):
+    wanted_lower = wanted.lower()
+    for text, element in found:
+        if text == wanted:
+            return text, element
+    if exact:
+        return None
+    for test in (lambda t: t.lower().startswith(wanted_lower), lambda t: wanted_lower in t.lower()):
+        for text, element in found:
+            if test(text):
+                return text, element
+    return None
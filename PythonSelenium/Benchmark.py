@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import Browser
+import Runner
+from MemoryMonitor import browser_pid, rss
+
+#end-to-end latency of the flow scripts, measured against the local fixtures so the numbers do
+#not depend on the live sites
+#  python Benchmark.py -n 5                  -> every flow 5 times, reports/benchmark-*.json
+#  python Benchmark.py -n 5 --save-baseline  -> and keep the result as the baseline
+#  python Benchmark.py -n 5 --threshold 0.2  -> exit 1 when a flow got more than 20% slower
+#                                               (or sends 20% more commands) than the baseline
+#every run starts a fresh browser so browser startup is measured too. Per run: wall time,
+#WebDriver commands sent, browser startup and peak RSS of the browser processes (chromedriver and
+#everything it started; Linux only, nothing to measure with --mock)
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPORTS = os.path.join(HERE, "reports")
+BASELINE = os.path.join(REPORTS, "benchmark-baseline.json")
+METRICS = ("wall_time", "commands", "startup_time")
+#timing differences below this many seconds are noise, whatever the threshold says
+NOISE = 0.05
+
+
+class RssSampler:
+    #polls the browser's memory in the background, the peak is what is left when the flow is over
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            value = rss(self.pid)
+            if value is not None:
+                self.peak = max(self.peak or 0, value)
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.peak
+
+
+class Measurement:
+    #collects the numbers of the drivers a flow run starts (normally one)
+    def __init__(self):
+        self.commands = 0
+        self.startup_time = 0.0
+        self.samplers = []
+
+    def attach(self, driver):
+        self.startup_time += getattr(driver, "_startup_time", 0.0)
+        Browser.on_command(driver, self.count)
+        pid = browser_pid(driver)
+        if pid:
+            self.samplers.append(RssSampler(pid))
+
+    def count(self, command, params, seconds, error):
+        self.commands += 1
+
+    def finish(self):
+        peaks = [sampler.stop() for sampler in self.samplers]
+        peaks = [peak for peak in peaks if peak is not None]
+        return max(peaks) if peaks else None
+
+
+_current = None
+
+
+def _attach(driver):
+    if _current is not None:
+        _current.attach(driver)
+
+
+def run_once(flow):
+    global _current
+    _current = Measurement()
+    try:
+        result = Runner.run_flow(flow)
+    finally:
+        measurement, _current = _current, None
+        peak = measurement.finish()
+    return {
+        "status": result["status"],
+        "error": result["error"],
+        "wall_time": result["duration"],
+        "commands": measurement.commands,
+        "startup_time": round(measurement.startup_time, 3),
+        "peak_rss": peak,
+    }
+
+
+def summarize(runs):
+    passed = [run for run in runs if run["status"] == "passed"]
+    summary = {"runs": len(runs), "passed": len(passed)}
+    for metric in METRICS:
+        values = [run[metric] for run in passed]
+        summary[metric] = {
+            "median": round(statistics.median(values), 3) if values else None,
+            "min": round(min(values), 3) if values else None,
+            "max": round(max(values), 3) if values else None,
+        }
+    peaks = [run["peak_rss"] for run in passed if run["peak_rss"] is not None]
+    summary["peak_rss"] = max(peaks) if peaks else None
+    return summary
+
+
+def benchmark(flows, runs, site="fixtures"):
+    os.environ["SELENIUM_HEADLESS"] = "1"
+    if site == "fixtures":
+        os.environ["SELENIUM_FIXTURES"] = "1"
+    elif site == "mock":
+        os.environ["SELENIUM_MOCK"] = "1"
+    Browser.on_driver(_attach)
+    results = {}
+    for flow in flows:
+        flow_runs = [run_once(flow) for _ in range(runs)]
+        results[flow.name] = {"summary": summarize(flow_runs), "runs": flow_runs}
+    return {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "site": site,
+        "runs": runs,
+        "flows": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    #regressions: median wall time / commands / startup above baseline * (1 + threshold), a flow that
+    #passed in the baseline and fails now, peak RSS above baseline * (1 + threshold)
+    regressions = []
+    for name, result in sorted(report["flows"].items()):
+        old = baseline.get("flows", {}).get(name)
+        if old is None:
+            continue
+        new, old = result["summary"], old["summary"]
+        if new["passed"] < new["runs"] and old["passed"] == old["runs"]:
+            regressions.append("%s: %d of %d runs failed" % (name, new["runs"] - new["passed"], new["runs"]))
+        for metric in METRICS:
+            before, after = old[metric]["median"], new[metric]["median"]
+            noise = 0 if metric == "commands" else NOISE
+            if before and after is not None and after > before * (1 + threshold) and after - before > noise:
+                regressions.append("%s: %s %.3f -> %.3f (+%.0f%%)" % (
+                    name, metric, before, after, (after / before - 1) * 100))
+        if old["peak_rss"] and new["peak_rss"] and new["peak_rss"] > old["peak_rss"] * (1 + threshold):
+            regressions.append("%s: peak_rss %.1fMB -> %.1fMB" % (
+                name, old["peak_rss"] / 2 ** 20, new["peak_rss"] / 2 ** 20))
+    return regressions
+
+
+def load(path):
+    with open(path) as reader:
+        return json.load(reader)
+
+
+def save(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(report, writer, indent=2)
+    return path
+
+
+def print_report(report):
+    print("%-20s %5s %10s %10s %9s %9s %10s" % ("flow", "ok", "median", "min", "commands", "startup", "peak rss"))
+    for name, result in sorted(report["flows"].items()):
+        summary = result["summary"]
+        wall = summary["wall_time"]
+        print("%-20s %2d/%-2d %9ss %9ss %9s %8ss %10s" % (
+            name, summary["passed"], summary["runs"], wall["median"], wall["min"],
+            summary["commands"]["median"], summary["startup_time"]["median"],
+            "%.1fMB" % (summary["peak_rss"] / 2 ** 20) if summary["peak_rss"] else "-"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PythonSelenium flows against the local fixtures")
+    parser.add_argument("flows", nargs="*", help="flow names (script names without .py), default all")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="runs per flow")
+    parser.add_argument("--mock", dest="site", action="store_const", const="mock", default="fixtures",
+                        help="use the mock WebDriver instead of headless chrome")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--report", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    flows = Runner.discover(names=args.flows)
+    if not flows:
+        print("no flows found")
+        return 1
+    report = benchmark(flows, args.runs, args.site)
+    print_report(report)
+    print("results:", save(report, args.report or os.path.join(
+        REPORTS, "benchmark-%s.json" % time.strftime("%Y%m%d-%H%M%S"))))
+    if args.save_baseline:
+        print("baseline:", save(report, args.baseline))
+        return 0
+    if not os.path.exists(args.baseline):
+        print("no baseline yet, run with --save-baseline")
+        return 0
+    baseline = load(args.baseline)
+    if baseline.get("site") != report["site"]:
+        print("baseline was measured on %s, not comparing" % baseline.get("site"))
+        return 0
+    regressions = compare(report, baseline, args.threshold)
+    for regression in regressions:
+        print("REGRESSION", regression)
+    if not regressions:
+        print("no regressions against %s (threshold %.0f%%)" % (args.baseline, args.threshold * 100))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
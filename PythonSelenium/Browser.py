@@ -0,0 +1,188 @@
+import os
+import time
+
+from selenium import webdriver
+
+import Artifacts
+import AssetCache
+import LocatorProfiler
+import Tracer
+
+#single place where the scripts get their browser, so a runner can decide how browsers are started
+#SELENIUM_HEADLESS=1 -> headless chrome (the Runner workers set this)
+#SELENIUM_FIXTURES=1 -> pages with a copy in fixtures/ are served locally (Fixtures.py)
+#SELENIUM_MOCK=1     -> no browser, the scripts talk to the in-process MockWebDriver
+#ARTIFACTS=1         -> screenshots + DOM dumps when a script fails (Artifacts.py)
+#ASSET_CACHE=1       -> static assets come from a local disk cache after the first load (AssetCache.py)
+#BROWSER_PROFILE     -> "debug" (default): a normal Chrome window, what the scripts always used
+#                       "fast": headless, small fixed viewport, no images/fonts/trackers, no
+#                       extensions/GPU, eager page loads (DOM ready, no waiting for subresources)
+#when a SessionPool is installed with use_pool() the scripts borrow warm browsers from it
+_live = []
+_pool = None
+_driver_hooks = []
+PROFILES = ("debug", "fast")
+FAST_ARGUMENTS = [
+    "--headless=new",
+    "--window-size=1280,720",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false",
+]
+#third-party trackers never resolve in the fast profile
+TRACKERS = [
+    "*.google-analytics.com",
+    "*.googletagmanager.com",
+    "*.doubleclick.net",
+    "*.googlesyndication.com",
+    "*.facebook.net",
+    "*.hotjar.com",
+    "*.clarity.ms",
+]
+#fonts and images that get past imagesEnabled=false (CSS backgrounds, icon fonts)
+BLOCKED_URLS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+                "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"]
+
+
+def profile():
+    name = os.environ.get("BROWSER_PROFILE", "debug")
+    if name not in PROFILES:
+        raise ValueError("unknown BROWSER_PROFILE %r, use one of %s" % (name, ", ".join(PROFILES)))
+    return name
+
+
+def chrome_options(name=None):
+    options = webdriver.ChromeOptions()
+    if (name or profile()) == "fast":
+        for argument in FAST_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_argument("--host-resolver-rules=%s" % ", ".join("MAP %s ~NOTFOUND" % host for host in TRACKERS))
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        options.page_load_strategy = "eager"
+    elif os.environ.get("SELENIUM_HEADLESS") == "1":
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1366,768")
+    return options
+
+
+def block_urls(driver, patterns=None):
+    #Chrome only (CDP); blocks matching requests of the current tab
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS if patterns is None else patterns})
+
+
+def new_driver():
+    if os.environ.get("SELENIUM_MOCK") == "1":
+        import MockWebDriver
+        return webdriver.Remote(command_executor=MockWebDriver.start(), options=chrome_options())
+    driver = webdriver.Chrome(options=chrome_options())
+    if profile() == "fast":
+        block_urls(driver)
+    if AssetCache.ENABLED:
+        AssetCache.attach(driver)
+    if os.environ.get("SELENIUM_FIXTURES") == "1":
+        import Fixtures
+        Fixtures.use_fixtures(driver)
+    return driver
+
+
+def use_pool(pool):
+    global _pool
+    _pool = pool
+
+
+def on_driver(hook):
+    #hook(driver) for every driver get_driver() hands out, before the script uses it
+    _driver_hooks.append(hook)
+    return hook
+
+
+def get_driver():
+    if _pool:
+        driver = _pool.acquire()
+    else:
+        start = time.perf_counter()
+        driver = new_driver()
+        driver._startup_time = time.perf_counter() - start
+    prepare(driver)
+    _live.append(driver)
+    return driver
+
+
+def prepare(driver):
+    #what get_driver() adds to a driver (profiler, tracer, artifacts, on_driver hooks), for drivers
+    #taken from a pool of their own (DataRunner); detach() takes it off again before they go back
+    if LocatorProfiler.ENABLED:
+        LocatorProfiler.attach(driver)
+    if Tracer.ENABLED:
+        Tracer.attach(driver)
+    if Artifacts.ENABLED:
+        Artifacts.attach(driver)
+    for hook in _driver_hooks:
+        hook(driver)
+    return driver
+
+
+def detach(driver):
+    if getattr(driver, "_command_listeners", None):
+        del driver._command_listeners[:]
+
+
+def live():
+    #the drivers handed out and not released yet
+    return list(_live)
+
+
+def on_command(driver, listener):
+    #listener(command, params, seconds, error) after every WebDriver command the driver sends
+    #(driver.get, find_element, element clicks, execute_script, ...); the listeners are dropped
+    #when the driver is released, so a pooled browser starts the next flow without them
+    listeners = getattr(driver, "_command_listeners", None)
+    if listeners is None:
+        listeners = driver._command_listeners = []
+        execute = driver.execute
+
+        def execute_with_listeners(command, params=None):
+            start = time.perf_counter()
+            error = None
+            try:
+                return execute(command, params)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                for callback in list(listeners):
+                    callback(command, params, time.perf_counter() - start, error)
+
+        driver.execute = execute_with_listeners
+    listeners.append(listener)
+    return driver
+
+
+def release(driver, broken=False):
+    if driver in _live:
+        _live.remove(driver)
+    detach(driver)
+    if _pool:
+        _pool.release(driver, broken)
+    else:
+        driver.quit()
+
+
+def cleanup():
+    #quit whatever a failed script left behind
+    while _live:
+        driver = _live.pop()
+        detach(driver)
+        try:
+            if _pool:
+                _pool.release(driver, broken=not _pool.healthy(driver))
+            else:
+                driver.quit()
+        except Exception as e:
+            print("could not quit driver:", e)
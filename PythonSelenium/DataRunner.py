@@ -0,0 +1,315 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+from selenium.common.exceptions import JavascriptException, WebDriverException
+
+import Browser
+import FormFill
+import Uploads
+from Dropdown import Dropdown
+from PageObjects import AngularPracticePage, PracticeFormPage
+from SessionPool import SessionPool
+
+#data-driven runs: the inputs the scripts hard-code come from a CSV or JSONL file instead, one form
+#submission per row
+#  python DataRunner.py data/practice_form.csv -w 4       -> 4 warm browsers share the rows
+#  python DataRunner.py data/angularpractice.jsonl --mock
+#rows are read lazily and handed to the workers through a small queue, so the file is never loaded
+#into memory; every worker keeps its browser on the form page and only resets the form between rows.
+#One JSON line per row is appended to reports/data-*.jsonl as soon as the row is done
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPORTS = os.path.join(HERE, "reports")
+TRUE = {"1", "true", "yes", "y", "x", "on", "checked"}
+RESET_JS = """
+var form = document.querySelector(arguments[0]);
+if (!form) return false;
+form.reset();
+Array.prototype.forEach.call(form.elements, function (element) {
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+});
+//the confirmation of the last row's submit must not pass the next row
+if (arguments[1]) {
+    document.querySelectorAll(arguments[1]).forEach(function (element) { element.setAttribute('hidden', ''); });
+}
+return true;
+"""
+
+
+class DataForm:
+    #fields: column -> (PageObjects Element, kind), kind is text, select, check, radio or file
+    #reset: "form" resets the <form> in place (a reload where that fails), "reload" reloads the page
+    #confirmation: css of what a submit shows, hidden again by the form reset
+    #dependent: child column -> parent column of select pairs the page fills after the parent's change
+    #(state -> city); the parent is chosen by text, the child by value once its option is there
+    def __init__(self, page, fields, form="form", reset="form", submit=None, dependent=None, confirmation=None):
+        self.page = page
+        self.confirmation = confirmation
+        self.fields = fields
+        self.form = form
+        self.reset = reset
+        self.submit = submit
+        self.dependent = dependent or {}
+
+    def _pairs(self, row):
+        #(parent column, child column) of the pairs this row has both values for
+        return [(parent, child) for child, parent in self.dependent.items()
+                if str(row.get(parent) or "").strip() and str(row.get(child) or "").strip()]
+
+    def _cells(self, row, skip=()):
+        for column, (element, kind) in self.fields.items():
+            value = row.get(column)
+            if value is not None and value != "" and column not in skip:
+                yield element, kind, str(value).strip()
+
+    def values(self, row):
+        #row -> FormFill list, empty cells are left alone
+        values = []
+        paired = {column for pair in self._pairs(row) for column in pair}
+        for element, kind, value in self._cells(row, paired):
+            if kind == "check":
+                values.append((element, FormFill.CHECK if value.lower() in TRUE else FormFill.UNCHECK))
+            elif kind == "radio":
+                if value.lower() in TRUE:
+                    values.append((element, FormFill.CHECK))
+            elif kind != "file":
+                values.append((element, value))
+        return values
+
+    def files(self, row, base=HERE):
+        #file columns -> [(element, path)], paths relative to the data file
+        return [(element, os.path.join(base, value)) for element, kind, value in self._cells(row) if kind == "file"]
+
+    def dropdowns(self, row):
+        #the dependent pairs -> [(parent element, parent text, child element, child value)]
+        return [(self.fields[parent][0], str(row[parent]).strip(), self.fields[child][0], str(row[child]).strip())
+                for parent, child in self._pairs(row)]
+
+
+FORMS = {
+    "practice_form": DataForm(PracticeFormPage, {
+        "email": (PracticeFormPage.email, "text"),
+        "name": (PracticeFormPage.name, "text"),
+        "female": (PracticeFormPage.female, "radio"),
+        "mobile": (PracticeFormPage.mobile, "text"),
+        "date_of_birth": (PracticeFormPage.date_of_birth, "text"),
+        "subjects": (PracticeFormPage.subjects, "text"),
+        "sports": (PracticeFormPage.sports, "check"),
+        "music": (PracticeFormPage.music, "check"),
+        "picture": (PracticeFormPage.picture, "file"),
+        "address": (PracticeFormPage.address, "text"),
+        "state": (PracticeFormPage.state, "select"),
+        "city": (PracticeFormPage.city, "select"),
+    }, form="#practiceForm", dependent={"city": "state"}, confirmation=".form-submitted",
+        submit=lambda page: page.submit()),
+    "angularpractice": DataForm(AngularPracticePage, {
+        "name": (AngularPracticePage.name, "text"),
+        "email": (AngularPracticePage.email, "text"),
+        "password": (AngularPracticePage.password, "text"),
+        "check_me": (AngularPracticePage.check_me, "check"),
+        "gender": (AngularPracticePage.gender, "select"),
+        "employed": (AngularPracticePage.employed, "radio"),
+        "birthday": (AngularPracticePage.birthday, "text"),
+    }, confirmation=".alert-success", submit=lambda page: page.submit()),
+}
+
+
+def read_rows(path):
+    #yields (row number, dict) one at a time
+    with open(path, newline="", encoding="utf-8") as reader:
+        if path.endswith(".csv"):
+            for number, row in enumerate(csv.DictReader(reader), 1):
+                yield number, row
+        else:
+            number = 0
+            for line in reader:
+                line = line.strip()
+                if line:
+                    number += 1
+                    yield number, json.loads(line)
+
+
+def form_for(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return name if name in FORMS else None
+
+
+class ResultWriter:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.counts = {"passed": 0, "failed": 0}
+        self._writer = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, result):
+        with self._lock:
+            self._writer.write(json.dumps(result) + "\n")
+            self._writer.flush()
+            self.counts["passed" if result["status"] == "passed" else "failed"] += 1
+
+    def close(self):
+        self._writer.close()
+
+
+class Worker:
+    def __init__(self, pool, form, base, rows_per_session):
+        self.pool = pool
+        self.form = form
+        self.base = base
+        self.rows_per_session = rows_per_session
+        self.driver = None
+        self.page = None
+        self.rows = 0
+        self.dirty = False
+
+    def _session(self):
+        #a fresh pool browser every rows_per_session rows keeps long runs from growing the browser
+        if self.driver is not None and self.rows >= self.rows_per_session:
+            self.close()
+        if self.driver is None:
+            #the same hooks as Browser.get_driver(): metrics, tracer, profiler, the scheduler's cancel watch
+            self.driver = Browser.prepare(self.pool.acquire())
+            self.page = self.form.page(self.driver).open()
+            self.rows = 0
+            self.dirty = False
+        return self.page
+
+    def _reset(self):
+        if not self.dirty:
+            return
+        if self.form.reset == "form":
+            try:
+                if self.driver.execute_script(RESET_JS, self.form.form, self.form.confirmation):
+                    self.dirty = False
+                    return
+            except (JavascriptException, WebDriverException):
+                pass
+        self.page.open()
+        self.dirty = False
+
+    def run(self, number, row):
+        start = time.perf_counter()
+        result = {"row": number, "status": "passed", "worker": threading.current_thread().name}
+        try:
+            page = self._session()
+            self._reset()
+            self.dirty = True
+            self.rows += 1
+            filled = FormFill.fill(self.driver, self.form.values(row))
+            result["native_fields"] = filled.count("native")
+            for parent, parent_text, child, child_value in self.form.dropdowns(row):
+                Dropdown.dependent(self.driver, parent, {"text": parent_text}, child, {"value": child_value})
+            for element, path in self.form.files(row, self.base):
+                #staged once per browser, later rows reuse the file already on the node
+                Uploads.upload(self.driver, element, path)
+            if self.form.submit:
+                result["output"] = self.form.submit(page)
+        except AssertionError:
+            result.update(status="failed", error=traceback.format_exc(limit=3))
+        except Exception:
+            result.update(status="error", error=traceback.format_exc(limit=3))
+            self._recover()
+        result["duration"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def _recover(self):
+        #back to the form page, or a new browser when this one does not answer any more
+        try:
+            self.page.open()
+            self.dirty = False
+        except Exception:
+            self.close(broken=True)
+
+    def close(self, broken=False):
+        if self.driver is not None:
+            Browser.detach(self.driver)
+            self.pool.release(self.driver, broken)
+        self.driver = None
+        self.page = None
+
+
+def run(path, form_name, workers=2, output=None, limit=None, rows_per_session=500, stop=None):
+    #stop: called before every row is handed out, the run ends early once it returns True
+    form = FORMS[form_name]
+    base = os.path.dirname(os.path.abspath(path))
+    if output is None:
+        output = os.path.join(REPORTS, "data-%s-%s.jsonl" % (form_name, time.strftime("%Y%m%d-%H%M%S")))
+    writer = ResultWriter(output)
+    #the queue is what keeps the file streaming: the reader is never more than a few rows ahead
+    rows = queue.Queue(maxsize=workers * 4)
+    #a browser goes back to the pool every rows_per_session rows, max_uses counts those turns
+    pool = SessionPool(size=workers)
+    start = time.perf_counter()
+
+    def feed():
+        try:
+            for item in itertools.islice(read_rows(path), limit):
+                if stop is not None and stop():
+                    return
+                rows.put(item)
+        finally:
+            for _ in range(workers):
+                rows.put(None)
+
+    def work():
+        worker = Worker(pool, form, base, rows_per_session)
+        try:
+            while True:
+                item = rows.get()
+                if item is None:
+                    return
+                writer.write(worker.run(*item))
+        finally:
+            worker.close()
+
+    threads = [threading.Thread(target=feed, name="reader")]
+    threads += [threading.Thread(target=work, name="worker-%d" % i) for i in range(workers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        writer.close()
+        pool.close()
+    return {"output": output, "seconds": round(time.perf_counter() - start, 3), **writer.counts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a form once per row of a CSV/JSONL file")
+    parser.add_argument("data", help="CSV (header = column names) or JSONL file")
+    parser.add_argument("--form", choices=sorted(FORMS), help="form to fill, default from the file name")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="browsers working through the rows")
+    parser.add_argument("--limit", type=int, help="only the first N rows")
+    parser.add_argument("--output", help="JSONL file the results are appended to")
+    parser.add_argument("--rows-per-session", type=int, default=500, help="rows before a browser is replaced")
+    site = parser.add_mutually_exclusive_group()
+    site.add_argument("--fixtures", action="store_true", help="serve the pages from fixtures/")
+    site.add_argument("--mock", action="store_true", help="use the in-process mock WebDriver")
+    args = parser.parse_args(argv)
+
+    form_name = args.form or form_for(args.data)
+    if form_name is None:
+        parser.error("cannot tell the form from %s, use --form" % args.data)
+    os.environ.setdefault("SELENIUM_HEADLESS", "1")
+    if args.fixtures:
+        os.environ["SELENIUM_FIXTURES"] = "1"
+    if args.mock:
+        os.environ["SELENIUM_MOCK"] = "1"
+    summary = run(args.data, form_name, args.workers, args.output, args.limit, args.rows_per_session)
+    print("%(passed)d passed, %(failed)d failed in %(seconds).2fs" % summary)
+    print("results:", summary["output"])
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,5 @@
-import time
-
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+import Browser
+import Waits
 
 #
 # service_obj = Service()
@@ -11,16 +9,12 @@ from selenium.webdriver.chrome.service import Service
 # driver.get("https://www.google.com")
 
 
-driver= webdriver.Chrome()
+driver= Browser.get_driver()
 driver.get("https://www.google.com")
-driver.maximize_window()
+if Browser.profile() == "debug":
+    #headless windows have a fixed size, maximizing only costs a command
+    driver.maximize_window()
 print(driver.title)
 print(driver.current_url)
 
-
-
-
-
-
-
-time.sleep(10)
+Waits.finish(driver)
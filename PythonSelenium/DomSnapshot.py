@@ -0,0 +1,271 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+#saved copies of the pages the scripts drive, so locators can be checked without a browser
+#  python DomSnapshot.py https://rahulshettyacademy.com/angularpractice/   -> snapshots/<page>/<version>.html
+#  python DomSnapshot.py --script LocatorsExtension.py   -> every page the script finds elements on
+#a page is saved once per version (hash of its DOM); snapshots/index.json lists the versions of every
+#page and which scripts saw them, snapshot_path(url) is the latest one
+#lxml (and cssselect for CSS locators) is needed to evaluate locators against a snapshot
+HERE = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOTS = os.path.join(HERE, "snapshots")
+INDEX = "index.json"
+BY_NAMES = {name: getattr(By, name) for name in dir(By) if name.isupper()}
+
+
+def page_name(url):
+    name = re.sub(r"^\w+://(www\.)?", "", url).strip("/")
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "page"
+
+
+def snapshot_path(url, folder=SNAPSHOTS):
+    #latest version of the page, the unversioned snapshots/<page>.html of older captures otherwise
+    return latest(page_name(url), folder) or os.path.join(folder, page_name(url) + ".html")
+
+
+def dom_hash(html):
+    #whitespace between tags does not make a new version
+    return hashlib.sha256(re.sub(r"\s+", " ", html).encode("utf-8")).hexdigest()[:12]
+
+
+def load_index(folder=SNAPSHOTS):
+    try:
+        with open(os.path.join(folder, INDEX)) as reader:
+            return json.load(reader)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index, folder=SNAPSHOTS):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, INDEX), "w") as writer:
+        json.dump(index, writer, indent=2, sort_keys=True)
+
+
+def latest(page, folder=SNAPSHOTS):
+    versions = load_index(folder).get(page, {}).get("versions")
+    return os.path.join(folder, versions[-1]["file"]) if versions else None
+
+
+def pages_of(script, folder=SNAPSHOTS):
+    #versions of every page a script was recorded on, {page: [path, ...]} oldest first
+    name = os.path.basename(script)
+    found = {}
+    for page, entry in load_index(folder).items():
+        paths = [os.path.join(folder, version["file"]) for version in entry["versions"] if name in version["scripts"]]
+        if paths:
+            found[page] = paths
+    return found
+
+
+def capture(driver, name=None, folder=SNAPSHOTS, script=None):
+    #the live DOM (after scripts ran), not the HTML the server sent; an unchanged page is not saved again
+    html = "<!DOCTYPE html>\n" + driver.execute_script("return document.documentElement.outerHTML")
+    url = driver.current_url
+    page = name or page_name(url)
+    version = dom_hash(html)
+    file = "%s/%s.html" % (page, version)
+    path = os.path.join(folder, file)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as writer:
+            writer.write(html)
+    index = load_index(folder)
+    entry = index.setdefault(page, {"url": url, "versions": []})
+    known = [v for v in entry["versions"] if v["version"] == version]
+    if known:
+        #seen again: it becomes the latest version
+        entry["versions"].remove(known[0])
+        record = known[0]
+    else:
+        record = {"version": version, "file": file, "captured": time.strftime("%Y-%m-%dT%H:%M:%S"), "scripts": []}
+    if script and os.path.basename(script) not in record["scripts"]:
+        record["scripts"].append(os.path.basename(script))
+    entry["versions"].append(record)
+    save_index(index, folder)
+    return path
+
+
+def record(script, folder=SNAPSHOTS):
+    #runs a script and captures the page after every successful lookup, so pages rendered by JavaScript
+    #are complete and the states a page goes through (suggestion lists, dependent selects) are all kept;
+    #unchanged DOMs are not saved again
+    import Browser
+    import Runner
+    captured = {}
+
+    def watch(driver):
+        busy = []
+
+        def after(command, params, seconds, error):
+            if busy or error or command not in ("findElement", "findElements", "findChildElement"):
+                return
+            busy.append(True)
+            try:
+                path = capture(driver, folder=folder, script=script)
+                captured.setdefault(driver.current_url, [])
+                if path not in captured[driver.current_url]:
+                    captured[driver.current_url].append(path)
+            finally:
+                busy.pop()
+
+        Browser.on_command(driver, after)
+
+    Browser.on_driver(watch)
+    try:
+        result = Runner.run_flow(Runner.Flow(os.path.splitext(os.path.basename(script))[0], os.path.abspath(script)))
+    finally:
+        Browser._driver_hooks.remove(watch)
+    return result, captured
+
+
+def _lxml():
+    try:
+        import lxml.html
+    except ImportError:
+        raise ImportError("evaluating locators offline needs lxml: pip install lxml cssselect")
+    return lxml.html
+
+
+def load(path):
+    with open(path, "rb") as reader:
+        return _lxml().document_fromstring(reader.read())
+
+
+def resolve(tree, by, value):
+    #elements the locator matches in document order, like find_elements would return them
+    if by == By.XPATH:
+        return [e for e in tree.xpath(value) if hasattr(e, "tag")]
+    if by == By.ID:
+        return tree.xpath("//*[@id=$v]", v=value)
+    if by == By.NAME:
+        return tree.xpath("//*[@name=$v]", v=value)
+    if by == By.TAG_NAME:
+        return tree.xpath("//*[local-name()=$v]", v=value.lower())
+    if by == By.LINK_TEXT:
+        return [a for a in tree.xpath("//a") if a.text_content().strip() == value]
+    if by == By.PARTIAL_LINK_TEXT:
+        return [a for a in tree.xpath("//a") if value in a.text_content()]
+    if by == By.CLASS_NAME:
+        value = "." + value
+    try:
+        from lxml.cssselect import CSSSelector
+    except ImportError:
+        raise ImportError("evaluating CSS locators offline needs cssselect: pip install cssselect")
+    return CSSSelector(value, translator="html")(tree)
+
+
+class SnapshotIndex:
+    #id / name / class -> elements of one snapshot, so the common lookups need no selector engine
+    SIMPLE_CSS = [
+        (re.compile(r"^#([\w-]+)$"), "ids"),
+        (re.compile(r"^\.([\w-]+)$"), "classes"),
+        (re.compile(r"^\[name\s*=\s*['\"]?([^'\"\]]+)['\"]?\]$"), "names"),
+    ]
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.ids = {}
+        self.names = {}
+        self.classes = {}
+        for element in tree.iter():
+            if not isinstance(element.tag, str):
+                continue
+            if element.get("id"):
+                self.ids.setdefault(element.get("id"), []).append(element)
+            if element.get("name"):
+                self.names.setdefault(element.get("name"), []).append(element)
+            for name in (element.get("class") or "").split():
+                self.classes.setdefault(name, []).append(element)
+
+    def find(self, by, value):
+        if by == By.ID:
+            return list(self.ids.get(value, []))
+        if by == By.NAME:
+            return list(self.names.get(value, []))
+        if by == By.CLASS_NAME and " " not in value.strip():
+            return list(self.classes.get(value.strip(), []))
+        if by == By.CSS_SELECTOR:
+            for pattern, table in self.SIMPLE_CSS:
+                match = pattern.match(value.strip())
+                if match:
+                    return list(getattr(self, table).get(match.group(1), []))
+        return resolve(self.tree, by, value)
+
+    def duplicate_ids(self):
+        return sorted(name for name, elements in self.ids.items() if len(elements) > 1)
+
+
+def element_path(element):
+    return element.getroottree().getpath(element)
+
+
+def find_locators(script):
+    #every (By.X, "literal") passed to a call in a script (find_element(s), Waits.visible, ...),
+    #with the line it is on
+    with open(script, encoding="utf-8") as reader:
+        tree = ast.parse(reader.read(), script)
+    locators = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        for by, value in zip(node.args, node.args[1:]):
+            if not (isinstance(by, ast.Attribute) and isinstance(by.value, ast.Name) and by.value.id == "By"):
+                continue
+            if not (isinstance(value, ast.Constant) and isinstance(value.value, str)):
+                continue
+            locators.append({
+                "line": node.lineno,
+                "method": node.func.attr,
+                "by": BY_NAMES.get(by.attr, by.attr),
+                "value": value.value,
+            })
+    return sorted(locators, key=lambda l: l["line"])
+
+
+def find_urls(script):
+    #the pages a script opens with driver.get("...")
+    with open(script, encoding="utf-8") as reader:
+        tree = ast.parse(reader.read(), script)
+    urls = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "get"
+                and node.args and isinstance(node.args[0], ast.Constant)
+                and str(node.args[0].value).startswith("http")):
+            urls.append(node.args[0].value)
+    return urls
+
+
+def main(argv=None):
+    import Browser
+    urls = argv if argv is not None else sys.argv[1:]
+    if not urls:
+        print("usage: python DomSnapshot.py URL [URL ...] | --script SCRIPT [SCRIPT ...]")
+        return 1
+    if urls[0] == "--script":
+        for script in urls[1:]:
+            result, captured = record(script)
+            for url, paths in captured.items():
+                print(script, url, "->", ", ".join(paths))
+            if result["status"] != "passed":
+                print(script, result["status"], result["error"].rstrip().splitlines()[-1])
+        return 0
+    driver = Browser.get_driver()
+    try:
+        for url in urls:
+            driver.get(url)
+            print(url, "->", capture(driver))
+    finally:
+        Browser.release(driver)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+from selenium.common.exceptions import (JavascriptException, NoSuchElementException, UnexpectedTagNameException,
+                                        WebDriverException)
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.select import Select
+
+import JsLocators
+import Waits
+
+#<select> dropdowns in one execute_script per choice; selenium's Select reads every option with its
+#own round trips (text, value, selected, ...), which adds up on long lists
+#
+#  Dropdown(driver, AngularPracticePage.gender).select(index=1)
+#  Dropdown(driver, (By.ID, "state")).select(text="Uttar Pradesh")
+#  Dropdown.dependent(driver, PracticeFormPage.state, {"text": "Uttar Pradesh"},
+#                     PracticeFormPage.city, {"value": "Agra"})
+#
+#select() fires input and change like a user's choice does. dependent() waits until the child list
+#has the wanted option (the page fills it after the parent's change event), no fixed sleeps.
+#Without JavaScript (mock WebDriver) it falls back to selenium's Select
+SELECT_JS = JsLocators.FIND_JS + r"""
+var target = arguments[0], how = arguments[1], wanted = arguments[2];
+var select = target && target.by ? find(target.by, target.value, document, false) : target;
+if (!select) return {error: 'missing'};
+if (select.tagName !== 'SELECT') return {error: 'tag', tag: select.tagName.toLowerCase()};
+function text(option) {
+    return option.text.replace(/\s+/g, ' ').trim();
+}
+function matches(option) {
+    if (how === 'value') return option.value === wanted;
+    if (how === 'index') return option.index === wanted;
+    return text(option) === wanted;
+}
+var option = Array.prototype.filter.call(select.options, matches)[0];
+if (!option) return {error: 'option', options: Array.prototype.map.call(select.options, text)};
+if (option.disabled) return {error: 'disabled', text: text(option)};
+if (!option.selected) {
+    option.selected = true;
+    select.dispatchEvent(new Event('input', {bubbles: true}));
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+}
+return {value: option.value, text: text(option), index: option.index};
+"""
+#true once the select exists and has the option (by value, index or text); null while it does not
+HAS_OPTION_JS = JsLocators.FIND_JS + r"""
+var target = arguments[0], how = arguments[1], wanted = arguments[2];
+var select = target && target.by ? find(target.by, target.value, document, false) : target;
+if (!select || !select.options) return null;
+return Array.prototype.some.call(select.options, function (option) {
+    if (how === 'value') return option.value === wanted;
+    if (how === 'index') return option.index === wanted;
+    return option.text.replace(/\s+/g, ' ').trim() === wanted;
+}) || null;
+"""
+HOW = ("value", "index", "text")
+SELECT_METHODS = {"value": "select_by_value", "index": "select_by_index", "text": "select_by_visible_text"}
+
+
+def _choice(value=None, index=None, text=None):
+    given = [(how, wanted) for how, wanted in zip(HOW, (value, index, text)) if wanted is not None]
+    if len(given) != 1:
+        raise ValueError("choose an option by exactly one of value, index or text")
+    how, wanted = given[0]
+    return how, int(wanted) if how == "index" else str(wanted)
+
+
+def _no_javascript(error):
+    return isinstance(error, JavascriptException) or "javascript" in str(error.msg).lower()
+
+
+class Dropdown:
+    def __init__(self, driver, target, timeout=None):
+        #target: a locator, a PageObjects Element or a WebElement
+        self.driver = driver
+        self.target = target
+        self.timeout = timeout
+
+    def _payload(self):
+        if isinstance(self.target, WebElement):
+            return self.target
+        by, value = JsLocators.locator(self.target)
+        return {"by": by, "value": value}
+
+    def _element(self):
+        if isinstance(self.target, WebElement):
+            return self.target
+        return self.driver.find_element(*JsLocators.locator(self.target))
+
+    def select(self, value=None, index=None, text=None):
+        #returns {"value", "text", "index"} of the selected option
+        how, wanted = _choice(value, index, text)
+        try:
+            result = self.driver.execute_script(SELECT_JS, self._payload(), how, wanted)
+        except WebDriverException as e:
+            if not _no_javascript(e):
+                raise
+            return self._select_natively(how, wanted)
+        error = result.get("error")
+        if error == "missing":
+            raise NoSuchElementException("no element %s" % (JsLocators.locator(self.target),))
+        if error == "tag":
+            raise UnexpectedTagNameException("Select only works on <select> elements, not on <%s>" % result["tag"])
+        if error == "option":
+            raise NoSuchElementException("no option with %s %r, options are %r" % (how, wanted, result["options"]))
+        if error == "disabled":
+            raise NotImplementedError("You may not select a disabled option: %r" % result["text"])
+        return result
+
+    def _select_natively(self, how, wanted):
+        select = Select(self._element())
+        getattr(select, SELECT_METHODS[how])(wanted)
+        option = select.first_selected_option
+        return {"value": option.get_attribute("value"), "text": option.text.strip(),
+                "index": int(option.get_attribute("index"))}
+
+    def wait_for(self, value=None, index=None, text=None):
+        #until the option is in the list, for lists the page fills in later
+        how, wanted = _choice(value, index, text)
+        payload = self._payload()
+
+        def has_option(driver):
+            try:
+                return driver.execute_script(HAS_OPTION_JS, payload, how, wanted)
+            except WebDriverException as e:
+                if not _no_javascript(e):
+                    raise
+                return self._has_option_natively(how, wanted)
+
+        return Waits.wait_until(self.driver, has_option, self.timeout,
+                                "no option with %s %r appeared in %s" % (how, wanted, self.target))
+
+    def _has_option_natively(self, how, wanted):
+        try:
+            options = Select(self._element()).options
+        except NoSuchElementException:
+            return None
+        for position, option in enumerate(options):
+            if ((how == "index" and position == wanted) or (how == "value" and option.get_attribute("value") == wanted)
+                    or (how == "text" and " ".join(option.text.split()) == wanted)):
+                return True
+        return None
+
+    @staticmethod
+    def dependent(driver, parent, parent_choice, child, child_choice, timeout=None):
+        #state -> city style pairs: choose the parent, wait for the child's option, choose it
+        Dropdown(driver, parent, timeout).select(**parent_choice)
+        child = Dropdown(driver, child, timeout)
+        child.wait_for(**child_choice)
+        return child.select(**child_choice)
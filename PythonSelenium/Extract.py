@@ -0,0 +1,108 @@
+from selenium.common.exceptions import JavascriptException
+from selenium.webdriver.remote.webelement import WebElement
+
+import JsLocators
+
+#reads text/value/selected state and chosen attributes of many elements in one execute_script,
+#instead of one .text / get_attribute round-trip per element and field
+#
+#  Extract.records(driver, (By.NAME, "options"), attributes=["type"])
+#  -> [{"tag": "input", "text": "", "value": "option1", "selected": False, "type": "checkbox"}, ...]
+#  Extract.records(driver, driver.find_elements(By.NAME, "options"))   same, for elements already found
+#  Extract.records(driver, page.element("email"))                     one record for one element
+#  Extract.columns(rows)                -> {"text": [...], "value": [...], ...}
+#  Extract.columns(rows, numpy=True)    -> numpy arrays per column (needs numpy)
+#  Extract.table(driver, (By.ID, "customers"))  -> cell texts of every row of a table
+#
+#text is the rendered text like WebElement.text; without JavaScript (mock WebDriver) every field
+#is read through the normal WebElement calls
+RECORDS_JS = JsLocators.FIND_JS + r"""
+var target = arguments[0], attributes = arguments[1], properties = arguments[2];
+var elements = Array.isArray(target) ? target : find(target.by, target.value, document, true);
+return elements.map(function (element) {
+    var record = {
+        tag: element.tagName.toLowerCase(),
+        text: (element.innerText === undefined ? element.textContent : element.innerText).trim(),
+        value: element.value === undefined ? null : String(element.value),
+        selected: !!(element.checked || element.selected)
+    };
+    attributes.forEach(function (name) { record[name] = element.getAttribute(name); });
+    properties.forEach(function (name) { record[name] = element[name] === undefined ? null : element[name]; });
+    return record;
+});
+"""
+TABLE_JS = JsLocators.FIND_JS + r"""
+var table = arguments[0].by ? find(arguments[0].by, arguments[0].value, document, false) : arguments[0];
+if (!table) return null;
+return Array.prototype.map.call(table.querySelectorAll('tr'), function (row) {
+    return Array.prototype.map.call(row.querySelectorAll('th, td'), function (cell) {
+        return (cell.innerText === undefined ? cell.textContent : cell.innerText).trim();
+    });
+});
+"""
+
+
+def _target(target):
+    #a list of WebElements goes to the page as is, locators as {by, value}
+    if isinstance(target, (list, tuple)) and (not target or isinstance(target[0], WebElement)):
+        return list(target)
+    if isinstance(target, WebElement):
+        return target
+    by, value = JsLocators.locator(target)
+    return {"by": by, "value": value}
+
+
+def records(driver, target, attributes=(), properties=()):
+    #target: a locator, a PageObjects Element, one WebElement or the list find_elements returned
+    if isinstance(target, WebElement):
+        target = [target]
+    payload = _target(target)
+    try:
+        return driver.execute_script(RECORDS_JS, payload, list(attributes), list(properties))
+    except JavascriptException:
+        elements = payload if isinstance(payload, list) else driver.find_elements(payload["by"], payload["value"])
+        return [_record(element, attributes, properties) for element in elements]
+
+
+def _record(element, attributes, properties):
+    record = {
+        "tag": element.tag_name.lower(),
+        "text": element.text.strip(),
+        "value": element.get_property("value"),
+        "selected": element.is_selected(),
+    }
+    for name in attributes:
+        record[name] = element.get_dom_attribute(name)
+    for name in properties:
+        record[name] = element.get_property(name)
+    return record
+
+
+def columns(rows, numpy=False):
+    #list of records -> one list (or numpy array) per field, for large tables
+    names = []
+    for row in rows:
+        names.extend(name for name in row if name not in names)
+    data = {name: [row.get(name) for row in rows] for name in names}
+    if not numpy:
+        return data
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("Extract.columns(numpy=True) needs numpy: pip install numpy")
+    return {name: np.asarray(values) for name, values in data.items()}
+
+
+def table(driver, target):
+    #rows of cell texts (th and td) of a <table>, one execute_script for the whole table
+    payload = _target(target)
+    try:
+        rows = driver.execute_script(TABLE_JS, payload)
+    except JavascriptException:
+        element = payload if isinstance(payload, WebElement) else driver.find_element(payload["by"], payload["value"])
+        return [[cell.text.strip() for cell in row.find_elements("css selector", "th, td")]
+                for row in element.find_elements("css selector", "tr")]
+    if rows is None:
+        #same error find_element gives
+        driver.find_element(payload["by"], payload["value"])
+    return rows
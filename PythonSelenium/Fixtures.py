@@ -0,0 +1,89 @@
+import functools
+import os
+import re
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+#local copies of the pages the scripts drive (fixtures/*.html), for runs without network
+#SELENIUM_FIXTURES=1 -> Browser.get_driver() sends a real browser to the local copies instead of the live sites
+#SELENIUM_MOCK=1     -> no browser at all, see MockWebDriver.py
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+PAGES = {
+    "https://www.google.com/": "google.html",
+    "https://rahulshettyacademy.com/angularpractice/": "angularpractice.html",
+    "https://rahulshettyacademy.com/client": "client.html",
+    "https://rahulshettyacademy.com/client/auth/password-new": "forgot_password.html",
+    "https://rahulshettyacademy.com/dropdownsPractise/": "dropdownsPractise.html",
+    "https://www.tutorialspoint.com/selenium/practice/selenium_automation_practice.php": "practice_form.html",
+}
+
+
+def _key(url):
+    url = re.sub(r"[?#].*$", "", url.strip().lower())
+    url = re.sub(r"^https?://(www\.)?", "", url)
+    return url.rstrip("/")
+
+
+_BY_KEY = {_key(url): file for url, file in PAGES.items()}
+_BY_FILE = {file: url for url, file in PAGES.items()}
+
+
+def fixture_for(url):
+    return _BY_KEY.get(_key(url))
+
+
+def live_url(file):
+    return _BY_FILE.get(os.path.basename(file))
+
+
+def read(file):
+    with open(os.path.join(FIXTURES, file), encoding="utf-8") as reader:
+        return reader.read()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        handler = functools.partial(_QuietHandler, directory=FIXTURES)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = "http://%s:%d/" % self.httpd.server_address
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def local_url(self, url):
+        file = fixture_for(url)
+        return self.url + file if file else url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_server = None
+_lock = threading.Lock()
+
+
+def server():
+    global _server
+    with _lock:
+        if _server is None:
+            _server = FixtureServer()
+        return _server
+
+
+def use_fixtures(driver):
+    #driver.get(live url) -> driver.get(local copy); pages without a fixture still go to the live site
+    get = driver.get
+    local = server()
+
+    def get_fixture(url):
+        return get(local.local_url(url))
+
+    driver.get = get_fixture
+    return driver
@@ -0,0 +1,392 @@
+import argparse
+import json
+import os
+import sys
+
+from selenium.common.exceptions import StaleElementReferenceException
+
+import Browser
+import DomSnapshot
+from Dropdown import Dropdown
+import FormFill
+import PageObjects
+import Uploads
+import Waits
+
+#flows written as data instead of scripts, flows/*.yaml or flows/*.json
+#
+#  name: locators
+#  steps:
+#    - navigate: AngularPracticePage          a PageObjects page (its URL) or a plain URL
+#    - fill: {email: helloRohan@gmail.com}    values set in one execute_script (FormFill.py)
+#    - check: [check_me]                      check / uncheck checkboxes and radios
+#    - select: {gender: {index: 1}}           by value, index or text
+#    - click: submit_button
+#    - type: {birthday: "24032000"}           real keystrokes
+#    - clear: two_way_text
+#    - upload: {picture: Upload.jpeg}         project asset (Uploads.py)
+#    - wait: {present: "css=select[name='city'] option[value='Agra']"}    present, visible or clickable
+#    - assert: {target: success, contains: success}      waits until visible, then checks the text
+#
+#targets are element names of the page last navigated to, Page.element, or by=value with by one of
+#id, name, css, xpath, link_text, partial_link_text, class_name, tag_name
+#a flow is compiled before it runs: every locator is resolved once and given one slot (a step that
+#uses the same locator again reuses the element found first), adjacent fill/check steps become one
+#FormFill call, and every selector is parsed (and matched against the DOM snapshots when there are
+#any, see DomSnapshot.py). A broken flow fails at compile time, before a browser is started
+#  python Flows.py flows/practice.yaml --check    -> compile only, print the plan
+#  python Flows.py flows/practice.yaml --mock     -> run it
+#the Runner runs the flows of flows/ next to the scripts
+HERE = os.path.dirname(os.path.abspath(__file__))
+FOLDER = os.path.join(HERE, "flows")
+EXTENSIONS = (".yaml", ".yml", ".json")
+BY = {
+    "id": "id",
+    "name": "name",
+    "css": "css selector",
+    "xpath": "xpath",
+    "link_text": "link text",
+    "partial_link_text": "partial link text",
+    "class_name": "class name",
+    "tag_name": "tag name",
+}
+SELECT_BY = ("value", "index", "text")
+#position of the locator slot in the arguments of an op
+SLOT_ARGUMENT = {"click": 0, "clear": 0, "type": 0, "select": 0, "upload": 0, "wait": 1, "assert": 0}
+WAITS = {"present": Waits.present, "visible": Waits.visible, "clickable": Waits.clickable}
+
+
+class FlowError(ValueError):
+    pass
+
+
+def load(path):
+    with open(path, encoding="utf-8") as reader:
+        if path.endswith(".json"):
+            return json.load(reader)
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML flows need PyYAML: pip install pyyaml (or write the flow as .json)")
+        return yaml.safe_load(reader)
+
+
+def discover(folder=FOLDER):
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith(EXTENSIONS)]
+
+
+def _page(name):
+    page = getattr(PageObjects, name, None)
+    if isinstance(page, type) and issubclass(page, PageObjects.BasePage):
+        return page
+    return None
+
+
+class Program:
+    #the compiled flow: ops refer to locators by their slot in self.locators
+    def __init__(self, name):
+        self.name = name
+        self.locators = []
+        self.ops = []
+        self.steps = 0
+        self.references = 0
+        self.warnings = []
+        self._slots = {}
+        #URL of the page every slot is used on (None when not known), for the validation
+        self._pages = []
+
+    def slot(self, locator, page):
+        self.references += 1
+        if locator not in self._slots:
+            self._slots[locator] = len(self.locators)
+            self.locators.append(locator)
+            self._pages.append(page)
+        return self._slots[locator]
+
+    def describe(self):
+        lines = ["%s: %d steps -> %d ops, %d locator references -> %d locators" % (
+            self.name, self.steps, len(self.ops), self.references, len(self.locators))]
+        for op in self.ops:
+            lines.append("  " + _show(self, op))
+        lines.extend("  warning: " + warning for warning in self.warnings)
+        return "\n".join(lines)
+
+
+def _show(program, op):
+    #the op with its locator slots written out
+    kind, args = op[0], list(op[1:])
+    if kind == "fill":
+        args[0] = ", ".join("%s=%s" % tuple(program.locators[slot]) for slot, _ in args[0])
+    elif kind in SLOT_ARGUMENT:
+        args[SLOT_ARGUMENT[kind]] = "%s=%s" % tuple(program.locators[args[SLOT_ARGUMENT[kind]]])
+    return " ".join([kind] + [str(arg) for arg in args])
+
+
+class Compiler:
+    def __init__(self, spec, name):
+        if not isinstance(spec, dict) or not isinstance(spec.get("steps"), list):
+            raise FlowError("%s: a flow is a mapping with a list of steps" % name)
+        self.program = Program(spec.get("name") or name)
+        self.steps = spec["steps"]
+        self.page = _page(spec.get("page") or "")
+        self.url = self.page.URL if self.page else None
+
+    def compile(self):
+        for number, step in enumerate(self.steps, 1):
+            if not isinstance(step, dict) or len(step) != 1:
+                raise FlowError("%s step %d: one action per step, got %r" % (self.program.name, number, step))
+            (action, argument), = step.items()
+            handler = getattr(self, "_" + action, None)
+            if handler is None:
+                raise FlowError("%s step %d: unknown action %r" % (self.program.name, number, action))
+            try:
+                handler(argument)
+            except FlowError as e:
+                raise FlowError("%s step %d (%s): %s" % (self.program.name, number, action, e))
+            self.program.steps += 1
+        validate(self.program)
+        return self.program
+
+    def target(self, target):
+        #-> locator slot
+        if not isinstance(target, str) or not target:
+            raise FlowError("a target is a string, got %r" % (target,))
+        page = self.page
+        by, separator, value = target.partition("=")
+        if separator and by in BY:
+            locator = (BY[by], value)
+        else:
+            if "." in target:
+                page_name, target = target.split(".", 1)
+                page = _page(page_name)
+                if page is None:
+                    raise FlowError("no page %s in PageObjects" % page_name)
+            element = getattr(page, target, None) if page else None
+            if not isinstance(element, PageObjects.Element):
+                raise FlowError("no element %r on %s" % (target, page.__name__ if page else "any page, navigate first"))
+            locator = element.locator()
+            if page is not self.page and page.URL:
+                return self.program.slot(tuple(locator), page.URL)
+        return self.program.slot(tuple(locator), self.url)
+
+    def _targets(self, argument):
+        return [self.target(t) for t in (argument if isinstance(argument, list) else [argument])]
+
+    def _mapping(self, argument):
+        if not isinstance(argument, dict):
+            raise FlowError("expected a mapping of target: value, got %r" % (argument,))
+        return argument.items()
+
+    def _emit(self, *op):
+        self.program.ops.append(op)
+
+    def _fill_batch(self, fields):
+        #adjacent fill/check/uncheck steps share one FormFill call
+        ops = self.program.ops
+        if ops and ops[-1][0] == "fill":
+            ops[-1][1].extend(fields)
+        else:
+            self._emit("fill", fields)
+
+    def _navigate(self, argument):
+        page = _page(argument) if isinstance(argument, str) else None
+        if page is not None:
+            if not page.URL:
+                raise FlowError("%s has no URL, it is reached from another page" % argument)
+            self.page, self.url = page, page.URL
+        elif isinstance(argument, str) and argument.startswith("http"):
+            self.page, self.url = None, argument
+        else:
+            raise FlowError("navigate to a PageObjects page or an http(s) URL, got %r" % (argument,))
+        self._emit("navigate", self.url)
+
+    def _fill(self, argument):
+        self._fill_batch([(self.target(t), "" if v is None else str(v)) for t, v in self._mapping(argument)])
+
+    def _check(self, argument):
+        self._fill_batch([(slot, FormFill.CHECK) for slot in self._targets(argument)])
+
+    def _uncheck(self, argument):
+        self._fill_batch([(slot, FormFill.UNCHECK) for slot in self._targets(argument)])
+
+    def _click(self, argument):
+        for slot in self._targets(argument):
+            self._emit("click", slot)
+
+    def _clear(self, argument):
+        for slot in self._targets(argument):
+            self._emit("clear", slot)
+
+    def _type(self, argument):
+        for target, text in self._mapping(argument):
+            self._emit("type", self.target(target), str(text))
+
+    def _select(self, argument):
+        for target, choice in self._mapping(argument):
+            if not isinstance(choice, dict) or len(choice) != 1 or next(iter(choice)) not in SELECT_BY:
+                raise FlowError("select %s by one of %s, got %r" % (target, ", ".join(SELECT_BY), choice))
+            (how, value), = choice.items()
+            self._emit("select", self.target(target), how, int(value) if how == "index" else str(value))
+
+    def _upload(self, argument):
+        for target, name in self._mapping(argument):
+            try:
+                Uploads.asset(name)
+            except FileNotFoundError as e:
+                raise FlowError(str(e))
+            self._emit("upload", self.target(target), name)
+
+    def _wait(self, argument):
+        for kind, target in self._mapping(argument):
+            if kind not in WAITS:
+                raise FlowError("wait for one of %s, got %r" % (", ".join(WAITS), kind))
+            self._emit("wait", kind, self.target(target))
+
+    def _assert(self, argument):
+        if not isinstance(argument, dict) or "target" not in argument:
+            raise FlowError("assert needs a target (and contains or equals)")
+        self._emit("assert", self.target(argument["target"]), argument.get("contains"), argument.get("equals"))
+
+
+def compile_flow(spec, name="flow"):
+    return Compiler(spec, name).compile()
+
+
+def compile_file(path):
+    return compile_flow(load(path), os.path.splitext(os.path.basename(path))[0])
+
+
+def _syntax_error(by, value):
+    #None when the selector parses (or lxml is not installed to tell)
+    try:
+        from lxml import etree
+    except ImportError:
+        return None
+    try:
+        if by == "xpath":
+            etree.XPath(value)
+        elif by == "css selector":
+            from cssselect import GenericTranslator
+            GenericTranslator().css_to_xpath(value)
+    except ImportError:
+        return None
+    except Exception as e:
+        return "%s: %s" % (type(e).__name__, e)
+    return None
+
+
+def validate(program, folder=DomSnapshot.SNAPSHOTS):
+    #invalid selectors fail the compile; a locator that matches nothing in the page's snapshot is a warning,
+    #the snapshot may be older than the page
+    import LocatorCheck
+    evaluator = LocatorCheck.Evaluator()
+    for (by, value), url in zip(program.locators, program._pages):
+        error = _syntax_error(by, value)
+        if error:
+            raise FlowError("%s: invalid selector %s=%s (%s)" % (program.name, by, value, error))
+        if url is None:
+            continue
+        path = DomSnapshot.snapshot_path(url, folder)
+        if not os.path.exists(path):
+            continue
+        page = DomSnapshot.page_name(url)
+        result = evaluator.evaluate({"by": by, "value": value, "method": "find_element", "page": page},
+                                    {page: [path]})
+        if result["status"] in ("broken", "invalid"):
+            program.warnings.append("%s=%s is %s on the %s snapshot" % (by, value, result["status"], page))
+
+
+class Executor:
+    def __init__(self, program, driver):
+        self.program = program
+        self.driver = driver
+        #slot -> WebElement, dropped when the flow navigates
+        self.elements = {}
+
+    def element(self, slot):
+        if slot not in self.elements:
+            self.elements[slot] = self.driver.find_element(*self.program.locators[slot])
+        return self.elements[slot]
+
+    def on_element(self, slot, action):
+        try:
+            return action(self.element(slot))
+        except StaleElementReferenceException:
+            #the page re-rendered the element since it was found
+            self.elements.pop(slot, None)
+            return action(self.element(slot))
+
+    def run(self):
+        for op in self.program.ops:
+            getattr(self, "_" + op[0])(*op[1:])
+
+    def _navigate(self, url):
+        self.elements.clear()
+        self.driver.get(url)
+
+    def _fill(self, fields):
+        FormFill.fill(self.driver, [(self.program.locators[slot], value) for slot, value in fields])
+
+    def _click(self, slot):
+        self.on_element(slot, lambda element: element.click())
+
+    def _clear(self, slot):
+        self.on_element(slot, lambda element: element.clear())
+
+    def _type(self, slot, text):
+        self.on_element(slot, lambda element: element.send_keys(text))
+
+    def _select(self, slot, how, value):
+        Dropdown(self.driver, self.program.locators[slot]).select(**{how: value})
+
+    def _upload(self, slot, name):
+        self.on_element(slot, lambda element: Uploads.upload(self.driver, element, name))
+
+    def _wait(self, kind, slot):
+        self.elements[slot] = WAITS[kind](self.driver, *self.program.locators[slot])
+
+    def _assert(self, slot, contains, equals):
+        text = Waits.visible(self.driver, *self.program.locators[slot]).text
+        print(text)
+        if contains is not None:
+            assert str(contains) in text, "%r not in %r" % (contains, text)
+        if equals is not None:
+            assert text.strip() == str(equals), "%r != %r" % (text.strip(), equals)
+
+
+def run_file(path):
+    #compiles first, so a broken flow never starts a browser
+    program = compile_file(path)
+    for warning in program.warnings:
+        print("warning:", warning)
+    driver = Browser.get_driver()
+    Executor(program, driver).run()
+    Waits.finish(driver)
+    return program
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and run declarative flows")
+    parser.add_argument("flows", nargs="+", help="flow files (.yaml, .yml, .json)")
+    parser.add_argument("--check", action="store_true", help="only compile and print the plan")
+    site = parser.add_mutually_exclusive_group()
+    site.add_argument("--fixtures", action="store_true", help="serve the pages from fixtures/")
+    site.add_argument("--mock", action="store_true", help="use the in-process mock WebDriver")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        os.environ["SELENIUM_FIXTURES"] = "1"
+    if args.mock:
+        os.environ["SELENIUM_MOCK"] = "1"
+    for path in args.flows:
+        if args.check:
+            print(compile_file(path).describe())
+        else:
+            run_file(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
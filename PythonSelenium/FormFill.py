@@ -0,0 +1,141 @@
+from selenium.common.exceptions import JavascriptException, NoSuchElementException, WebDriverException
+from selenium.webdriver.support.select import Select
+
+import JsLocators
+
+#fills a whole form in one execute_script instead of a find_element + send_keys/click per field
+#
+#  FormFill.fill(driver, [
+#      ((By.NAME, "email"), "helloRohan@gmail.com"),     text/textarea/select value
+#      (PracticeFormPage.female, FormFill.CHECK),         make sure a checkbox/radio is checked
+#      ((By.ID, "submit"), FormFill.CLICK),               plain click
+#      (PracticeFormPage.picture, FormFill.Native(path)), real keystrokes through send_keys
+#  ])
+#
+#input and change events are dispatched for every field set from JavaScript. The values are read
+#back in the same call; fields whose value did not stick (date inputs, masked inputs, ...), fields
+#whose script failed and file inputs are done again with native send_keys (Select for a <select>)
+CLICK = "__click__"
+CHECK = "__check__"
+UNCHECK = "__uncheck__"
+
+FILL_JS = JsLocators.FIND_JS + r"""
+var fields = arguments[0];
+var results = [];
+function setValue(element, value) {
+    var prototype = element instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+        : element instanceof HTMLSelectElement ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+    //the native setter, so frameworks that track the value (React, Angular) see the change
+    Object.getOwnPropertyDescriptor(prototype, 'value').set.call(element, value);
+}
+function fire(element, type) {
+    element.dispatchEvent(new Event(type, {bubbles: true}));
+}
+function apply(field) {
+    var element = find(field.by, field.value, document, false);
+    if (!element) return {status: 'missing'};
+    if (field.native || (element.tagName === 'INPUT' && element.type === 'file')) return {status: 'native'};
+    if (field.action === 'click') {
+        element.click();
+        return {status: 'ok'};
+    }
+    if (field.action === 'check' || field.action === 'uncheck') {
+        var wanted = field.action === 'check';
+        if (element.checked !== wanted) element.click();
+        return {status: 'ok', actual: element.checked === wanted};
+    }
+    var actual;
+    element.focus();
+    if (element instanceof HTMLSelectElement) {
+        var options = Array.prototype.slice.call(element.options);
+        var option = options.filter(function (o) { return o.value === field.input; })[0]
+            || options.filter(function (o) { return o.text.trim() === field.input; })[0];
+        if (option) setValue(element, option.value);
+        actual = option ? field.input : element.value;
+    } else {
+        setValue(element, field.input);
+        actual = element.value;
+    }
+    fire(element, 'input');
+    fire(element, 'change');
+    element.blur();
+    return {status: 'ok', actual: actual};
+}
+for (var i = 0; i < fields.length; i++) {
+    //one broken field must not stop the rest, the fields before it are already done
+    try {
+        results.push(apply(fields[i]));
+    } catch (e) {
+        results.push({status: 'error', message: String(e)});
+    }
+}
+return results;
+"""
+
+
+class Native:
+    #forces real keystrokes for a value (file uploads, inputs with key handlers)
+    def __init__(self, value):
+        self.value = value
+
+
+def _payload(target, value):
+    by, selector = JsLocators.locator(target)
+    field = {"by": by, "value": selector, "native": isinstance(value, Native), "action": "set", "input": None}
+    if value == CLICK:
+        field["action"] = "click"
+    elif value in (CHECK, UNCHECK):
+        field["action"] = "check" if value == CHECK else "uncheck"
+    elif not field["native"]:
+        field["input"] = str(value)
+    return field
+
+
+def _native(driver, target, value):
+    element = driver.find_element(*JsLocators.locator(target))
+    if isinstance(value, Native):
+        value = value.value
+    if value == CLICK:
+        element.click()
+    elif value in (CHECK, UNCHECK):
+        if element.is_selected() != (value == CHECK):
+            element.click()
+    elif element.tag_name.lower() == "select":
+        #clear() is not allowed on a <select>, the option is chosen by value or text like FILL_JS does
+        select = Select(element)
+        try:
+            select.select_by_value(str(value))
+        except NoSuchElementException:
+            select.select_by_visible_text(str(value))
+    else:
+        if element.get_attribute("type") != "file":
+            element.clear()
+        element.send_keys(str(value))
+
+
+def fill(driver, fields, verify=True):
+    #returns how each field was filled: "script" or "native" (send_keys fallback)
+    if isinstance(fields, dict):
+        fields = list(fields.items())
+    payload = [_payload(target, value) for target, value in fields]
+    try:
+        results = driver.execute_script(FILL_JS, payload)
+    except WebDriverException as e:
+        #FILL_JS catches the errors of each field, so this means no JavaScript at all; anything else
+        #may come after some fields were set (and clicked), doing them all again is not safe
+        if not isinstance(e, JavascriptException) and "javascript" not in str(e.msg).lower():
+            raise
+        results = [{"status": "native"}] * len(fields)
+
+    report = []
+    for (target, value), field, result in zip(fields, payload, results):
+        status = result.get("status")
+        mismatch = verify and status == "ok" and field["action"] == "set" and result.get("actual") != field["input"]
+        unchecked = verify and status == "ok" and field["action"] in ("check", "uncheck") and not result.get("actual")
+        if status in ("native", "missing", "error") or mismatch or unchecked:
+            #a missing field gets the usual NoSuchElementException from find_element
+            _native(driver, target, value)
+            report.append("native")
+        else:
+            report.append("script")
+    return report
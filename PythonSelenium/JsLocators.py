@@ -0,0 +1,39 @@
+#selenium locators resolved inside the page, for helpers that do a whole job in one execute_script
+#FIND_JS defines find(by, value, root, all) for every By strategy; by/value are the plain strings
+#selenium uses ("id", "xpath", "css selector", ...)
+FIND_JS = r"""
+function find(by, value, root, all) {
+    root = root || document;
+    var doc = root.ownerDocument || root;
+    var found;
+    if (by === 'xpath') {
+        var snapshot = doc.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        found = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) {
+            if (snapshot.snapshotItem(i).nodeType === 1) found.push(snapshot.snapshotItem(i));
+        }
+    } else if (by === 'link text' || by === 'partial link text') {
+        found = Array.prototype.filter.call(root.querySelectorAll('a'), function (a) {
+            var text = (a.innerText || a.textContent).trim();
+            return by === 'link text' ? text === value : text.indexOf(value) !== -1;
+        });
+    } else {
+        var css = value;
+        if (by === 'id') css = '[id="' + CSS.escape(value) + '"]';
+        else if (by === 'name') css = '[name="' + CSS.escape(value) + '"]';
+        else if (by === 'class name') css = '.' + CSS.escape(value);
+        else if (by === 'tag name') css = value;
+        if (!all) return root.querySelector(css);
+        found = Array.prototype.slice.call(root.querySelectorAll(css));
+    }
+    return all ? found : (found[0] || null);
+}
+"""
+
+
+def locator(target):
+    #(By.X, "value") tuples and PageObjects.Element declarations both work
+    if hasattr(target, "locator"):
+        target = target.locator()
+    by, value = target
+    return [by, value]
@@ -0,0 +1,189 @@
+import argparse
+import ast
+import inspect
+import json
+import os
+import re
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+import DomSnapshot
+import PageObjects
+
+#checks every locator of a script against the saved DOM snapshots, no browser needed
+#  python DomSnapshot.py --script Practice.py     -> capture the pages once (SELENIUM_MOCK=1 works too)
+#  python LocatorCheck.py Locators.py LocatorsExtension.py Practice.py
+#  python LocatorCheck.py --capture Practice.py   -> capture first, then check
+#a script's locators are its (By.X, "literal") arguments and the Element declarations of the
+#PageObjects pages it imports. Each one is evaluated on the latest snapshot of its page:
+#  ok         exactly one match (or any number for find_elements / many=True)
+#  ambiguous  a find_element style locator that matches several elements, the first one wins
+#  broken     no match on any page of the script
+#  invalid    the selector does not parse
+#positional XPath ("(//input[@type='text'])[3]") is flagged as fragile on top of its status
+POSITIONAL = re.compile(r"\)\s*\[\s*\d+\s*\]|\[\s*\d+\s*\]")
+MANY = ("find_elements", "all_visible")
+
+
+def page_classes(script):
+    #PageObjects pages a script imports, every page for PageObjects.py itself
+    with open(script, encoding="utf-8") as reader:
+        tree = ast.parse(reader.read(), script)
+    names = []
+    if os.path.basename(script) == "PageObjects.py":
+        names = [name for name, value in vars(PageObjects).items() if _is_page(value)]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == "PageObjects":
+            names.extend(alias.name for alias in node.names)
+    pages = [page for page in (getattr(PageObjects, name, None) for name in names) if _is_page(page)]
+    #pages reached from an imported page (ClientLoginPage -> ForgotPasswordPage) are used as well
+    for page in pages:
+        for name in sorted(_referenced(page)):
+            value = getattr(PageObjects, name, None)
+            if _is_page(value) and value not in pages:
+                pages.append(value)
+    return pages
+
+
+def _is_page(value):
+    return isinstance(value, type) and issubclass(value, PageObjects.BasePage) and value is not PageObjects.BasePage
+
+
+def _referenced(page):
+    try:
+        return set(re.findall(r"\b[A-Z]\w+Page\b", inspect.getsource(page)))
+    except (OSError, TypeError):
+        return set()
+
+
+def script_locators(script):
+    locators = [dict(locator, source="%s:%d" % (os.path.basename(script), locator["line"]), page=None)
+                for locator in DomSnapshot.find_locators(script)]
+    for page in page_classes(script):
+        for name, element in vars(page).items():
+            if isinstance(element, PageObjects.Element):
+                locators.append({
+                    "line": None,
+                    "method": "find_elements" if element.many else "find_element",
+                    "by": element.by,
+                    "value": element.value,
+                    "source": "%s.%s" % (page.__name__, name),
+                    "page": DomSnapshot.page_name(page.URL) if page.URL else None,
+                })
+    return locators
+
+
+def script_pages(script, folder=DomSnapshot.SNAPSHOTS):
+    #{page name: [snapshot paths]}: every version the script was recorded on, the latest snapshot of the
+    #other pages it opens
+    pages = DomSnapshot.pages_of(script, folder)
+    urls = DomSnapshot.find_urls(script) + [page.URL for page in page_classes(script) if page.URL]
+    for url in urls:
+        path = DomSnapshot.snapshot_path(url, folder)
+        if os.path.exists(path):
+            pages.setdefault(DomSnapshot.page_name(url), [path])
+    return pages
+
+
+class Evaluator:
+    #parses every snapshot once and keeps its id/name/class index
+    def __init__(self):
+        self._indexes = {}
+
+    def index(self, path):
+        if path not in self._indexes:
+            self._indexes[path] = DomSnapshot.SnapshotIndex(DomSnapshot.load(path))
+        return self._indexes[path]
+
+    def evaluate(self, locator, pages):
+        candidates = {locator["page"]: pages[locator["page"]]} if locator["page"] in pages else pages
+        result = dict(locator, matches={}, positional=bool(locator["by"] == By.XPATH
+                                                            and POSITIONAL.search(locator["value"])))
+        if not candidates:
+            result["status"] = "no snapshot"
+            return result
+        try:
+            for page, paths in candidates.items():
+                #an element that only exists after an interaction is in a later version of the page
+                counts = [len(self.index(path).find(locator["by"], locator["value"])) for path in paths]
+                result["matches"][page] = next((count for count in counts if count), 0)
+        except Exception as e:
+            #lxml raises its own XPath/selector errors
+            result.update(status="invalid", error="%s: %s" % (type(e).__name__, e))
+            return result
+        found = {page: count for page, count in result["matches"].items() if count}
+        if not found:
+            result["status"] = "broken"
+        elif locator["method"] not in MANY and all(count > 1 for count in found.values()):
+            result["status"] = "ambiguous"
+        else:
+            result["status"] = "ok"
+        return result
+
+    def duplicate_ids(self, pages):
+        duplicates = {}
+        for page, paths in pages.items():
+            ids = sorted({name for path in paths for name in self.index(path).duplicate_ids()})
+            if ids:
+                duplicates[page] = ids
+        return duplicates
+
+
+def check(scripts, folder=DomSnapshot.SNAPSHOTS):
+    evaluator = Evaluator()
+    start = time.perf_counter()
+    results = []
+    duplicates = {}
+    for script in scripts:
+        pages = script_pages(script, folder)
+        duplicates.update(evaluator.duplicate_ids(pages))
+        for locator in script_locators(script):
+            results.append(dict(evaluator.evaluate(locator, pages), script=os.path.basename(script)))
+    return {
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+        "locators": results,
+        "duplicate_ids": duplicates,
+        "counts": {status: sum(r["status"] == status for r in results)
+                   for status in ("ok", "ambiguous", "broken", "invalid", "no snapshot")},
+    }
+
+
+def print_report(report):
+    for result in report["locators"]:
+        if result["status"] == "ok" and not result["positional"]:
+            continue
+        matches = ", ".join("%s: %d" % item for item in result["matches"].items())
+        print("%-10s %-34s %s=%s  [%s]%s" % (
+            result["status"], result["source"], result["by"], result["value"], matches,
+            "  positional, fragile" if result["positional"] else ""))
+        if result.get("error"):
+            print("           ", result["error"])
+    for page, ids in report["duplicate_ids"].items():
+        print("duplicate ids on %s: %s" % (page, ", ".join(ids)))
+    counts = report["counts"]
+    print("%d locators in %.1fms: %s" % (len(report["locators"]), report["ms"],
+                                         ", ".join("%d %s" % (n, s) for s, n in counts.items() if n)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the locators of scripts against saved DOM snapshots")
+    parser.add_argument("scripts", nargs="+")
+    parser.add_argument("--capture", action="store_true", help="run the scripts and capture their pages first")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    if args.capture:
+        for script in args.scripts:
+            DomSnapshot.record(script)
+    report = check(args.scripts)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as writer:
+            json.dump(report, writer, indent=2)
+    return 1 if report["counts"]["broken"] or report["counts"]["invalid"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import atexit
+import json
+import os
+import statistics
+import time
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+#times every driver.find_element / find_elements call by locator strategy
+#PROFILE_LOCATORS=1 -> Browser.get_driver() attaches the profiler, the Runner adds the lookups of each
+#flow to reports/locators-*.json and a plain script run prints the report when it exits
+#a failed lookup followed by another lookup of the same locator (Waits polling, a manual retry)
+#is counted as a retry of that lookup instead of a separate one
+ENABLED = os.environ.get("PROFILE_LOCATORS") == "1"
+REPORTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+
+
+class LocatorProfiler:
+    def __init__(self):
+        self.records = []
+        self._pending = {}
+
+    def attach(self, driver):
+        if getattr(driver, "_locator_profiler", None) is self:
+            return driver
+        find_element = driver.find_element
+        find_elements = driver.find_elements
+
+        def profiled_find_element(by=By.ID, value=None):
+            return self._timed("find_element", find_element, by, value)
+
+        def profiled_find_elements(by=By.ID, value=None):
+            return self._timed("find_elements", find_elements, by, value)
+
+        driver.find_element = profiled_find_element
+        driver.find_elements = profiled_find_elements
+        driver._locator_profiler = self
+        return driver
+
+    def _timed(self, method, find, by, value):
+        key = (by, value)
+        start = time.perf_counter()
+        try:
+            result = find(by, value)
+        except NoSuchElementException:
+            self._record(method, by, value, start, "not found")
+            self._pending[key] = self._pending.get(key, 0) + 1
+            raise
+        #find_elements never raises, an empty list is its "not found"
+        self._record(method, by, value, start, "found" if result else "not found")
+        if result:
+            self._pending.pop(key, None)
+        else:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        return result
+
+    def _record(self, method, by, value, start, status):
+        self.records.append({
+            "method": method,
+            "strategy": by,
+            "selector": value,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+            "retries": self._pending.get((by, value), 0),
+            "status": status,
+        })
+
+    def drain(self, **tags):
+        records, self.records = self.records, []
+        self._pending = {}
+        for record in records:
+            record.update(tags)
+        return records
+
+
+def report(records, top=15):
+    by_locator = {}
+    by_strategy = {}
+    for record in records:
+        by_locator.setdefault((record["strategy"], record["selector"]), []).append(record)
+        by_strategy.setdefault(record["strategy"], []).append(record["ms"])
+
+    locators = []
+    for (strategy, selector), lookups in by_locator.items():
+        times = [lookup["ms"] for lookup in lookups]
+        locators.append({
+            "strategy": strategy,
+            "selector": selector,
+            "flows": sorted({lookup.get("flow", "") for lookup in lookups} - {""}),
+            "lookups": len(lookups),
+            "total_ms": round(sum(times), 3),
+            "mean_ms": round(statistics.mean(times), 3),
+            "max_ms": round(max(times), 3),
+            "retries": max(lookup["retries"] for lookup in lookups),
+            "not_found": sum(lookup["status"] == "not found" for lookup in lookups),
+        })
+    locators.sort(key=lambda l: l["mean_ms"], reverse=True)
+
+    strategies = {}
+    for strategy, times in by_strategy.items():
+        strategies[strategy] = {
+            "lookups": len(times),
+            "mean_ms": round(statistics.mean(times), 3),
+            "median_ms": round(statistics.median(times), 3),
+            "max_ms": round(max(times), 3),
+        }
+    return {"lookups": len(records), "by_strategy": strategies, "slowest": locators[:top], "locators": locators}
+
+
+def write_report(data, path=None):
+    if path is None:
+        path = os.path.join(REPORTS, "locators-%s.json" % time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(data, writer, indent=2)
+    return path
+
+
+def print_report(data):
+    print("%d lookups" % data["lookups"])
+    for strategy, stats in sorted(data["by_strategy"].items(), key=lambda s: s[1]["mean_ms"]):
+        print("  %-18s %4d lookups  mean %8.2fms  median %8.2fms" % (
+            strategy, stats["lookups"], stats["mean_ms"], stats["median_ms"]))
+    print("slowest locators:")
+    for locator in data["slowest"]:
+        print("  %8.2fms x%-3d retries %-2d %s=%s" % (
+            locator["mean_ms"], locator["lookups"], locator["retries"], locator["strategy"], locator["selector"]))
+
+
+profiler = LocatorProfiler()
+
+
+def attach(driver):
+    return profiler.attach(driver)
+
+
+def _report_at_exit():
+    if profiler.records:
+        data = report(profiler.drain())
+        print_report(data)
+        print("locator report:", write_report(data))
+
+
+if ENABLED:
+    atexit.register(_report_at_exit)
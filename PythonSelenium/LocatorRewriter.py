@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+from selenium.webdriver.common.by import By
+
+import DomSnapshot
+import LocatorCheck
+
+#proposes By.ID / By.CSS_SELECTOR replacements for the By.XPATH locators of a script (see doc.txt:
+#ID is faster than CSS, CSS is faster than XPath)
+#  python LocatorRewriter.py Practice.py Locators.py [--snapshot snapshots/x.html] [--measure]
+#  python LocatorRewriter.py Locators.py --snapshot https://rahulshettyacademy.com/angularpractice/=saved.html
+#  python LocatorRewriter.py PageObjects.py      -> the Element declarations of every page
+#a script's locators are its (By.X, "literal") arguments and the Element declarations of the pages it
+#imports, like LocatorCheck.py; an Element is only checked against the snapshots of its page's URL.
+#A --snapshot belongs to the page of its URL=, or to the page it is named after (snapshots/<page>.html,
+#snapshots/<page>/<version>.html) and is only used for the scripts that open that page
+#a proposal comes either from translating the XPath (the simple //tag[@attr='v'] kind) or from
+#the element the XPath finds in the saved DOM snapshot (its id, name or attributes); it is only
+#marked verified when it finds the same element(s) in the snapshot
+#--measure opens each snapshot in a browser and times both lookups inside the page
+STEP = re.compile(r"(//|/)([A-Za-z][\w-]*|\*)")
+PREDICATE = re.compile(
+    r"\[\s*(?:"
+    r"(?P<pos>\d+)"
+    r"|@(?P<attr>[\w-]+)\s*(?:=\s*(?P<q1>'[^']*'|\"[^\"]*\"))?"
+    r"|(?P<fn>contains|starts-with)\(\s*@(?P<fattr>[\w-]+)\s*,\s*(?P<q2>'[^']*'|\"[^\"]*\")\s*\)"
+    r")\s*\]")
+SNAPSHOT_ARG = re.compile(r"(https?://[^=]+)=(.+)")
+VERSION = re.compile(r"[0-9a-f]{12}")
+DISTINCT_ATTRIBUTES = ("name", "type", "value", "placeholder", "for", "href", "title", "aria-label")
+
+MEASURE_JS = """
+var by = arguments[0], selector = arguments[1], rounds = arguments[2];
+function find() {
+    if (by === 'id') return document.getElementById(selector);
+    if (by === 'xpath') return document.evaluate(selector, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return document.querySelector(selector);
+}
+if (!find()) return null;
+var start = performance.now();
+for (var i = 0; i < rounds; i++) find();
+return (performance.now() - start) * 1000 / rounds;
+"""
+
+
+def css_string(text):
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def translate(xpath):
+    #XPath -> equivalent CSS selector, or None when the XPath needs something CSS cannot express
+    #(axes, text(), positions across the whole document, ...)
+    xpath = xpath.strip()
+    wrapped = re.fullmatch(r"\((.*)\)\s*(?:\[\s*(\d+)\s*\])?", xpath, re.S)
+    if wrapped:
+        #(path)[1] is the first match in document order, which is what querySelector returns too
+        if wrapped.group(2) not in (None, "1"):
+            return None
+        xpath = wrapped.group(1).strip()
+    parts = []
+    pos = 0
+    while pos < len(xpath):
+        step = STEP.match(xpath, pos)
+        if not step:
+            return None
+        pos = step.end()
+        axis, tag = step.groups()
+        css = "" if tag == "*" else tag
+        positional_allowed = True
+        while pos < len(xpath) and xpath[pos] == "[":
+            predicate = PREDICATE.match(xpath, pos)
+            if not predicate:
+                return None
+            pos = predicate.end()
+            if predicate.group("pos"):
+                #div[2] is the second div child, :nth-of-type(2); after another predicate it is not
+                if tag == "*" or not positional_allowed:
+                    return None
+                css += ":nth-of-type(%s)" % predicate.group("pos")
+            elif predicate.group("attr"):
+                quoted = predicate.group("q1")
+                if quoted is None:
+                    css += "[%s]" % predicate.group("attr")
+                else:
+                    css += "[%s=%s]" % (predicate.group("attr"), css_string(quoted[1:-1]))
+            else:
+                operator = "*=" if predicate.group("fn") == "contains" else "^="
+                css += "[%s%s%s]" % (predicate.group("fattr"), operator, css_string(predicate.group("q2")[1:-1]))
+            positional_allowed = False
+        if not css:
+            css = "*"
+        if not parts:
+            parts.append(css if axis == "//" else css + ":root")
+        else:
+            parts.append((" " if axis == "//" else " > ") + css)
+    if not parts:
+        return None
+    return "".join(parts)
+
+
+def id_of(css):
+    match = re.fullmatch(r"(?:[A-Za-z][\w-]*|\*)?\[id='([^'\\]*)'\]", css or "")
+    return match.group(1) if match else None
+
+
+def dom_candidates(tree, element):
+    #selectors built from the element itself, kept only when they match nothing else in the page
+    tag = element.tag
+    element_id = element.get("id")
+    if element_id:
+        yield By.ID, element_id
+    attributes = [(a, element.get(a)) for a in DISTINCT_ATTRIBUTES if element.get(a)]
+    for attr, value in attributes:
+        yield By.CSS_SELECTOR, "%s[%s=%s]" % (tag, attr, css_string(value))
+    for i, (attr, value) in enumerate(attributes):
+        for attr2, value2 in attributes[i + 1:]:
+            yield By.CSS_SELECTOR, "%s[%s=%s][%s=%s]" % (tag, attr, css_string(value), attr2, css_string(value2))
+    parent = element.getparent()
+    if parent is not None and parent.get("id"):
+        index = [c for c in parent if c.tag == tag].index(element) + 1
+        yield By.CSS_SELECTOR, "#%s > %s:nth-of-type(%d)" % (parent.get("id"), tag, index)
+
+
+def same(first, second, method):
+    if method == "find_element":
+        return bool(first) and bool(second) and DomSnapshot.element_path(first[0]) == DomSnapshot.element_path(second[0])
+    return [DomSnapshot.element_path(e) for e in first] == [DomSnapshot.element_path(e) for e in second]
+
+
+def propose(locator, snapshots):
+    #snapshots: [(path, lxml tree)], the first one where the XPath matches is used
+    xpath = locator["value"]
+    css = translate(xpath)
+    proposal = {"line": locator["line"], "method": locator["method"], "xpath": xpath,
+                "by": None, "value": None, "verified": False, "snapshot": None, "source": None}
+    if css:
+        element_id = id_of(css)
+        proposal.update(by=By.ID if element_id else By.CSS_SELECTOR, value=element_id or css, source="translated")
+
+    for path, tree in snapshots:
+        original = DomSnapshot.resolve(tree, By.XPATH, xpath)
+        if not original:
+            continue
+        proposal["snapshot"] = path
+        tried = []
+        if css:
+            tried.append((proposal["by"], proposal["value"], "translated"))
+            if proposal["by"] == By.ID:
+                tried.append((By.CSS_SELECTOR, css, "translated"))
+        if locator["method"] == "find_element" or len(original) == 1:
+            tried.extend((by, value, "snapshot") for by, value in dom_candidates(tree, original[0]))
+        for by, value, source in tried:
+            try:
+                found = DomSnapshot.resolve(tree, by, value)
+            except Exception:
+                continue
+            if source == "snapshot" and len(found) != len(original):
+                continue
+            if same(original, found, locator["method"]):
+                proposal.update(by=by, value=value, verified=True, source=source)
+                return proposal
+        return proposal
+    return proposal
+
+
+def measure(driver, proposals, rounds=200):
+    #time both lookups inside the page, so the WebDriver round-trip does not hide the difference
+    by_snapshot = {}
+    for proposal in proposals:
+        if proposal["verified"]:
+            by_snapshot.setdefault(proposal["snapshot"], []).append(proposal)
+    for path, items in by_snapshot.items():
+        driver.get("file://" + os.path.abspath(path))
+        for proposal in items:
+            before = driver.execute_script(MEASURE_JS, By.XPATH, proposal["xpath"], rounds)
+            after = driver.execute_script(MEASURE_JS, proposal["by"], proposal["value"], rounds)
+            proposal["xpath_us"] = before
+            proposal["proposed_us"] = after
+            if before and after:
+                proposal["speedup"] = round(before / after, 2)
+
+
+def bind_snapshots(values):
+    #--snapshot values -> {page name: [paths]}
+    bound = {}
+    for value in values:
+        match = SNAPSHOT_ARG.fullmatch(value)
+        if match:
+            page, path = DomSnapshot.page_name(match.group(1)), match.group(2)
+        else:
+            path = value
+            page = os.path.splitext(os.path.basename(path))[0]
+            if VERSION.fullmatch(page):
+                page = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        bound.setdefault(page, []).append(path)
+    return bound
+
+
+def script_page_names(script):
+    urls = DomSnapshot.find_urls(script) + [page.URL for page in LocatorCheck.page_classes(script) if page.URL]
+    return {DomSnapshot.page_name(url) for url in urls}
+
+
+_trees = {}
+
+
+def _snapshot(path):
+    if path not in _trees:
+        _trees[path] = DomSnapshot.load(path)
+    return path, _trees[path]
+
+
+def rewrite_script(script, extra_snapshots=None):
+    #extra_snapshots: {page name: [paths]} from bind_snapshots(), only the pages of this script are used
+    pages = LocatorCheck.script_pages(script)
+    for page, paths in (extra_snapshots or {}).items():
+        if page in pages or page in script_page_names(script):
+            pages[page] = pages.get(page, []) + [path for path in paths if os.path.exists(path)]
+    proposals = []
+    for locator in LocatorCheck.script_locators(script):
+        if locator["by"] != By.XPATH:
+            continue
+        if locator["page"]:
+            paths = pages.get(locator["page"], [])
+        else:
+            #a literal locator may be on any page the script opens
+            paths = [path for page_paths in pages.values() for path in page_paths]
+        snapshots = [_snapshot(path) for path in paths]
+        proposals.append(dict(propose(locator, snapshots), script=os.path.basename(script),
+                              location=locator["source"]))
+    return proposals
+
+
+def print_proposals(proposals):
+    for p in proposals:
+        if not p["by"]:
+            print("%s  %s\n    no faster locator found" % (p["location"], p["xpath"]))
+            continue
+        state = "verified" if p["verified"] else ("NOT verified" if p["snapshot"] else "no snapshot")
+        speed = " %.1fx faster" % p["speedup"] if p.get("speedup") else ""
+        print("%s  %s\n    -> By.%s, %r  (%s, %s%s)" % (
+            p["location"], p["xpath"], p["by"].upper().replace(" ", "_"), p["value"],
+            p["source"], state, speed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Propose By.ID / By.CSS_SELECTOR for the XPath locators of scripts")
+    parser.add_argument("scripts", nargs="+")
+    parser.add_argument("--snapshot", action="append", default=[],
+                        help="extra DOM snapshot to verify against, URL=PATH or a PATH named after its page")
+    parser.add_argument("--measure", action="store_true", help="time the lookups in a browser")
+    parser.add_argument("--json", help="also write the proposals to this file")
+    args = parser.parse_args(argv)
+
+    extra = bind_snapshots(args.snapshot)
+    known = set().union(*(script_page_names(script) for script in args.scripts))
+    for page in sorted(set(extra) - known):
+        print("--snapshot %s: %s is not a page of these scripts, give it as URL=PATH" % (", ".join(extra[page]), page))
+    proposals = []
+    seen = set()
+    for script in args.scripts:
+        for proposal in rewrite_script(script, extra):
+            #an Element of a page two scripts import is proposed once
+            if proposal["location"] not in seen:
+                seen.add(proposal["location"])
+                proposals.append(proposal)
+    if args.measure:
+        import Browser
+        driver = Browser.get_driver()
+        try:
+            measure(driver, proposals)
+        finally:
+            Browser.release(driver)
+    print_proposals(proposals)
+    if args.json:
+        with open(args.json, "w") as writer:
+            json.dump(proposals, writer, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
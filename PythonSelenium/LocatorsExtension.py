@@ -1,16 +1,17 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.common.by import By
-driver= webdriver.Chrome()
-driver.get("https://rahulshettyacademy.com/client")
-driver.find_element(By.LINK_TEXT,"Forgot password?").click()
-driver.find_element(By.XPATH,"//form/div[1]/input").send_keys("Rohan")
+import Browser
+import Retry
+import Waits
+from PageObjects import ClientLoginPage, ForgotPasswordPage
+driver= Browser.get_driver()
+#the forgot password form is rendered after the click; the click leaves the login page, so a slow
+#render is not clicked again (Retry.ONCE), only a link that was not clickable yet is
+page= Retry.step("forgot password", ClientLoginPage(driver).open().forgot_password,
+                 locator=ClientLoginPage.forgot_password_link, policy=Retry.ONCE)
+page.email.send_keys("Rohan")
 # driver.find_element(By.XPATH,"//form/div[2]/input").send_keys("1234567890")
-driver.find_element(By.CSS_SELECTOR, "form div:nth-child(2) input").send_keys("1234567890")
+page.password.send_keys("1234567890")
 # driver.find_element(By.CSS_SELECTOR, "#userPassword").send_keys("1234567890")(this one will also work)
-driver.find_element(By.CSS_SELECTOR, "#confirmPassword").send_keys("1234567890")
+page.confirm_password.send_keys("1234567890")
 #driver.find_element(By.XPATH, "//button[@type='submit']").click()
-driver.find_element(By.XPATH,"//button[text()='Save New Password']").click()
-time.sleep(500)
\ No newline at end of file
+Retry.click(driver, ForgotPasswordPage.save)
+Waits.finish(driver)
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+
+#memory of long lived (pooled) browsers, so a leaking one is replaced before it slows the flows down
+#or gets killed. MEMORY_MONITOR=1 -> every SessionPool samples a browser each time it comes back
+#to the pool and recycles it once it is over one of the limits:
+#  MEMORY_MAX_RSS_MB    chromedriver + Chrome processes, from /proc (default 1500)
+#  MEMORY_MAX_HEAP_MB   JavaScript heap in use, performance.memory / CDP (default 300)
+#  MEMORY_MAX_NODES     DOM nodes alive in the renderer, CDP (default 100000)
+#  MEMORY_MAX_GROWTH    RSS growth since the browser's first sample, as a ratio (default 3.0)
+#a limit set to 0 is off. The Runner writes the samples of every browser to reports/memory-*.json
+#  MemoryMonitor.monitor.sample(driver)  -> one sample by hand
+#(Chrome only for the heap and node numbers, Linux only for RSS; the mock WebDriver has neither)
+ENABLED = os.environ.get("MEMORY_MONITOR") == "1"
+REPORTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+MB = 2 ** 20
+HEAP_JS = ("var m = window.performance && performance.memory;"
+           "return m ? [m.usedJSHeapSize, m.totalJSHeapSize, m.jsHeapSizeLimit] : null;")
+#Performance.getMetrics name -> sample field
+CDP_METRICS = {
+    "JSHeapUsedSize": "cdp_heap_used",
+    "JSHeapTotalSize": "cdp_heap_total",
+    "Nodes": "nodes",
+    "JSEventListeners": "listeners",
+    "Documents": "documents",
+}
+
+
+def _limit(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _children(pid):
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % entry) as reader:
+                #the command name is in parentheses and may contain spaces
+                parent = int(reader.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree = [pid]
+    for current in tree:
+        tree.extend(children.get(current, []))
+    return tree
+
+
+def rss(pid):
+    #resident memory of a process and all its descendants in bytes, None where /proc is missing
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for current in _children(pid):
+        try:
+            with open("/proc/%d/status" % current) as reader:
+                for line in reader:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+def browser_pid(driver):
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    return process.pid if process else None
+
+
+class Limits:
+    def __init__(self, rss_mb=None, heap_mb=None, nodes=None, growth=None):
+        self.rss_mb = _limit("MEMORY_MAX_RSS_MB", 1500) if rss_mb is None else rss_mb
+        self.heap_mb = _limit("MEMORY_MAX_HEAP_MB", 300) if heap_mb is None else heap_mb
+        self.nodes = _limit("MEMORY_MAX_NODES", 100000) if nodes is None else nodes
+        self.growth = _limit("MEMORY_MAX_GROWTH", 3.0) if growth is None else growth
+
+    def exceeded(self, sample, first):
+        #the reason a browser has to go, None while it is fine
+        heap = sample.get("cdp_heap_used") or sample.get("heap_used")
+        if self.rss_mb and sample.get("rss") and sample["rss"] > self.rss_mb * MB:
+            return "rss %.0fMB > %.0fMB" % (sample["rss"] / MB, self.rss_mb)
+        if self.heap_mb and heap and heap > self.heap_mb * MB:
+            return "js heap %.0fMB > %.0fMB" % (heap / MB, self.heap_mb)
+        if self.nodes and sample.get("nodes") and sample["nodes"] > self.nodes:
+            return "%d dom nodes > %d" % (sample["nodes"], self.nodes)
+        if self.growth and sample.get("rss") and first.get("rss") and sample["rss"] > first["rss"] * self.growth:
+            return "rss grew %.1fx since start" % (sample["rss"] / first["rss"])
+        return None
+
+
+class MemoryMonitor:
+    def __init__(self, limits=None):
+        self.limits = limits or Limits()
+        #session id -> samples, oldest first
+        self.series = {}
+        self.recycled = []
+        #sessions that were quit, dropped at the next drain
+        self._gone = set()
+        self._lock = threading.Lock()
+
+    def sample(self, driver):
+        sample = {"time": round(time.time(), 3)}
+        try:
+            heap = driver.execute_script(HEAP_JS)
+            if heap:
+                sample["heap_used"], sample["heap_total"], sample["heap_limit"] = heap
+        except Exception:
+            pass
+        execute_cdp_cmd = getattr(driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is not None:
+            try:
+                if not getattr(driver, "_performance_enabled", False):
+                    execute_cdp_cmd("Performance.enable", {})
+                    driver._performance_enabled = True
+                for metric in execute_cdp_cmd("Performance.getMetrics", {})["metrics"]:
+                    if metric["name"] in CDP_METRICS:
+                        sample[CDP_METRICS[metric["name"]]] = metric["value"]
+            except Exception:
+                pass
+        pid = browser_pid(driver)
+        if pid:
+            sample["rss"] = rss(pid)
+        with self._lock:
+            self.series.setdefault(driver.session_id, []).append(sample)
+        return sample
+
+    def check(self, driver):
+        #samples the browser; the reason to recycle it, or None
+        sample = self.sample(driver)
+        with self._lock:
+            first = self.series[driver.session_id][0]
+        reason = self.limits.exceeded(sample, first)
+        if reason:
+            with self._lock:
+                self.recycled.append({"session": driver.session_id, "time": sample["time"], "reason": reason})
+        return reason
+
+    def forget(self, driver):
+        #the browser was quit (recycled, broken, max uses, pool closed)
+        with self._lock:
+            if driver.session_id in self.series:
+                self._gone.add(driver.session_id)
+
+    def drain(self):
+        with self._lock:
+            data = {"series": self.series, "recycled": self.recycled}
+            gone = self._gone | {entry["session"] for entry in self.recycled}
+            #a session that is still alive keeps its first sample, growth is measured against it
+            self.series = {session: samples[:1] for session, samples in self.series.items() if session not in gone}
+            self.recycled = []
+            self._gone = set()
+        return data
+
+
+def merge(total, data):
+    for session, samples in data["series"].items():
+        known = total["series"].setdefault(session, [])
+        known.extend(sample for sample in samples if not known or sample["time"] > known[-1]["time"])
+    total["recycled"].extend(data["recycled"])
+    return total
+
+
+def write_series(data, path=None):
+    if path is None:
+        path = os.path.join(REPORTS, "memory-%s.json" % time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(data, writer, indent=2)
+    return path
+
+
+monitor = MemoryMonitor() if ENABLED else None
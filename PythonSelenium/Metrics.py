@@ -0,0 +1,253 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import Browser
+
+#counters, gauges and histograms in the Prometheus text format on http://127.0.0.1:<port>/metrics
+#  python Runner.py --metrics-port 9464
+#  scrape_configs: [{job_name: selenium, static_configs: [{targets: ["127.0.0.1:9464"]}]}]
+#the Runner workers record into their own registry and send what changed after every flow; the
+#Runner process adds it up and serves it, labelled by script name (Locators, Practice, practice.yaml, ...)
+#no prometheus_client needed, this is the small part of it the runner uses
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+COMMAND_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError("%s needs the labels %s, got %s" % (self.name, self.label_names, sorted(labels)))
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.help), "# TYPE %s %s" % (self.name, self.kind)]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.extend(self._render(key, value))
+        return lines
+
+    def _render(self, key, value):
+        return ["%s%s %s" % (self.name, _labels(self.label_names, key), _number(value))]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        #keys set since the last drain, only those are sent to the Runner process
+        self.changed = set()
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+            self.changed.add(key)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.changed.add(key)
+
+    def merge(self, values):
+        #the last value a worker saw wins
+        with self._lock:
+            self.values.update(values)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                #one count per bucket plus +Inf, then sum
+                entry = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[bisect.bisect_left(self.buckets, value)] += 1
+            entry[-1] += value
+
+    def merge(self, values):
+        with self._lock:
+            for key, counts in values.items():
+                entry = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+                for i, count in enumerate(counts):
+                    entry[i] += count
+
+    def _render(self, key, entry):
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+            total += count
+            lines.append("%s_bucket%s %d" % (self.name, _labels(self.label_names, key, [("le", _number(bound))]), total))
+        labels = _labels(self.label_names, key)
+        lines.append("%s_sum%s %s" % (self.name, labels, _number(entry[-1])))
+        lines.append("%s_count%s %d" % (self.name, labels, total))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def drain(self):
+        #{name: values} recorded since the last drain, for another process to merge()
+        changes = {}
+        for name, metric in list(self.metrics.items()):
+            with metric._lock:
+                if isinstance(metric, Gauge):
+                    #a gauge keeps its value
+                    values = {key: metric.values[key] for key in metric.changed}
+                    metric.changed = set()
+                else:
+                    values, metric.values = metric.values, {}
+            if values:
+                changes[name] = values
+        return changes
+
+    def merge(self, changes):
+        for name, values in changes.items():
+            if name in self.metrics:
+                self.metrics[name].merge(values)
+
+
+registry = Registry()
+flows = registry.counter("selenium_flow_runs_total", "Flow runs by result", ("script", "status"))
+flow_seconds = registry.histogram("selenium_flow_duration_seconds", "Flow run time", ("script",))
+commands = registry.counter("selenium_webdriver_commands_total", "WebDriver commands sent",
+                            ("script", "command", "outcome"))
+command_seconds = registry.histogram("selenium_webdriver_command_duration_seconds",
+                                     "Latency of one WebDriver command (one step of a flow)",
+                                     ("script", "command"), COMMAND_BUCKETS)
+retries = registry.counter("selenium_step_retries_total", "Step retries by failure kind (Retry.py)",
+                           ("script", "kind"))
+pool_sessions = registry.gauge("selenium_pool_sessions", "Browsers of a worker's session pool",
+                               ("worker", "state"))
+pool_recycled = registry.counter("selenium_pool_recycled_total", "Pooled browsers replaced for memory",
+                                 ("worker",))
+queue_depth = registry.gauge("selenium_runner_queue_depth", "Flows waiting for a worker")
+running = registry.gauge("selenium_runner_flows_running", "Flows running right now")
+
+#the script the commands of this process belong to, the Runner sets it per flow
+script = "none"
+
+
+def _record_command(command, params, seconds, error):
+    commands.inc(script=script, command=command, outcome="ok" if error is None else "error")
+    command_seconds.observe(seconds, script=script, command=command)
+
+
+def attach(driver):
+    return Browser.on_command(driver, _record_command)
+
+
+def record_flow(result, pool=None):
+    #a finished Runner flow result
+    flows.inc(script=result["flow"], status=result["status"])
+    flow_seconds.observe(result["duration"], script=result["flow"])
+    for entry in (result.get("flakes") or {}).values():
+        for kind, count in entry["kinds"].items():
+            retries.inc(count, script=result["flow"], kind=kind)
+    if pool is not None:
+        #"busy" is set by the Runner process when a flow starts and ends
+        stats = pool.stats()
+        worker = str(result["worker"])
+        pool_sessions.set(stats["idle"], worker=worker, state="idle")
+        pool_sessions.set(stats["size"] - stats["started"], worker=worker, state="not started")
+        recycled = stats.get("recycled", 0) - getattr(pool, "_recycled_reported", 0)
+        if recycled:
+            pool_recycled.inc(recycled, worker=worker)
+            pool._recycled_reported = stats["recycled"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1", registry=registry):
+    #serves until the process exits; returns the server (server.shutdown() stops it earlier)
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
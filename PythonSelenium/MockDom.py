@@ -0,0 +1,129 @@
+import lxml.html
+from cssselect import SelectorError as CssError
+from lxml import etree
+from selenium.webdriver.common.by import By
+
+import DomSnapshot
+
+#small DOM for the mock WebDriver: the fixture pages parsed with lxml.html, selectors evaluated by
+#DomSnapshot.resolve (lxml xpath() and cssselect), the same engine LocatorCheck/LocatorRewriter use
+#offline, so a locator cannot pass in one and fail in the other.
+#lxml keeps no python state on its elements, the form state (value, checked, selected) a browser
+#keeps apart from the attributes lives in the Document
+#(no JavaScript, no layout; "hidden" means a hidden attribute or display:none on the element or a parent)
+NOT_RENDERED = {"head", "script", "style", "template", "title", "noscript"}
+FORM_FIELDS = ("input", "select", "textarea")
+STRATEGIES = {"css selector": By.CSS_SELECTOR, "xpath": By.XPATH}
+
+
+class SelectorError(ValueError):
+    pass
+
+
+class Document:
+    def __init__(self, html):
+        self.root = lxml.html.document_fromstring(html)
+        self.values = {}
+        self.checked = set()
+        self.selected = set()
+        for element in self.root.iter("input", "textarea", "option"):
+            if element.tag == "input":
+                self.values[element] = element.get("value", "")
+                if element.get("checked") is not None:
+                    self.checked.add(element)
+            elif element.tag == "textarea":
+                self.values[element] = element.text_content()
+            elif element.get("selected") is not None:
+                self.selected.add(element)
+        for select in self.root.iter("select"):
+            self.init_select(select)
+
+    def owns(self, element):
+        #False for elements of an earlier page and for removed ones (replaced options, suggestions)
+        return element.getroottree().getroot() is self.root
+
+    def init_select(self, select):
+        options = list(select.iter("option"))
+        if options and select.get("multiple") is None and not any(o in self.selected for o in options):
+            self.selected.add(options[0])
+
+    def value(self, element):
+        if element.tag == "select":
+            return next((option_value(o) for o in element.iter("option") if o in self.selected), "")
+        if element.tag == "option":
+            return option_value(element)
+        return self.values.get(element, "")
+
+    def is_selected(self, element):
+        return element in self.checked or element in self.selected
+
+    def title(self):
+        title = self.root.find(".//title")
+        return " ".join(title.text_content().split()) if title is not None else ""
+
+    def outer_html(self):
+        return lxml.html.tostring(self.root, encoding="unicode")
+
+
+def parse(html):
+    return Document(html)
+
+
+def option_value(option):
+    value = option.get("value")
+    return value if value is not None else " ".join(option.text_content().split())
+
+
+def is_element(node):
+    #comments and processing instructions are nodes too, their tag is not a string
+    return isinstance(node.tag, str)
+
+
+def select(root, using, value):
+    #elements a css selector / xpath finds under root (a document root or an element), document order
+    try:
+        found = DomSnapshot.resolve(root, STRATEGIES[using], value)
+    except (etree.XPathError, CssError) as e:
+        raise SelectorError("invalid selector %r: %s" % (value, e))
+    #cssselect matches the root itself too, find_element from an element only looks below it
+    return [element for element in found if is_element(element) and element is not root]
+
+
+def is_hidden(element):
+    for node in [element] + list(element.iterancestors()):
+        style = node.get("style", "").replace(" ", "").lower()
+        if node.get("hidden") is not None or "display:none" in style or node.tag in NOT_RENDERED:
+            return True
+        if node.tag == "input" and node.get("type") == "hidden":
+            return True
+    return False
+
+
+def visible_text(element):
+    if is_hidden(element) or element.tag in FORM_FIELDS:
+        return ""
+    parts = []
+
+    def walk(node):
+        parts.append(node.text or "")
+        for child in node:
+            if child.tag == "br":
+                parts.append("\n")
+            elif is_element(child) and not is_hidden(child):
+                walk(child)
+            parts.append(child.tail or "")
+
+    walk(element)
+    return "\n".join(" ".join(line.split()) for line in "".join(parts).split("\n")).strip()
+
+
+def clear(element):
+    for child in list(element):
+        element.remove(child)
+    element.text = None
+
+
+def append(parent, tag, attributes=None, text=None):
+    element = etree.SubElement(parent, tag, attributes or {})
+    element.text = text
+    return element
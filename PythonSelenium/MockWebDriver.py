@@ -0,0 +1,480 @@
+import base64
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urljoin
+
+import Fixtures
+import MockDom
+
+#in-process stand-in for chromedriver: a W3C WebDriver endpoint that answers find_element/send_keys/
+#click/... against the parsed fixture pages, so selenium's webdriver.Remote runs the scripts without
+#a browser and without network
+#  SELENIUM_MOCK=1 python Locators.py
+#  python Runner.py --mock
+#there is no JavaScript: execute_script only knows the snippets selenium itself sends (getAttribute,
+#isDisplayed) and a few trivial ones, anything else is a "javascript error", so helpers take their
+#send_keys fallback. The behaviour fixtures.js adds in a real browser (data-on-submit-show,
+#data-suggest, data-child) is done here in python
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+WINDOW = "mock-window"
+BLANK = "<html><head></head><body></body></html>"
+#1x1 transparent PNG for screenshots
+PIXEL = ("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
+SCRIPTS = {
+    "return document.readyState": lambda session, args: "complete",
+    "return 1": lambda session, args: 1,
+    "return document.title": lambda session, args: session.document.title(),
+    "return document.documentElement.outerHTML": lambda session, args: session.document.outer_html(),
+}
+
+
+class WebDriverError(Exception):
+    def __init__(self, status, error, message):
+        Exception.__init__(self, message)
+        self.status = status
+        self.error = error
+        self.message = message
+
+
+def no_such_element(using, value):
+    return WebDriverError(404, "no such element", "Unable to locate element: {\"method\":\"%s\",\"selector\":\"%s\"}" % (using, value))
+
+
+class Session:
+    def __init__(self, capabilities):
+        self.id = uuid.uuid4().hex
+        self.capabilities = capabilities
+        self.elements = {}
+        self.ids = {}
+        self.history = []
+        self.position = -1
+        self.uploads = tempfile.mkdtemp(prefix="mockdriver-")
+        self.lock = threading.Lock()
+        self.load("about:blank", remember=False)
+
+    # navigation
+
+    def load(self, url, remember=True, base_file=None):
+        file = Fixtures.fixture_for(url) if url != "about:blank" else None
+        if file is None and base_file and not re.match(r"^\w+://", url):
+            #relative link between fixture files
+            candidate = os.path.normpath(os.path.join(os.path.dirname(base_file), url.split("#")[0]))
+            if os.path.exists(os.path.join(Fixtures.FIXTURES, candidate)):
+                file = candidate
+                url = Fixtures.live_url(file) or "file://" + os.path.join(Fixtures.FIXTURES, file)
+        if url == "about:blank":
+            html = BLANK
+        elif file:
+            html = Fixtures.read(file)
+        else:
+            raise WebDriverError(500, "unknown error", "net::ERR_NAME_NOT_RESOLVED (no fixture for %s)" % url)
+        self.document = MockDom.parse(html)
+        self.url = url
+        self.file = file
+        self.elements.clear()
+        self.ids.clear()
+        if remember:
+            del self.history[self.position + 1:]
+            self.history.append(url)
+            self.position = len(self.history) - 1
+
+    def go(self, step):
+        position = self.position + step
+        if 0 <= position < len(self.history):
+            self.position = position
+            self.load(self.history[position], remember=False)
+
+    # elements
+
+    def ref(self, node):
+        key = id(node)
+        if key not in self.ids:
+            element_id = uuid.uuid4().hex
+            self.ids[key] = element_id
+            self.elements[element_id] = node
+        return {ELEMENT_KEY: self.ids[key]}
+
+    def node(self, element_id):
+        node = self.elements.get(element_id)
+        if node is None:
+            raise WebDriverError(404, "stale element reference", "stale element reference: element is not attached to the page document")
+        if not self.document.owns(node):
+            raise WebDriverError(404, "stale element reference", "stale element reference: element is not attached to the page document")
+        return node
+
+    def find(self, root, using, value):
+        try:
+            if using in MockDom.STRATEGIES:
+                return MockDom.select(root, using, value)
+            if using == "tag name":
+                return [n for n in root.iter(value.lower()) if n is not root]
+            if using in ("link text", "partial link text"):
+                links = [n for n in root.iter("a") if n is not root]
+                if using == "link text":
+                    return [a for a in links if MockDom.visible_text(a) == value.strip()]
+                return [a for a in links if value in MockDom.visible_text(a)]
+        except MockDom.SelectorError as e:
+            raise WebDriverError(400, "invalid selector", str(e))
+        raise WebDriverError(400, "invalid argument", "unknown locator strategy %s" % using)
+
+    # interaction
+
+    def click(self, node):
+        if MockDom.is_hidden(node):
+            raise WebDriverError(400, "element not interactable", "element not interactable")
+        if node.get("disabled") is not None:
+            return
+        form = self.ancestor(node, "form")
+        checked = self.document.checked
+        if node.tag == "input" and node.get("type") == "checkbox":
+            checked.symmetric_difference_update([node])
+        elif node.tag == "input" and node.get("type") == "radio":
+            for other in self.document.root.iter("input"):
+                if other.get("type") == "radio" and other.get("name") == node.get("name"):
+                    checked.discard(other)
+            checked.add(node)
+        elif node.tag == "option":
+            self.choose(node)
+        elif node.tag == "a" and node.get("href"):
+            self.follow(node.get("href"))
+        elif self.is_submit(node) and form is not None:
+            self.submit(form)
+        elif node.tag == "label" and node.get("for"):
+            target = MockDom.select(self.document.root, "css selector", "[id='%s']" % node.get("for"))
+            if target:
+                self.click(target[0])
+        #a click in a suggestion list picks the suggestion
+        suggestion_list = self.ancestor(node, "ul")
+        if suggestion_list is not None and suggestion_list.get("id"):
+            for owner in MockDom.select(self.document.root, "css selector",
+                                        "[data-suggest-list='#%s']" % suggestion_list.get("id")):
+                self.document.values[owner] = MockDom.visible_text(node)
+                suggestion_list.set("hidden", "")
+
+    def ancestor(self, node, tag):
+        return next(node.iterancestors(tag), None)
+
+    def is_submit(self, node):
+        if node.tag == "input":
+            return node.get("type") in ("submit", "image")
+        return node.tag == "button" and node.get("type", "submit") == "submit"
+
+    def submit(self, form):
+        target = form.get("data-on-submit-show")
+        if target:
+            for node in MockDom.select(self.document.root, "css selector", target):
+                node.attrib.pop("hidden", None)
+
+    def follow(self, href):
+        if href.startswith("#") or href.startswith("javascript:"):
+            return
+        if self.file and not re.match(r"^\w+://", href):
+            self.load(href, base_file=self.file)
+        else:
+            self.load(urljoin(self.url, href))
+
+    def choose(self, option):
+        select = self.ancestor(option, "select")
+        if select is None:
+            return
+        selected = self.document.selected
+        if select.get("multiple") is not None:
+            selected.symmetric_difference_update([option])
+        else:
+            selected.difference_update(select.iter("option"))
+            selected.add(option)
+        child_selector = select.get("data-child")
+        if child_selector:
+            for child in MockDom.select(self.document.root, "css selector", child_selector):
+                options = list(child.iter("option"))
+                first = options[0] if options and options[0].get("value") == "" else None
+                MockDom.clear(child)
+                if first is not None:
+                    child.append(first)
+                for name in filter(None, option.get("data-children", "").split("|")):
+                    MockDom.append(child, "option", {"value": name}, name)
+                self.document.init_select(child)
+
+    def clear(self, node):
+        #like chromedriver, only editable fields can be cleared
+        if node.tag not in ("input", "textarea"):
+            raise WebDriverError(400, "invalid element state", "invalid element state: Element must be user-editable "
+                                 "in order to clear it.")
+        self.document.values[node] = ""
+
+    def type(self, node, text):
+        if node.tag not in ("input", "textarea") or node.get("type") in ("checkbox", "radio", "submit", "button"):
+            if node.tag == "select":
+                match = [o for o in node.iter("option") if MockDom.visible_text(o).lower().startswith(text.lower())]
+                if match:
+                    self.choose(match[0])
+            return
+        values = self.document.values
+        if node.get("type") == "file":
+            values[node] = "C:\\fakepath\\" + os.path.basename(text.split("\n")[-1])
+            return
+        values[node] = values.get(node, "") + text
+        suggestions = node.get("data-suggest")
+        if suggestions is not None:
+            self.suggest(node, suggestions)
+
+    def suggest(self, node, suggestions):
+        target = MockDom.select(self.document.root, "css selector", node.get("data-suggest-list"))
+        if not target:
+            return
+        suggestion_list = target[0]
+        query = self.document.value(node).lower()
+        MockDom.clear(suggestion_list)
+        for option in suggestions.split("|"):
+            if query and query in option.lower():
+                item = MockDom.append(suggestion_list, "li", {"class": "ui-menu-item"})
+                MockDom.append(item, "a", {"class": "ui-corner-all"}, option)
+        if len(suggestion_list):
+            suggestion_list.attrib.pop("hidden", None)
+        else:
+            suggestion_list.set("hidden", "")
+
+    # properties
+
+    def prop(self, node, name):
+        if name == "value":
+            return self.document.value(node)
+        if name == "checked":
+            return node in self.document.checked
+        if name == "selected":
+            return node in self.document.selected
+        if name == "tagName":
+            return node.tag.upper()
+        if name == "index" and node.tag == "option":
+            select = self.ancestor(node, "select")
+            options = list(select.iter("option")) if select is not None else [node]
+            return options.index(node)
+        if name in ("textContent", "innerText"):
+            return node.text_content() if name == "textContent" else MockDom.visible_text(node)
+        if name == "disabled":
+            return node.get("disabled") is not None
+        return node.get(name)
+
+    def attribute(self, node, name):
+        #selenium's get_attribute(): the property where one exists, "true"/None for boolean attributes
+        if name in ("checked", "selected"):
+            return "true" if self.prop(node, name) else None
+        if name in ("disabled", "readonly", "required", "multiple", "hidden"):
+            return "true" if node.get(name) is not None else None
+        if name in ("value", "index"):
+            value = self.prop(node, name)
+            return None if value is None else str(value)
+        return node.get(name)
+
+    def execute(self, script, args):
+        args = [self.node(a[ELEMENT_KEY]) if isinstance(a, dict) and ELEMENT_KEY in a else a for a in args]
+        text = script.strip()
+        if text.startswith("/* getAttribute */"):
+            return self.attribute(args[0], args[1])
+        if text.startswith("/* isDisplayed */"):
+            return not MockDom.is_hidden(args[0])
+        if "localStorage.clear()" in text:
+            return None
+        handler = SCRIPTS.get(text.rstrip(";"))
+        if handler:
+            return handler(self, args)
+        raise WebDriverError(500, "javascript error", "javascript error: the mock WebDriver does not run JavaScript")
+
+    def upload(self, encoded):
+        archive = zipfile.ZipFile(io.BytesIO(base64.b64decode(encoded)))
+        folder = tempfile.mkdtemp(dir=self.uploads)
+        archive.extractall(folder)
+        return os.path.join(folder, archive.namelist()[0])
+
+
+class MockWebDriver:
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.routes = []
+        self.commands = 0
+        route = self.route
+        route("GET", "/status", lambda s, b: {"ready": True, "message": "mock WebDriver ready"}, session=False)
+        route("POST", "/session", self.new_session, session=False)
+        route("DELETE", "/session/{sid}", self.delete_session)
+        route("GET", "/session/{sid}/timeouts", lambda s, b: {"implicit": 0, "pageLoad": 300000, "script": 30000})
+        route("POST", "/session/{sid}/timeouts", lambda s, b: None)
+        route("POST", "/session/{sid}/url", lambda s, b: s.load(b["url"]))
+        route("GET", "/session/{sid}/url", lambda s, b: s.url)
+        route("POST", "/session/{sid}/back", lambda s, b: s.go(-1))
+        route("POST", "/session/{sid}/forward", lambda s, b: s.go(1))
+        route("POST", "/session/{sid}/refresh", lambda s, b: s.load(s.url, remember=False))
+        route("GET", "/session/{sid}/title", lambda s, b: s.document.title())
+        route("GET", "/session/{sid}/source", lambda s, b: "<!DOCTYPE html>" + s.document.outer_html())
+        route("GET", "/session/{sid}/window", lambda s, b: WINDOW)
+        route("POST", "/session/{sid}/window", lambda s, b: None)
+        route("DELETE", "/session/{sid}/window", lambda s, b: [])
+        route("GET", "/session/{sid}/window/handles", lambda s, b: [WINDOW])
+        route("GET", "/session/{sid}/window/rect", self.rect)
+        route("POST", "/session/{sid}/window/rect", self.rect)
+        route("POST", "/session/{sid}/window/maximize", self.rect)
+        route("POST", "/session/{sid}/window/minimize", self.rect)
+        route("POST", "/session/{sid}/window/fullscreen", self.rect)
+        route("POST", "/session/{sid}/frame", lambda s, b: None)
+        route("POST", "/session/{sid}/frame/parent", lambda s, b: None)
+        route("POST", "/session/{sid}/element", lambda s, b: self.find(s, s.document.root, b, False))
+        route("POST", "/session/{sid}/elements", lambda s, b: self.find(s, s.document.root, b, True))
+        route("GET", "/session/{sid}/element/active", lambda s, b: s.ref(s.document.root))
+        route("POST", "/session/{sid}/element/{eid}/element", lambda s, b, e: self.find(s, s.node(e), b, False))
+        route("POST", "/session/{sid}/element/{eid}/elements", lambda s, b, e: self.find(s, s.node(e), b, True))
+        route("POST", "/session/{sid}/element/{eid}/click", lambda s, b, e: s.click(s.node(e)))
+        route("POST", "/session/{sid}/element/{eid}/clear", lambda s, b, e: s.clear(s.node(e)))
+        route("POST", "/session/{sid}/element/{eid}/value", lambda s, b, e: s.type(s.node(e), b.get("text", "")))
+        route("GET", "/session/{sid}/element/{eid}/text", lambda s, b, e: MockDom.visible_text(s.node(e)))
+        route("GET", "/session/{sid}/element/{eid}/name", lambda s, b, e: s.node(e).tag)
+        route("GET", "/session/{sid}/element/{eid}/selected", lambda s, b, e: s.document.is_selected(s.node(e)))
+        route("GET", "/session/{sid}/element/{eid}/enabled", lambda s, b, e: s.node(e).get("disabled") is None)
+        route("GET", "/session/{sid}/element/{eid}/displayed", lambda s, b, e: not MockDom.is_hidden(s.node(e)))
+        route("GET", "/session/{sid}/element/{eid}/attribute/{name}", lambda s, b, e, n: s.node(e).get(n))
+        route("GET", "/session/{sid}/element/{eid}/property/{name}", lambda s, b, e, n: s.prop(s.node(e), n))
+        route("GET", "/session/{sid}/element/{eid}/css/{name}", lambda s, b, e, n: "")
+        route("GET", "/session/{sid}/element/{eid}/rect", lambda s, b, e: {"x": 0, "y": 0, "width": 100, "height": 20})
+        route("GET", "/session/{sid}/element/{eid}/screenshot", lambda s, b, e: PIXEL)
+        route("POST", "/session/{sid}/execute/sync", lambda s, b: s.execute(b["script"], b.get("args", [])))
+        route("POST", "/session/{sid}/execute/async", lambda s, b: s.execute(b["script"], b.get("args", [])))
+        route("GET", "/session/{sid}/cookie", lambda s, b: [])
+        route("POST", "/session/{sid}/cookie", lambda s, b: None)
+        route("DELETE", "/session/{sid}/cookie", lambda s, b: None)
+        route("DELETE", "/session/{sid}/cookie/{name}", lambda s, b, n: None)
+        route("POST", "/session/{sid}/actions", lambda s, b: None)
+        route("DELETE", "/session/{sid}/actions", lambda s, b: None)
+        route("GET", "/session/{sid}/screenshot", lambda s, b: PIXEL)
+        route("POST", "/session/{sid}/se/file", lambda s, b: s.upload(b["file"]))
+
+    def route(self, method, template, handler, session=True):
+        pattern = "^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template) + "$"
+        self.routes.append((method, re.compile(pattern), handler, session))
+
+    def dispatch(self, method, path, body):
+        path = path.split("?")[0].rstrip("/") or "/"
+        for route_method, pattern, handler, session in self.routes:
+            match = pattern.match(path)
+            if not match or route_method != method:
+                continue
+            params = {k: unquote(v) for k, v in match.groupdict().items()}
+            with self.lock:
+                self.commands += 1
+            if not session:
+                return handler(body)
+            current = self.sessions.get(params.pop("sid"))
+            if current is None:
+                raise WebDriverError(404, "invalid session id", "invalid session id")
+            with current.lock:
+                return handler(current, body, *params.values())
+        raise WebDriverError(404, "unknown command", "unknown command: %s %s" % (method, path))
+
+    def new_session(self, body):
+        capabilities = (body.get("capabilities") or {}).get("alwaysMatch") or {}
+        session = Session(capabilities)
+        with self.lock:
+            self.sessions[session.id] = session
+        returned = {"browserName": "chrome", "browserVersion": "mock", "platformName": "linux",
+                    "acceptInsecureCerts": False, "pageLoadStrategy": capabilities.get("pageLoadStrategy", "normal"),
+                    "setWindowRect": True, "timeouts": {"implicit": 0, "pageLoad": 300000, "script": 30000}}
+        return {"sessionId": session.id, "capabilities": returned}
+
+    def delete_session(self, session, body):
+        with self.lock:
+            self.sessions.pop(session.id, None)
+        shutil.rmtree(session.uploads, ignore_errors=True)
+        return None
+
+    def rect(self, session, body):
+        return {"x": 0, "y": 0, "width": 1366, "height": 768}
+
+    def find(self, session, root, body, many):
+        using, value = body["using"], body["value"]
+        found = session.find(root, using, value)
+        if many:
+            return [session.ref(n) for n in found]
+        if not found:
+            raise no_such_element(using, value)
+        return session.ref(found[0])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    #headers and body go out in two writes, with Nagle every command waited for a delayed ACK (~40ms)
+    disable_nagle_algorithm = True
+    driver = None
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        status = 200
+        try:
+            body = json.loads(raw) if raw else {}
+            value = self.driver.dispatch(method, self.path, body)
+        except WebDriverError as e:
+            status = e.status
+            value = {"error": e.error, "message": e.message, "stacktrace": ""}
+        except (KeyError, ValueError, TypeError) as e:
+            status = 400
+            value = {"error": "invalid argument", "message": "%s: %s" % (type(e).__name__, e), "stacktrace": ""}
+        data = json.dumps({"value": value}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.driver = MockWebDriver()
+        handler = type("Handler", (_Handler,), {"driver": self.driver})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = "http://%s:%d" % self.httpd.server_address
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        #sessions nobody quit still own upload folders
+        with self.driver.lock:
+            sessions, self.driver.sessions = list(self.driver.sessions.values()), {}
+        for session in sessions:
+            shutil.rmtree(session.uploads, ignore_errors=True)
+
+
+_server = None
+_lock = threading.Lock()
+
+
+def server():
+    global _server
+    with _lock:
+        if _server is None:
+            _server = MockServer()
+        return _server
+
+
+def start():
+    return server().url
@@ -0,0 +1,196 @@
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+import Waits
+
+#page objects for the pages the scripts drive
+#every page declares its locators once as Element(...) class attributes; an element is looked up
+#the first time it is used and the handle is cached on the page, so
+#
+#  page.two_way_text.send_keys("Hello")
+#  page.two_way_text.clear()
+#
+#costs one find_element instead of two. The cache is dropped when the driver navigates
+#(get/back/forward/refresh) and an element is looked up again when its handle went stale.
+#page.<name> is a proxy, use page.element("<name>") where a real WebElement is needed (execute_script)
+
+
+def _track_navigation(driver):
+    #count navigations on the driver so every page sharing it knows its cached handles are gone
+    if hasattr(driver, "_navigations"):
+        return
+    driver._navigations = 0
+    for name in ("get", "back", "forward", "refresh"):
+        method = getattr(driver, name)
+
+        def navigate(*args, _method=method, **kwargs):
+            driver._navigations += 1
+            return _method(*args, **kwargs)
+
+        setattr(driver, name, navigate)
+
+
+class Element:
+    def __init__(self, by, value, many=False):
+        self.by = by
+        self.value = value
+        self.many = many
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, page, owner=None):
+        if page is None:
+            return self
+        if self.many:
+            return page.resolve(self)
+        return CachedElement(page, self)
+
+    def locator(self):
+        return self.by, self.value
+
+
+class CachedElement:
+    def __init__(self, page, element):
+        self._page = page
+        self._declared = element
+
+    def _fresh(self):
+        self._page.invalidate(self._declared.name)
+        return self._page.resolve(self._declared)
+
+    def __getattr__(self, name):
+        try:
+            value = getattr(self._page.resolve(self._declared), name)
+        except StaleElementReferenceException:
+            value = getattr(self._fresh(), name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            try:
+                return value(*args, **kwargs)
+            except StaleElementReferenceException:
+                return getattr(self._fresh(), name)(*args, **kwargs)
+
+        return call
+
+    def __repr__(self):
+        return "<%s.%s %s=%r>" % (type(self._page).__name__, self._declared.name, self._declared.by, self._declared.value)
+
+
+class BasePage:
+    URL = None
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._cache = {}
+        _track_navigation(driver)
+
+    def open(self):
+        if not self.URL:
+            raise ValueError("%s has no URL, it is reached from another page" % type(self).__name__)
+        self.driver.get(self.URL)
+        return self
+
+    def resolve(self, element):
+        cached = self._cache.get(element.name)
+        if cached and cached[0] == self.driver._navigations:
+            return cached[1]
+        if element.many:
+            found = self.driver.find_elements(element.by, element.value)
+        else:
+            found = self.driver.find_element(element.by, element.value)
+        self._cache[element.name] = (self.driver._navigations, found)
+        return found
+
+    def element(self, name):
+        return self.resolve(getattr(type(self), name))
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name, None)
+
+
+class AngularPracticePage(BasePage):
+    URL = "https://rahulshettyacademy.com/angularpractice/"
+
+    name = Element(By.CSS_SELECTOR, "input[name='name']")
+    email = Element(By.NAME, "email")
+    password = Element(By.ID, "exampleInputPassword1")
+    check_me = Element(By.ID, "exampleCheck1")
+    gender = Element(By.ID, "exampleFormControlSelect1")
+    employed = Element(By.CSS_SELECTOR, "#inlineRadio2")
+    submit_button = Element(By.XPATH, "//input[@type='submit']")
+    success = Element(By.CLASS_NAME, "alert-success")
+    birthday = Element(By.XPATH, "(//input[@type='date'])[1]")
+    two_way_text = Element(By.XPATH, "(//input[@type='text'])[3]")
+
+    def submit(self):
+        self.submit_button.click()
+        return Waits.visible(self.driver, *AngularPracticePage.success.locator()).text
+
+
+class ClientLoginPage(BasePage):
+    URL = "https://rahulshettyacademy.com/client"
+
+    forgot_password_link = Element(By.LINK_TEXT, "Forgot password?")
+
+    def forgot_password(self):
+        self.forgot_password_link.click()
+        Waits.visible(self.driver, *ForgotPasswordPage.confirm_password.locator())
+        return ForgotPasswordPage(self.driver)
+
+
+class ForgotPasswordPage(BasePage):
+    email = Element(By.XPATH, "//form/div[1]/input")
+    password = Element(By.CSS_SELECTOR, "form div:nth-child(2) input")
+    confirm_password = Element(By.CSS_SELECTOR, "#confirmPassword")
+    save = Element(By.XPATH, "//button[text()='Save New Password']")
+
+
+class DropdownsPractisePage(BasePage):
+    URL = "https://rahulshettyacademy.com/dropdownsPractise/"
+
+    autosuggest = Element(By.ID, "autosuggest")
+    suggestions = Element(By.CSS_SELECTOR, "li.ui-menu-item a", many=True)
+
+
+class PracticeFormPage(BasePage):
+    URL = "https://www.tutorialspoint.com/selenium/practice/selenium_automation_practice.php"
+
+    email = Element(By.NAME, "email")
+    name = Element(By.NAME, "name")
+    female = Element(By.XPATH, "//label[text()='Female']/preceding-sibling::input[@type='radio']")
+    mobile = Element(By.ID, "mobile")
+    date_of_birth = Element(By.XPATH, "(//input[@type='date'])")
+    subjects = Element(By.NAME, "subjects")
+    sports = Element(By.XPATH, "//label[text()='Sports']/preceding-sibling::input[@type='checkbox']")
+    music = Element(By.XPATH, "//label[text()='Music']/preceding-sibling::input[@type='checkbox']")
+    picture = Element(By.ID, "picture")
+    address = Element(By.CSS_SELECTOR, "textarea.form-control")
+    uttar_pradesh = Element(By.XPATH, "//option[text()='Uttar Pradesh']")
+    state = Element(By.ID, "state")
+    city = Element(By.NAME, "city")
+    submit_button = Element(By.CSS_SELECTOR, "input[type='submit']")
+    submitted = Element(By.CLASS_NAME, "form-submitted")
+
+    def submit(self):
+        #the fixture shows a confirmation, the live page posts the form and loads it again
+        button = self.element("submit_button")
+        button.click()
+
+        def done(driver):
+            confirmation = driver.find_elements(*PracticeFormPage.submitted.locator())
+            if confirmation and confirmation[0].is_displayed():
+                return confirmation[0].text
+            try:
+                button.is_enabled()
+            except StaleElementReferenceException:
+                return "reloaded"
+            return False
+
+        return Waits.wait_until(self.driver, done, message="the practice form was not submitted")
@@ -1,32 +1,35 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.common.by import By
-driver= webdriver.Chrome()
-driver.get("https://www.tutorialspoint.com/selenium/practice/selenium_automation_practice.php")
+import Browser
+from Dropdown import Dropdown
+import FormFill
+import Uploads
+import Waits
+from PageObjects import PracticeFormPage
+driver= Browser.get_driver()
+page= PracticeFormPage(driver).open()
 
 
 #ID,Xpath,CSS_Selector,Class_Name, Name, LinkText
-driver.find_element(By.NAME, "email").send_keys("helloRohan@gmail.com")
-driver.find_element(By.NAME, "name").send_keys("Rohan")
+#all the fields go to the browser in one execute_script, see FormFill.py
 # female_radio_button = driver.find_element(By.CSS_SELECTOR, "div.col-sm-3:nth-of-type(2) input[type='radio']")
 # female_radio_button.click()
-driver.find_element(By.XPATH, "//label[text()='Female']/preceding-sibling::input[@type='radio']").click()
-
-driver.find_element(By.ID, "mobile").send_keys("1234567890")
-driver.find_element(By.XPATH,"(//input[@type='date'])").send_keys("24032000")
-
-driver.find_element(By.NAME, "subjects").send_keys("Programming")
-driver.find_element(By.XPATH, "//label[text()='Sports']/preceding-sibling::input[@type='checkbox']").click()
-driver.find_element(By.XPATH, "//label[text()='Music']/preceding-sibling::input[@type='checkbox']").click()
-driver.find_element(By.ID, 'picture').send_keys("/Users/rohanpal/PycharmProjects/PythonTesting/pythonProject3/PythonSelenium/Upload.jpeg")
 # driver.find_element(By.XPATH,"(//input[@type='picture'])[1]").send_keys("Hello")
-driver.find_element(By.CSS_SELECTOR, 'textarea.form-control').send_keys("Beldanga,Peardoba,722145,West Bengal")
+FormFill.fill(driver, [
+    (PracticeFormPage.email, "helloRohan@gmail.com"),
+    (PracticeFormPage.name, "Rohan"),
+    (PracticeFormPage.female, FormFill.CHECK),
+    (PracticeFormPage.mobile, "1234567890"),
+    (PracticeFormPage.date_of_birth, "24032000"),
+    (PracticeFormPage.subjects, "Programming"),
+    (PracticeFormPage.sports, FormFill.CHECK),
+    (PracticeFormPage.music, FormFill.CHECK),
+    (PracticeFormPage.address, "Beldanga,Peardoba,722145,West Bengal"),
+])
+#Upload.jpeg next to this script, staged once per remote browser, see Uploads.py
+Uploads.upload(driver, PracticeFormPage.picture, "Upload.jpeg")
 # Select(driver.find_element(By.ID, 'state')).select_by_value("NCR")
-driver.find_element(By.XPATH, "//option[text()='Uttar Pradesh']").click()
-Select(driver.find_element(By.NAME, 'city')).select_by_value("Agra")
+# driver.find_element(By.XPATH, "//option[text()='Uttar Pradesh']").click()
+#the city list is filled after the state changes, dependent() waits for Agra to show up in it
+Dropdown.dependent(driver, PracticeFormPage.state, {"text": "Uttar Pradesh"}, PracticeFormPage.city, {"value": "Agra"})
 
 # driver.find_element(By.XPATH, "//input[@type='Login']").click()
-
-time.sleep(500)
\ No newline at end of file
+Waits.finish(driver)
@@ -0,0 +1,210 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+
+from selenium.common.exceptions import (ElementClickInterceptedException, ElementNotInteractableException,
+                                        InvalidSessionIdException, NoSuchElementException,
+                                        StaleElementReferenceException, TimeoutException, WebDriverException)
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+import JsLocators
+
+#step level retries for the failures that go away by themselves, instead of running a whole flow again
+#
+#  Retry.step("open forgot password", page.forgot_password, locator=ClientLoginPage.forgot_password_link)
+#  Retry.click(driver, PageObjects.AngularPracticePage.submit_button)
+#  Retry.send_keys(driver, (By.ID, "mobile"), "1234567890")
+#  Retry.step("submit", page.submit, locator=AngularPracticePage.submit_button, policy=Retry.ONCE)
+#
+#a failure is classified as stale, intercepted, not interactable, timeout, not found or network; the
+#policy says how often each kind is retried (with exponential backoff and jitter). Assertions, invalid
+#selectors, dead sessions, ... are never retried. Every attempt is counted per locator in Retry.stats;
+#the Runner adds them up across runs in reports/flakes.json
+REPORTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+FLAKES = os.path.join(REPORTS, "flakes.json")
+#texts chromedriver / the HTTP client use when the browser or the network went away for a moment
+NETWORK_ERRORS = ("net::err_", "connection refused", "connection reset", "disconnected", "timed out receiving message",
+                  "remote end closed", "max retries exceeded", "broken pipe")
+SCROLL_INTO_VIEW_JS = "arguments[0].scrollIntoView({block: 'center', inline: 'center'});"
+
+
+def classify(error):
+    #the kind of a failure, None when retrying cannot help
+    if isinstance(error, StaleElementReferenceException):
+        return "stale"
+    if isinstance(error, ElementClickInterceptedException):
+        return "intercepted"
+    if isinstance(error, ElementNotInteractableException):
+        return "not interactable"
+    if isinstance(error, TimeoutException):
+        return "timeout"
+    if isinstance(error, NoSuchElementException):
+        return "not found"
+    if isinstance(error, InvalidSessionIdException):
+        return None
+    #not every OSError: a missing upload file or a permission error stays the same on the next attempt
+    if isinstance(error, (ConnectionError, socket.timeout, Urllib3Error)):
+        return "network"
+    if isinstance(error, WebDriverException):
+        message = (error.msg or "").lower()
+        if any(text in message for text in NETWORK_ERRORS):
+            return "network"
+    return None
+
+
+class Policy:
+    def __init__(self, retries=None, base=0.1, factor=2.0, max_delay=2.0, jitter=0.25):
+        #retries: kind -> extra attempts
+        self.retries = dict(DEFAULT_RETRIES if retries is None else retries)
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def attempts(self, kind):
+        return 1 + self.retries.get(kind, 0) if kind else 1
+
+    def delay(self, attempt):
+        delay = min(self.base * self.factor ** (attempt - 1), self.max_delay)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+DEFAULT_RETRIES = {"stale": 3, "intercepted": 3, "not interactable": 2, "network": 2, "timeout": 1, "not found": 1}
+POLICY = Policy()
+#for steps that must not run twice (a submit click): a timeout or a network error may come after the
+#click went through, only the failures that stop the click itself are retried
+ONCE = Policy({kind: count for kind, count in DEFAULT_RETRIES.items() if kind not in ("timeout", "network")})
+#page loads: a missing element or a click problem cannot come from driver.get
+PAGE_LOAD = Policy({"network": DEFAULT_RETRIES["network"], "timeout": DEFAULT_RETRIES["timeout"]})
+
+
+class FlakeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.locators = {}
+
+    def _entry(self, key):
+        return self.locators.setdefault(key, {"steps": 0, "passed": 0, "flaky": 0, "failed": 0, "retries": 0,
+                                              "kinds": {}})
+
+    def record(self, key, attempts, kinds, passed):
+        #kinds: the kind of every failed attempt of one step
+        with self._lock:
+            entry = self._entry(key)
+            entry["steps"] += 1
+            entry["retries"] += attempts - 1
+            for kind in kinds:
+                entry["kinds"][kind] = entry["kinds"].get(kind, 0) + 1
+            if not passed:
+                entry["failed"] += 1
+            elif kinds:
+                #passed, but only after a retry
+                entry["flaky"] += 1
+            else:
+                entry["passed"] += 1
+
+    def drain(self):
+        with self._lock:
+            locators, self.locators = self.locators, {}
+        return locators
+
+
+def merge(history, locators):
+    for key, entry in locators.items():
+        total = history.setdefault(key, {"steps": 0, "passed": 0, "flaky": 0, "failed": 0, "retries": 0, "kinds": {}})
+        for name in ("steps", "passed", "flaky", "failed", "retries"):
+            total[name] += entry[name]
+        for kind, count in entry["kinds"].items():
+            total["kinds"][kind] = total["kinds"].get(kind, 0) + count
+        total["flake_rate"] = round(total["flaky"] / total["steps"], 4) if total["steps"] else 0
+    return history
+
+
+def load_history(path=FLAKES):
+    try:
+        with open(path) as reader:
+            return json.load(reader)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_history(history, path=FLAKES):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(history, writer, indent=2, sort_keys=True)
+
+
+def print_flakes(locators, top=10):
+    flaky = sorted(((key, entry) for key, entry in locators.items() if entry["flaky"] or entry["failed"]),
+                   key=lambda item: item[1]["flaky"] + item[1]["failed"], reverse=True)
+    if not flaky:
+        return
+    print("flaky steps:")
+    for key, entry in flaky[:top]:
+        print("  %-50s %3d steps %3d flaky %3d failed  %s" % (
+            key, entry["steps"], entry["flaky"], entry["failed"],
+            ", ".join("%s x%d" % item for item in sorted(entry["kinds"].items()))))
+
+
+stats = FlakeStats()
+
+
+def _key(name, locator):
+    if locator is None:
+        return name
+    by, value = JsLocators.locator(locator)
+    return "%s=%s" % (by, value)
+
+
+def step(name, action, *args, locator=None, policy=None, recover=None, **kwargs):
+    #runs action(*args, **kwargs) until it passes or the policy gives up; recover(kind, error) runs
+    #before every retry. Returns what the action returned, raises the last error
+    policy = policy or POLICY
+    kinds = []
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = action(*args, **kwargs)
+        except Exception as e:
+            kind = classify(e)
+            if kind is not None:
+                kinds.append(kind)
+            if kind is None or attempt >= policy.attempts(kind):
+                stats.record(_key(name, locator), attempt, kinds, False)
+                raise
+            time.sleep(policy.delay(attempt))
+            if recover is not None:
+                recover(kind, e)
+            continue
+        stats.record(_key(name, locator), attempt, kinds, True)
+        return result
+
+
+def _scroll_into_view(driver, locator):
+    def recover(kind, error):
+        if kind in ("intercepted", "not interactable"):
+            try:
+                driver.execute_script(SCROLL_INTO_VIEW_JS, driver.find_element(*JsLocators.locator(locator)))
+            except WebDriverException:
+                pass
+    return recover
+
+
+def click(driver, locator, policy=None):
+    #find + click in one step, so a stale element is looked up again
+    return step("click", lambda: driver.find_element(*JsLocators.locator(locator)).click(),
+                locator=locator, policy=policy, recover=_scroll_into_view(driver, locator))
+
+
+def send_keys(driver, locator, text, policy=None):
+    return step("send_keys", lambda: driver.find_element(*JsLocators.locator(locator)).send_keys(text),
+                locator=locator, policy=policy, recover=_scroll_into_view(driver, locator))
+
+
+def get(driver, url, policy=None):
+    #page loads only retry network errors and timeouts
+    return step("get %s" % url, driver.get, url, policy=policy or PAGE_LOAD)
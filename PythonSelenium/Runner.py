@@ -0,0 +1,355 @@
+import argparse
+import ast
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+import Artifacts
+import AssetCache
+import Browser
+import Flows
+import LocatorProfiler
+import Metrics
+import MemoryMonitor
+import Retry
+import Tracer
+from SessionPool import SessionPool
+
+#runs the flow scripts of this folder in parallel on N headless browser workers
+#  python Runner.py                 -> every flow, one worker per core
+#  python Runner.py -w 2 Locators   -> only Locators.py on 2 workers
+#flows are sharded by their past duration (longest first onto the least loaded worker)
+#and one combined report is written to reports/
+#every worker keeps one warm browser in a SessionPool and reuses it for all flows of its shard
+#  python Runner.py --fixtures      -> real browsers against the local copies in fixtures/
+#  python Runner.py --mock          -> no browser and no network at all (MockWebDriver.py)
+#the declarative flows of flows/ run too, by file name: python Runner.py practice.yaml (Flows.py)
+#  python Runner.py --profile fast  -> trimmed headless browsers (see Browser.py)
+#  ASSET_CACHE=1 python Runner.py   -> repeat asset downloads come from a disk cache (AssetCache.py)
+#  TRACE=1 python Runner.py         -> also a trace of every WebDriver command (Tracer.py)
+#  MEMORY_MONITOR=1 python Runner.py -> pooled browsers are recycled when they use too much memory,
+#                                      the samples go to reports/memory-*.json (MemoryMonitor.py)
+#  python Runner.py --metrics-port 9464 -> Prometheus metrics on http://127.0.0.1:9464/metrics (Metrics.py)
+#a failed flow leaves screenshots and DOM dumps of its browsers in reports/artifacts/<run>/ (Artifacts.py)
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPORTS = os.path.join(HERE, "reports")
+HISTORY = os.path.join(REPORTS, "durations.json")
+DEFAULT_DURATION = 30.0
+#set in the workers: the session pool and the queue metrics go back to the Runner process through
+_pool = None
+_events = None
+
+
+class Flow:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+    def __repr__(self):
+        return "Flow(%s)" % self.name
+
+
+def is_flow(source):
+    #a flow script starts its browser at module level; framework modules only do it inside functions
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return False
+    for statement in tree.body:
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        for node in ast.walk(statement):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("get_driver", "Chrome")):
+                return True
+    return False
+
+
+def discover(folder=HERE, names=None):
+    flows = []
+    for file in sorted(os.listdir(folder)):
+        if not file.endswith(".py"):
+            continue
+        path = os.path.join(folder, file)
+        with open(path, encoding="utf-8") as reader:
+            source = reader.read()
+        if not is_flow(source):
+            continue
+        name = file[:-3]
+        if names and name not in names:
+            continue
+        flows.append(Flow(name, path))
+    #compiled when they run, a broken one fails like a script would
+    for path in Flows.discover(os.path.join(folder, "flows")):
+        name = os.path.basename(path)
+        if not names or name in names:
+            flows.append(Flow(name, path))
+    return flows
+
+
+def load_history(path=HISTORY):
+    try:
+        with open(path) as reader:
+            return json.load(reader)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_history(history, results, path=HISTORY):
+    #moving average so one slow run does not reshuffle every shard
+    for result in results:
+        old = history.get(result["flow"])
+        new = result["duration"]
+        history[result["flow"]] = new if old is None else round(0.7 * old + 0.3 * new, 3)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(history, writer, indent=2, sort_keys=True)
+
+
+def shard(flows, workers, history):
+    known = [history[flow.name] for flow in flows if flow.name in history]
+    fallback = sum(known) / len(known) if known else DEFAULT_DURATION
+    shards = [[] for _ in range(max(1, min(workers, len(flows))))]
+    loads = [0.0] * len(shards)
+    for flow in sorted(flows, key=lambda f: history.get(f.name, fallback), reverse=True):
+        i = loads.index(min(loads))
+        shards[i].append(flow)
+        loads[i] += history.get(flow.name, fallback)
+    return shards
+
+
+def run_flow(flow):
+    Metrics.script = flow.name
+    if _events is not None:
+        _events.put(("start", flow.name, os.getpid(), None))
+    result = _run_flow(flow)
+    if _events is not None:
+        Metrics.record_flow(result, _pool)
+        _events.put(("done", flow.name, os.getpid(), Metrics.registry.drain()))
+    return result
+
+
+def _run_flow(flow):
+    output = io.StringIO()
+    status = "passed"
+    error = ""
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output), Tracer.tracer.span(flow.name, "flow"):
+            if flow.path.endswith(Flows.EXTENSIONS):
+                Flows.run_file(flow.path)
+            else:
+                runpy.run_path(flow.path, run_name="__main__")
+    except AssertionError:
+        status = "failed"
+        error = traceback.format_exc()
+        Artifacts.failure(flow.name)
+    except Exception:
+        status = "error"
+        error = traceback.format_exc()
+        Artifacts.failure(flow.name)
+    finally:
+        Browser.cleanup()
+    duration = round(time.perf_counter() - start, 3)
+    return {
+        "flow": flow.name,
+        "status": status,
+        "duration": duration,
+        "worker": os.getpid(),
+        "output": output.getvalue(),
+        "error": error,
+        "locators": LocatorProfiler.profiler.drain(flow=flow.name),
+        "flakes": Retry.stats.drain(),
+        "asset_cache": AssetCache.cache.drain_stats() if AssetCache.cache else None,
+        "trace": _trace(flow),
+        "artifacts": Artifacts.collector.drain() if Artifacts.collector else [],
+        "memory": MemoryMonitor.monitor.drain() if MemoryMonitor.monitor else None,
+    }
+
+
+def _trace(flow):
+    #the flow span (and any Tracer.step) is recorded with tracing off too, long lived workers
+    #would keep every one of them
+    spans = Tracer.tracer.drain(flow=flow.name)
+    return spans if Tracer.ENABLED else []
+
+
+def run_shard(flows):
+    return [run_flow(flow) for flow in flows]
+
+
+def _init_worker(headless, max_uses, site="live", profile=None, events=None):
+    global _pool, _events
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    if headless:
+        os.environ["SELENIUM_HEADLESS"] = "1"
+    if profile:
+        os.environ["BROWSER_PROFILE"] = profile
+    if site == "fixtures":
+        os.environ["SELENIUM_FIXTURES"] = "1"
+    elif site == "mock":
+        os.environ["SELENIUM_MOCK"] = "1"
+    if max_uses:
+        pool = _pool = SessionPool(size=1, max_uses=max_uses)
+        Browser.use_pool(pool)
+        #atexit does not run in pool workers, multiprocessing finalizers do
+        Finalize(pool, pool.close, exitpriority=10)
+    if events is not None:
+        _events = events
+        #forked workers start with a copy of the Runner's numbers, they must not be sent back
+        Metrics.registry.drain()
+        Browser.on_driver(Metrics.attach)
+
+
+def collect_metrics(events):
+    #Runner process side of the worker events, until a None arrives
+    while True:
+        event = events.get()
+        if event is None:
+            return
+        kind, flow, worker, changes = event
+        if kind == "start":
+            Metrics.queue_depth.inc(-1)
+            Metrics.running.inc(1)
+            Metrics.pool_sessions.set(1, worker=str(worker), state="busy")
+        else:
+            Metrics.running.inc(-1)
+            Metrics.pool_sessions.set(0, worker=str(worker), state="busy")
+            Metrics.registry.merge(changes)
+
+
+def run(flows, workers, headless=True, max_uses=25, site="live", profile=None, metrics=False):
+    history = load_history()
+    shards = shard(flows, workers, history)
+    results = []
+    events = collector = None
+    if metrics:
+        events = multiprocessing.Queue()
+        Metrics.queue_depth.inc(len(flows))
+        collector = threading.Thread(target=collect_metrics, args=(events,), name="metrics-events", daemon=True)
+        collector.start()
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(len(shards), initializer=_init_worker,
+                                 initargs=(headless, max_uses, site, profile, events)) as pool:
+            for shard_results in pool.map(run_shard, shards):
+                results.extend(shard_results)
+    finally:
+        if collector is not None:
+            events.put(None)
+            collector.join()
+    wall = time.perf_counter() - start
+    if site == "live":
+        #mock/fixture timings say nothing about the live sites
+        save_history(history, results)
+    return {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "workers": len(shards),
+        "site": site,
+        "profile": profile or os.environ.get("BROWSER_PROFILE", "debug"),
+        "wall_time": round(wall, 3),
+        "serial_time": round(sum(r["duration"] for r in results), 3),
+        "passed": sum(r["status"] == "passed" for r in results),
+        "failed": sum(r["status"] != "passed" for r in results),
+        "results": sorted(results, key=lambda r: r["flow"]),
+    }
+
+
+def write_report(report, path=None):
+    if path is None:
+        path = os.path.join(REPORTS, "run-%s.json" % time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(report, writer, indent=2)
+    return path
+
+
+def print_summary(report):
+    for result in report["results"]:
+        print("%-20s %-7s %8.2fs  (worker %s)" % (result["flow"], result["status"], result["duration"], result["worker"]))
+        if result["error"]:
+            print(result["error"].rstrip().splitlines()[-1])
+    print("%d passed, %d failed on %d workers in %.2fs (%.2fs serial)" % (
+        report["passed"], report["failed"], report["workers"], report["wall_time"], report["serial_time"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the PythonSelenium flows in parallel")
+    parser.add_argument("flows", nargs="*", help="flow names (script names without .py), default all")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--headed", action="store_true", help="show the browsers instead of running headless")
+    parser.add_argument("--report", help="where to write the combined JSON report")
+    parser.add_argument("--max-uses", type=int, default=25,
+                        help="flows per pooled browser before it is restarted, 0 = fresh browser per flow")
+    parser.add_argument("--profile", choices=Browser.PROFILES,
+                        help="browser profile (default $BROWSER_PROFILE or debug), fast = headless and trimmed")
+    site = parser.add_mutually_exclusive_group()
+    site.add_argument("--fixtures", dest="site", action="store_const", const="fixtures", default="live",
+                      help="serve the pages from fixtures/ instead of the live sites")
+    site.add_argument("--mock", dest="site", action="store_const", const="mock",
+                      help="run against the in-process mock WebDriver, no browser needed")
+    parser.add_argument("--metrics-port", type=int, default=int(os.environ.get("METRICS_PORT", "0")),
+                        help="serve Prometheus metrics on this port while the run lasts (default $METRICS_PORT)")
+    args = parser.parse_args(argv)
+
+    flows = discover(names=args.flows)
+    if not flows:
+        print("no flows found")
+        return 1
+    #the workers inherit it and share one artifact folder (and disk budget)
+    os.environ.setdefault("ARTIFACTS_RUN", "run-%s" % time.strftime("%Y%m%d-%H%M%S"))
+    if args.metrics_port:
+        Metrics.serve(args.metrics_port)
+        print("metrics: http://127.0.0.1:%d/metrics" % args.metrics_port)
+    report = run(flows, args.workers, headless=not args.headed, max_uses=args.max_uses,
+                 site=args.site, profile=args.profile, metrics=bool(args.metrics_port))
+    print_summary(report)
+    flakes = {}
+    for result in report["results"]:
+        Retry.merge(flakes, result["flakes"])
+    if flakes:
+        Retry.print_flakes(flakes)
+        Retry.save_history(Retry.merge(Retry.load_history(), flakes))
+    caches = [result["asset_cache"] for result in report["results"] if result["asset_cache"]]
+    if caches:
+        totals = {name: sum(cache[name] for cache in caches) for name in ("hits", "revalidated", "misses", "bytes_served")}
+        print("asset cache: %(hits)d hits, %(revalidated)d revalidated, %(misses)d misses, %(bytes_served)d bytes served"
+              % totals)
+    #the spans and memory samples go to their own files, not into the run report
+    spans = [span for result in report["results"] for span in result.pop("trace")]
+    memory = {"series": {}, "recycled": []}
+    for result in report["results"]:
+        data = result.pop("memory")
+        if data:
+            MemoryMonitor.merge(memory, data)
+    print("report:", write_report(report, args.report))
+    lookups = [lookup for result in report["results"] for lookup in result["locators"]]
+    if lookups:
+        locators = LocatorProfiler.report(lookups)
+        LocatorProfiler.print_report(locators)
+        print("locator report:", LocatorProfiler.write_report(locators))
+    artifacts = [path for result in report["results"] for path in result["artifacts"]]
+    if artifacts:
+        print("artifacts: %d files in %s" % (len(artifacts), Artifacts.run_folder()))
+    if memory["series"]:
+        for recycled in memory["recycled"]:
+            print("recycled browser %(session)s: %(reason)s" % recycled)
+        print("memory: %s" % MemoryMonitor.write_series(memory))
+    if spans:
+        Tracer.print_summary(spans)
+        print("trace: %s, %s" % Tracer.write_trace(spans, "run"))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
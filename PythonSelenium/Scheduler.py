@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.parse import urlparse
+
+import Browser
+import Runner
+
+#persistent work queue for the flows, so short checks do not wait behind long runs
+#  python Scheduler.py submit Locators Practice                  -> queued with normal priority
+#  python Scheduler.py submit data/practice_form.csv --deadline 3600   -> a DataRunner run, bulk priority
+#  python Scheduler.py submit DemoBrowser --priority smoke
+#  python Scheduler.py list [--state queued]
+#  python Scheduler.py cancel 12
+#  python Scheduler.py work -w 4 --limit rahulshettyacademy.com=2 --mock [--until-empty]
+#jobs live in reports/scheduler.sqlite and survive restarts. A worker takes the queued job with the
+#highest priority, then the earliest deadline, then the oldest, skipping sites that already have their
+#limit of sessions open. One worker slot (--smoke-slots) is kept for smoke jobs, so a smoke check
+#never waits for a long data-driven run to finish; with no more workers than smoke slots nothing can be
+#kept free, a free slot then goes to a queued smoke job first and waits for it while only its site's
+#limit holds it back. A job whose deadline passed before it started
+#expires instead. Cancelling a running job stops a flow at its next WebDriver command and a data run
+#before its next row. Several `work` processes may share the queue: a claimed job records its worker
+#(host:pid) and the worker keeps a heartbeat on it, only the jobs of a worker that is gone are run again
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATABASE = os.environ.get("SCHEDULER_DB") or os.path.join(HERE, "reports", "scheduler.sqlite")
+PRIORITIES = {"smoke": 100, "normal": 50, "bulk": 0}
+#flows that are smoke checks unless submitted with another priority
+SMOKE = ("DemoBrowser",)
+DATA_FILES = (".csv", ".jsonl")
+#how often a running job looks at its cancel flag, at most
+CANCEL_POLL = 0.5
+#seconds between the heartbeats of a worker, and without one before its running jobs are taken back
+HEARTBEAT = 10
+STALE = 60
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    site TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    deadline REAL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    cancel INTEGER NOT NULL DEFAULT 0,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    result TEXT,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (state, priority DESC, deadline, id);
+"""
+FINAL = ("passed", "failed", "error", "cancelled", "expired")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def connect(path=DATABASE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    #the submit/cancel commands and the workers use the file at the same time
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+    for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+        #queues created before jobs had owners
+        if column not in columns:
+            connection.execute("ALTER TABLE jobs ADD COLUMN %s %s" % (column, kind))
+    return connection
+
+
+def _host(url):
+    host = urlparse(url).hostname or "unknown"
+    return host[4:] if host.startswith("www.") else host
+
+
+def _alive(owner):
+    #False only when the owner is a process of this host that has exited
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def resolve(target):
+    #a flow name, a flow file of flows/ or a data file -> (target, site)
+    if target.endswith(DATA_FILES):
+        import DataRunner
+        path = os.path.abspath(target)
+        if not os.path.exists(path):
+            raise ValueError("no data file %s" % target)
+        form = DataRunner.form_for(path)
+        if form is None:
+            raise ValueError("cannot tell the form of %s" % target)
+        return path, _host(DataRunner.FORMS[form].page.URL)
+    flows = {flow.name: flow for flow in Runner.discover()}
+    if target not in flows:
+        raise ValueError("no flow %s, known flows: %s" % (target, ", ".join(sorted(flows))))
+    return target, _host(_first_url(flows[target].path))
+
+
+def _first_url(path):
+    import DomSnapshot
+    import Flows
+    import LocatorCheck
+    if path.endswith(Flows.EXTENSIONS):
+        urls = [op[1] for op in Flows.compile_file(path).ops if op[0] == "navigate"]
+    else:
+        urls = DomSnapshot.find_urls(path) + [page.URL for page in LocatorCheck.page_classes(path) if page.URL]
+    return urls[0] if urls else ""
+
+
+class Scheduler:
+    def __init__(self, path=DATABASE):
+        self.path = path
+        self.db = connect(path)
+        self.owner = "%s:%d" % (socket.gethostname(), os.getpid())
+
+    def submit(self, target, priority=None, deadline=None):
+        #deadline: seconds from now the job has to start within
+        target, site = resolve(target)
+        if priority is None:
+            priority = "bulk" if target.endswith(DATA_FILES) else "smoke" if target in SMOKE else "normal"
+        priority = PRIORITIES[priority] if priority in PRIORITIES else int(priority)
+        now = time.time()
+        cursor = self.db.execute(
+            "INSERT INTO jobs (target, site, priority, deadline, submitted) VALUES (?, ?, ?, ?, ?)",
+            (target, site, priority, None if deadline is None else now + deadline, now))
+        return cursor.lastrowid
+
+    def cancel(self, job):
+        #a queued job is cancelled right away, a running one at its next WebDriver command
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            row = self.db.execute("SELECT state FROM jobs WHERE id = ?", (job,)).fetchone()
+            if row is None or row["state"] in FINAL:
+                return row["state"] if row else None
+            if row["state"] == "queued":
+                self.db.execute("UPDATE jobs SET state = 'cancelled', cancel = 1, finished = ? WHERE id = ?",
+                                (time.time(), job))
+                return "cancelled"
+            self.db.execute("UPDATE jobs SET cancel = 1 WHERE id = ?", (job,))
+            return "cancelling"
+
+    def jobs(self, state=None, limit=50):
+        query = "SELECT * FROM jobs"
+        args = ()
+        if state:
+            query += " WHERE state = ?"
+            args = (state,)
+        query += " ORDER BY id DESC LIMIT ?"
+        return [dict(row) for row in self.db.execute(query, args + (limit,))]
+
+    def expire(self):
+        now = time.time()
+        self.db.execute("UPDATE jobs SET state = 'expired', finished = ? WHERE state = 'queued' AND deadline < ?",
+                        (now, now))
+
+    def claim(self, limits, default_limit, smoke_only=False, smoke_first=False):
+        #takes the next job a worker may run, atomically; None when there is none.
+        #smoke_first: a smoke job held back by its site limit keeps lower priority jobs from starting
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            running = dict(self.db.execute("SELECT site, COUNT(*) FROM jobs WHERE state = 'running' GROUP BY site"))
+            rows = self.db.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' AND priority >= ? "
+                "ORDER BY priority DESC, deadline IS NULL, deadline, id",
+                (PRIORITIES["smoke"] if smoke_only else -sys.maxsize,))
+            waiting = False
+            for row in rows:
+                smoke = row["priority"] >= PRIORITIES["smoke"]
+                if waiting and not smoke:
+                    return None
+                if running.get(row["site"], 0) >= limits.get(row["site"], default_limit):
+                    waiting = waiting or (smoke_first and smoke)
+                    continue
+                now = time.time()
+                self.db.execute("UPDATE jobs SET state = 'running', started = ?, owner = ?, heartbeat = ? WHERE id = ?",
+                                (now, self.owner, now, row["id"]))
+                return dict(row)
+        return None
+
+    def finish(self, job, result):
+        cancelled = self.db.execute("SELECT cancel FROM jobs WHERE id = ?", (job,)).fetchone()["cancel"]
+        state = "cancelled" if cancelled else result["status"]
+        #a job taken back from this worker (no heartbeat for too long) belongs to its new owner now
+        self.db.execute("UPDATE jobs SET state = ?, finished = ?, result = ? WHERE id = ? AND owner = ?",
+                        (state, time.time(), json.dumps(result), job, self.owner))
+        return state
+
+    def heartbeat(self):
+        self.db.execute("UPDATE jobs SET heartbeat = ? WHERE state = 'running' AND owner = ?",
+                        (time.time(), self.owner))
+
+    def requeue_stale(self, stale=STALE):
+        #jobs a killed worker left running start over: its process on this host is gone, or (any host)
+        #it has not sent a heartbeat for `stale` seconds. Jobs of live workers are left alone
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            rows = self.db.execute("SELECT id, owner, COALESCE(heartbeat, started, 0) AS seen FROM jobs "
+                                   "WHERE state = 'running' AND (owner IS NULL OR owner != ?)", (self.owner,))
+            gone = [row["id"] for row in rows if row["seen"] < time.time() - stale or not _alive(row["owner"])]
+            self.db.executemany("UPDATE jobs SET state = 'queued', started = NULL, owner = NULL, heartbeat = NULL "
+                                "WHERE id = ?", [(job,) for job in gone])
+        return gone
+
+    def queued(self):
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+
+
+_job = None
+_database = None
+_local = threading.local()
+
+
+def cancelled(job):
+    #the job's cancel flag, read from whichever thread asks
+    if not hasattr(_local, "db"):
+        _local.db = sqlite3.connect(_database, timeout=30)
+    return bool(_local.db.execute("SELECT cancel FROM jobs WHERE id = ?", (job,)).fetchone()[0])
+
+
+def _throttled(check):
+    last = [0.0]
+
+    def throttled():
+        now = time.monotonic()
+        if now - last[0] < CANCEL_POLL:
+            return False
+        last[0] = now
+        return check()
+    return throttled
+
+
+def _watch_cancel(driver):
+    should_stop = _throttled(lambda: _job is not None and cancelled(_job))
+
+    def check(command, params, seconds, error):
+        if should_stop():
+            raise JobCancelled("job %d was cancelled" % _job)
+
+    Browser.on_command(driver, check)
+
+
+def _init_worker(database, headless, max_uses, site, profile):
+    global _database
+    Runner._init_worker(headless, max_uses, site, profile)
+    _database = database
+    Browser.on_driver(_watch_cancel)
+
+
+def run_job(job):
+    #runs in a worker process
+    global _job
+    _job = job["id"]
+    try:
+        if job["target"].endswith(DATA_FILES):
+            import DataRunner
+            start = time.perf_counter()
+            summary = DataRunner.run(job["target"], DataRunner.form_for(job["target"]), workers=1,
+                                     stop=_throttled(lambda: cancelled(job["id"])))
+            return dict(summary, flow=os.path.basename(job["target"]), duration=round(time.perf_counter() - start, 3),
+                        status="passed" if summary["failed"] == 0 else "failed")
+        flow = next(flow for flow in Runner.discover() if flow.name == job["target"])
+        result = Runner.run_flow(flow)
+        #the run report keeps these, the job table only needs the outcome
+        for name in ("locators", "trace", "memory"):
+            result.pop(name, None)
+        return result
+    finally:
+        _job = None
+
+
+def work(scheduler, workers, limits, default_limit=None, headless=True, max_uses=25, site="live", profile=None,
+         until_empty=False, poll=0.2, smoke_slots=1):
+    default_limit = default_limit or workers
+    running = {}
+    beat = 0.0
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(scheduler.path, headless, max_uses, site, profile)) as pool:
+        while True:
+            if time.monotonic() - beat >= HEARTBEAT:
+                beat = time.monotonic()
+                scheduler.heartbeat()
+                for job in scheduler.requeue_stale():
+                    print("requeued #%d, its worker is gone" % job)
+            scheduler.expire()
+            while len(running) < workers:
+                #the last smoke_slots free slots only take smoke jobs; too few workers to keep any free:
+                #smoke jobs still go first
+                smoke_only = workers > smoke_slots and len(running) >= workers - smoke_slots
+                job = scheduler.claim(limits, default_limit, smoke_only, smoke_first=workers <= smoke_slots)
+                if job is None:
+                    break
+                print("start  #%d %s (%s, priority %d)" % (job["id"], job["target"], job["site"], job["priority"]))
+                running[pool.submit(run_job, job)] = job
+            if not running:
+                if until_empty and not scheduler.queued():
+                    return
+                time.sleep(poll)
+                continue
+            done, _ = wait(list(running), timeout=poll, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"status": "error", "error": "%s: %s" % (type(e).__name__, e)}
+                state = scheduler.finish(job["id"], result)
+                print("%-6s #%d %s %s" % (state, job["id"], job["target"],
+                                          "%.2fs" % result["duration"] if "duration" in result else ""))
+
+
+def _limits(values):
+    limits = {}
+    for value in values or []:
+        site, _, count = value.partition("=")
+        if not count.isdigit():
+            raise argparse.ArgumentTypeError("--limit needs site=count, got %r" % value)
+        limits[_host("//" + site)] = int(count)
+    return limits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent priority queue for the flows")
+    parser.add_argument("--db", default=DATABASE, help="SQLite file of the queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="queue flows or data files")
+    submit.add_argument("targets", nargs="+", help="flow names, flow files of flows/ or CSV/JSONL files")
+    submit.add_argument("--priority", help="smoke, normal, bulk or a number (higher runs first)")
+    submit.add_argument("--deadline", type=float, help="seconds from now the job has to start within")
+    cancel = commands.add_parser("cancel", help="cancel jobs")
+    cancel.add_argument("jobs", nargs="+", type=int)
+    listing = commands.add_parser("list", help="show jobs, newest first")
+    listing.add_argument("--state")
+    worker = commands.add_parser("work", help="run queued jobs on pooled browsers")
+    worker.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    worker.add_argument("--limit", action="append", help="site=count, sessions at most open against a site")
+    worker.add_argument("--max-uses", type=int, default=25, help="flows per pooled browser before it is restarted")
+    worker.add_argument("--headed", action="store_true")
+    worker.add_argument("--profile", choices=Browser.PROFILES)
+    worker.add_argument("--smoke-slots", type=int, default=1,
+                        help="worker slots kept free for smoke jobs; with fewer workers smoke jobs start first")
+    worker.add_argument("--until-empty", action="store_true", help="stop when the queue is empty")
+    site = worker.add_mutually_exclusive_group()
+    site.add_argument("--fixtures", dest="site", action="store_const", const="fixtures", default="live")
+    site.add_argument("--mock", dest="site", action="store_const", const="mock")
+    args = parser.parse_args(argv)
+
+    scheduler = Scheduler(args.db)
+    if args.command == "submit":
+        for target in args.targets:
+            try:
+                print("queued #%d %s" % (scheduler.submit(target, args.priority, args.deadline), target))
+            except ValueError as e:
+                print(e)
+                return 1
+    elif args.command == "cancel":
+        for job in args.jobs:
+            print("#%d %s" % (job, scheduler.cancel(job) or "unknown"))
+    elif args.command == "list":
+        for job in scheduler.jobs(args.state):
+            print("#%-5d %-10s %4d  %-28s %s" % (job["id"], job["state"], job["priority"], job["site"],
+                                               os.path.basename(job["target"])))
+    else:
+        if args.site != "live":
+            os.environ.setdefault("SELENIUM_HEADLESS", "1")
+        try:
+            work(scheduler, args.workers, _limits(args.limit), headless=not args.headed, max_uses=args.max_uses,
+                 site=args.site, profile=args.profile, until_empty=args.until_empty, smoke_slots=args.smoke_slots)
+        except KeyboardInterrupt:
+            print("stopped, running jobs go back to the queue when a worker starts")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
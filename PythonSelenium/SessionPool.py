@@ -0,0 +1,212 @@
+import contextlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import Browser
+import MemoryMonitor
+
+#pool of already started browsers, handed out with a context manager:
+#
+#  pool = SessionPool(size=2)
+#  with pool.session() as driver:
+#      driver.get(...)
+#
+#between uses a browser is reset (cookies, local/session storage, extra windows, about:blank)
+#and it is replaced by a fresh one after max_uses or when the health check fails
+#with MEMORY_MONITOR=1 a browser is also replaced once it uses too much memory (MemoryMonitor.py)
+#storage is cleared for every origin in the navigation history of the tabs (Chrome, over CDP);
+#other browsers only get the storage of the page the flow ended on cleared, and on every browser
+#origins that were only loaded in iframes keep theirs
+RESET_STORAGE_JS = "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+CLEARED_STORAGE = "local_storage,indexeddb,websql,cache_storage,service_workers"
+
+
+class SessionPool:
+    def __init__(self, size=2, max_uses=25, factory=None, prestart=True, monitor=None):
+        self.size = size
+        self.max_uses = max_uses
+        self.factory = factory or Browser.new_driver
+        self.monitor = monitor or MemoryMonitor.monitor
+        self.recycled = 0
+        self._idle = []
+        self._uses = {}
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        if prestart:
+            self.prestart()
+
+    def prestart(self, count=None):
+        #start the browsers in parallel, chromedriver startup is mostly waiting
+        with self._cond:
+            count = min(count or self.size, self.size - self._created)
+            self._created += count
+        if count <= 0:
+            return
+        with ThreadPoolExecutor(count) as starter:
+            drivers = list(starter.map(lambda _: self._start(), range(count)))
+        with self._cond:
+            for driver in drivers:
+                if driver is None:
+                    self._created -= 1
+                else:
+                    self._idle.append(driver)
+            self._cond.notify_all()
+
+    def _start(self):
+        try:
+            driver = self.factory()
+        except Exception as e:
+            print("could not start browser:", e)
+            return None
+        self._uses[id(driver)] = 0
+        return driver
+
+    def acquire(self, timeout=None):
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("session pool is closed")
+                if self._idle:
+                    driver = self._idle.pop()
+                elif self._created < self.size:
+                    self._created += 1
+                    driver = None
+                else:
+                    remaining = None if end is None else end - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("no browser free in the session pool")
+                    self._cond.wait(remaining)
+                    continue
+            if driver is None:
+                try:
+                    driver = self.factory()
+                except Exception:
+                    with self._cond:
+                        self._created -= 1
+                        self._cond.notify()
+                    raise
+                self._uses[id(driver)] = 0
+                return driver
+            if self.healthy(driver):
+                return driver
+            self._discard(driver)
+
+    def release(self, driver, broken=False):
+        uses = self._uses.get(id(driver), 0) + 1
+        self._uses[id(driver)] = uses
+        if not broken and self.monitor is not None:
+            #sampled before the reset, while the flow's page is still loaded
+            reason = self.monitor.check(driver)
+            if reason:
+                print("recycling browser:", reason)
+                self.recycled += 1
+                broken = True
+        if broken or uses >= self.max_uses or not self.reset(driver):
+            self._discard(driver)
+            return
+        with self._cond:
+            if self._closed:
+                driver.quit()
+                return
+            self._idle.append(driver)
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def session(self, timeout=None):
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = not self.healthy(driver)
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def reset(self, driver):
+        try:
+            origins = set()
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                origins |= visited_origins(driver)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            origins |= visited_origins(driver)
+            driver.execute_script(RESET_STORAGE_JS)
+            clear_storage(driver, origins)
+            try:
+                #chrome can drop the cookies of every domain in one call
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except Exception:
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            print("browser reset failed, recycling:", e)
+            return False
+
+    def healthy(self, driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        self._uses.pop(id(driver), None)
+        if self.monitor is not None:
+            self.monitor.forget(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {"size": self.size, "started": self._created, "idle": len(self._idle), "recycled": self.recycled}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for driver in idle:
+            if self.monitor is not None:
+                self.monitor.forget(driver)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def visited_origins(driver):
+    #origins of the current tab's back/forward history, empty where CDP is not available
+    try:
+        history = driver.execute_cdp_cmd("Page.getNavigationHistory", {})
+    except Exception:
+        return set()
+    origins = set()
+    for entry in history.get("entries", []):
+        parts = urlsplit(entry.get("url", ""))
+        if parts.scheme in ("http", "https") and parts.netloc:
+            origins.add("%s://%s" % (parts.scheme, parts.netloc))
+    return origins
+
+
+def clear_storage(driver, origins):
+    #session storage is kept per tab, Storage.clearDataForOrigin does not reach it, DOMStorage does
+    if not origins:
+        return
+    driver.execute_cdp_cmd("DOMStorage.enable", {})
+    for origin in sorted(origins):
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": CLEARED_STORAGE})
+        driver.execute_cdp_cmd("DOMStorage.clear", {"storageId": {"securityOrigin": origin, "isLocalStorage": False}})
+    driver.execute_cdp_cmd("DOMStorage.disable", {})
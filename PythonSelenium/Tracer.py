@@ -0,0 +1,243 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from selenium.webdriver.support.select import Select
+
+import Browser
+
+#timed spans for every WebDriver command a script sends, nested under the script and its steps
+#TRACE=1 -> Browser.get_driver() attaches the tracer; a plain script run writes its trace when it
+#exits, the Runner writes one trace for the whole run (one row per worker)
+#  reports/trace-*.json              -> chrome://tracing, https://ui.perfetto.dev
+#  reports/trace-*.speedscope.json   -> https://www.speedscope.app
+#helpers made of several commands (Select.select_by_*, Waits, FormFill.fill) get a span of their
+#own so their commands show up underneath them; scripts can add steps:
+#  with Tracer.step("upload picture"):
+#      ...
+ENABLED = os.environ.get("TRACE") == "1"
+REPORTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+#(module or class, function or Class.method) that get a span when the tracer is attached
+HELPERS = [
+    (Select, "select_by_value"),
+    (Select, "select_by_index"),
+    (Select, "select_by_visible_text"),
+    (Select, "deselect_all"),
+    (Select, "deselect_by_value"),
+    (Select, "deselect_by_index"),
+    (Select, "deselect_by_visible_text"),
+    ("Waits", "wait_until"),
+    ("Waits", "wait_until_not"),
+    ("FormFill", "fill"),
+    ("Dropdown", "Dropdown.select"),
+    ("Dropdown", "Dropdown.wait_for"),
+]
+_patched = False
+
+
+def _describe(command, params):
+    #the command name plus the part of its parameters that tells the spans apart
+    params = params or {}
+    if "using" in params:
+        return "%s %s=%s" % (command, params["using"], params.get("value"))
+    if "url" in params:
+        return "%s %s" % (command, params["url"])
+    if "text" in params and command.startswith("sendKeys"):
+        return "%s %r" % (command, params["text"][:40])
+    return command
+
+
+class Tracer:
+    def __init__(self):
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        #spans store wall clock seconds so traces of different workers line up
+        self._wall = time.time()
+        self._perf = time.perf_counter()
+
+    def now(self):
+        return self._wall + (time.perf_counter() - self._perf)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, name, category, start, end, args):
+        span = {
+            "name": name,
+            "category": category,
+            "start": start,
+            #a span needs a length or the viewers cannot nest it
+            "end": max(end, start + 1e-6),
+            "depth": len(self._stack()),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    @contextlib.contextmanager
+    def span(self, name, category="step", **args):
+        start = self.now()
+        stack = self._stack()
+        stack.append(name)
+        try:
+            yield
+        except Exception as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            self._add(name, category, start, self.now(), args)
+
+    def command(self, command, params, seconds, error):
+        end = self.now()
+        args = {"error": type(error).__name__} if error else {}
+        self._add(_describe(command, params), "command", end - seconds, end, args)
+
+    def attach(self, driver):
+        _patch_helpers(self)
+        return Browser.on_command(driver, self.command)
+
+    def drain(self, **tags):
+        with self._lock:
+            spans, self.spans = self.spans, []
+        for span in spans:
+            span["args"].update(tags)
+        return spans
+
+
+def _patch_helpers(tracer):
+    global _patched
+    if _patched:
+        return
+    _patched = True
+    for owner, name in HELPERS:
+        if isinstance(owner, str):
+            owner = sys.modules.get(owner) or __import__(owner)
+        if "." in name:
+            #"Class.method" of a module
+            class_name, name = name.split(".")
+            owner = getattr(owner, class_name)
+        original = getattr(owner, name)
+
+        def traced(*args, _original=original, _name="%s.%s" % (getattr(owner, "__name__", owner), name), **kwargs):
+            with tracer.span(_name, "helper"):
+                return _original(*args, **kwargs)
+
+        setattr(owner, name, functools.wraps(original)(traced))
+
+
+def chrome_trace(spans):
+    #trace event format, complete ("X") events in microseconds
+    events = []
+    for span in sorted(spans, key=lambda s: (s["start"], -s["end"])):
+        events.append({
+            "name": span["name"],
+            "cat": span["category"],
+            "ph": "X",
+            "ts": round(span["start"] * 1e6, 1),
+            "dur": round((span["end"] - span["start"]) * 1e6, 1),
+            "pid": span["pid"],
+            "tid": span["tid"],
+            "args": span["args"],
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def speedscope(spans, name="selenium"):
+    #evented profile per thread, open/close events in microseconds from the first span
+    frames = []
+    index = {}
+    threads = {}
+    for span in spans:
+        if span["name"] not in index:
+            index[span["name"]] = len(frames)
+            frames.append({"name": span["name"]})
+        threads.setdefault((span["pid"], span["tid"]), []).append(span)
+    origin = min(span["start"] for span in spans) if spans else 0
+    profiles = []
+    for (pid, tid), thread_spans in sorted(threads.items()):
+        events = []
+        for span in thread_spans:
+            start = (span["start"] - origin) * 1e6
+            end = (span["end"] - origin) * 1e6
+            #at the same instant closes go first, inner spans close before outer ones and open after them
+            events.append(((start, 1, -end), {"type": "O", "frame": index[span["name"]], "at": start}))
+            events.append(((end, 0, -start), {"type": "C", "frame": index[span["name"]], "at": end}))
+        events.sort(key=lambda event: event[0])
+        profiles.append({
+            "type": "evented",
+            "name": "%s %d/%d" % (name, pid, tid),
+            "unit": "microseconds",
+            "startValue": events[0][1]["at"],
+            "endValue": events[-1][1]["at"],
+            "events": [event for _, event in events],
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "PythonSelenium Tracer",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def write_trace(spans, name="selenium", path=None):
+    #writes both formats, returns the paths
+    if path is None:
+        path = os.path.join(REPORTS, "trace-%s-%s.json" % (name, time.strftime("%Y%m%d-%H%M%S")))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(chrome_trace(spans), writer)
+    speedscope_path = path[:-len(".json")] + ".speedscope.json" if path.endswith(".json") else path + ".speedscope.json"
+    with open(speedscope_path, "w") as writer:
+        json.dump(speedscope(spans, name), writer)
+    return path, speedscope_path
+
+
+def print_summary(spans, top=10):
+    #where the time went: commands grouped by name, slowest total first
+    totals = {}
+    for span in spans:
+        if span["category"] != "command":
+            continue
+        total = totals.setdefault(span["name"], [0, 0.0])
+        total[0] += 1
+        total[1] += span["end"] - span["start"]
+    print("%d spans, slowest commands:" % len(spans))
+    for name, (count, seconds) in sorted(totals.items(), key=lambda t: t[1][1], reverse=True)[:top]:
+        print("  %9.1fms x%-3d %s" % (seconds * 1000, count, name))
+
+
+tracer = Tracer()
+
+
+def attach(driver):
+    return tracer.attach(driver)
+
+
+def step(name, **args):
+    return tracer.span(name, "step", **args)
+
+
+def _trace_at_exit(start, script):
+    if tracer.spans:
+        spans = tracer.drain()
+        spans.append({"name": script, "category": "script", "start": start, "end": tracer.now(), "depth": 0,
+                      "pid": os.getpid(), "tid": threading.get_ident(), "args": {}})
+        print_summary(spans)
+        print("trace: %s, %s" % write_trace(spans, script))
+
+
+if ENABLED:
+    atexit.register(_trace_at_exit, tracer.now(), os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0])
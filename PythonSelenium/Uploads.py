@@ -0,0 +1,156 @@
+import base64
+import hashlib
+import http.client
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.file_detector import UselessFileDetector
+
+import JsLocators
+
+#file uploads for the scripts
+#  Uploads.upload(driver, PracticeFormPage.picture, "Upload.jpeg")
+#assets are looked up relative to this folder (then the project root), never by absolute machine paths.
+#A local browser gets the path as is. A remote browser (grid node) needs the file on its own disk:
+#it is staged once per session with the /se/file command and the staged path is reused for every later
+#upload of the same content (sha256), which matters for pooled sessions that run many flows.
+#The zip + base64 body selenium would build in memory is written to a temporary file and streamed to
+#the node in chunks, so large files do not have to fit in memory.
+#  Uploads.prestage(pool_drivers, ["Upload.jpeg"])   -> stage on several sessions in parallel up front
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOTS = [HERE, os.path.dirname(HERE)]
+CHUNK = 1024 * 1024
+_lock = threading.Lock()
+_hashes = {}
+
+
+def asset(name):
+    #absolute path of a project asset
+    if os.path.isabs(name) and os.path.isfile(name):
+        return name
+    tried = []
+    for root in ROOTS:
+        path = os.path.join(root, name)
+        if os.path.isfile(path):
+            return path
+        tried.append(path)
+    raise FileNotFoundError("asset %s not found, looked in %s" % (name, ", ".join(tried)))
+
+
+def content_hash(path):
+    #cached per (path, size, mtime), hashing a large file once per process is enough
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime)
+    with _lock:
+        if key in _hashes:
+            return _hashes[key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as reader:
+        for chunk in iter(lambda: reader.read(CHUNK), b""):
+            digest.update(chunk)
+    with _lock:
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def _staged(driver):
+    #sha256 -> path on the node, per session
+    with _lock:
+        if not hasattr(driver, "_staged_uploads"):
+            driver._staged_uploads = {}
+            driver._staging = {}
+        return driver._staged_uploads
+
+
+def _encoded_body(path):
+    #{"file": "<base64 of a zip with the file>"} written to a temporary file, returns (file, size)
+    with tempfile.TemporaryFile() as archive:
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zipped:
+            zipped.write(path, os.path.basename(path))
+        archive.seek(0)
+        body = tempfile.TemporaryFile()
+        body.write(b'{"file": "')
+        #multiples of 3 bytes encode without padding in the middle of the stream
+        for chunk in iter(lambda: archive.read(CHUNK - CHUNK % 3), b""):
+            body.write(base64.b64encode(chunk))
+        body.write(b'"}')
+    size = body.tell()
+    body.seek(0)
+    return body, size
+
+
+def _stream(driver, path):
+    #POST /session/<id>/se/file with a streamed body
+    executor = driver.command_executor
+    address = executor.client_config.remote_server_addr.rstrip("/")
+    parsed = urlparse(address)
+    headers = executor.get_remote_connection_headers(parsed)
+    body, size = _encoded_body(path)
+    headers["Content-Length"] = str(size)
+    connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    connection = connection_class(parsed.hostname, parsed.port, timeout=executor.client_config.timeout)
+    try:
+        connection.request("POST", "%s/session/%s/se/file" % (parsed.path, driver.session_id),
+                           body=iter(lambda: body.read(CHUNK), b""), headers=headers)
+        response = connection.getresponse()
+        payload = json.loads(response.read() or b"{}")
+    finally:
+        connection.close()
+        body.close()
+    value = payload.get("value")
+    if response.status >= 400 or (isinstance(value, dict) and "error" in value):
+        message = value.get("message") if isinstance(value, dict) else response.reason
+        raise WebDriverException("upload of %s failed: %s" % (path, message))
+    return value
+
+
+def stage(driver, name):
+    #path of the asset as the browser sees it
+    path = asset(name)
+    if not getattr(driver, "_is_remote", False):
+        return path
+    staged = _staged(driver)
+    digest = content_hash(path)
+    with _lock:
+        if digest in staged:
+            return staged[digest]
+        #two threads staging the same file on one session: the second waits for the first
+        event = driver._staging.get(digest)
+        owner = event is None
+        if owner:
+            event = driver._staging[digest] = threading.Event()
+    if not owner:
+        event.wait()
+        if digest in staged:
+            return staged[digest]
+        return stage(driver, name)
+    try:
+        staged[digest] = _stream(driver, path)
+    finally:
+        with _lock:
+            driver._staging.pop(digest, None)
+        event.set()
+    return staged[digest]
+
+
+def upload(driver, target, name):
+    #send_keys of the staged path; the file detector is switched off so selenium does not upload again
+    path = stage(driver, name)
+    element = driver.find_element(*JsLocators.locator(target)) if not hasattr(target, "send_keys") else target
+    with driver.file_detector_context(UselessFileDetector):
+        element.send_keys(path)
+    return path
+
+
+def prestage(drivers, names, workers=4):
+    #stage every asset on every session, in parallel; returns {(session id, name): path}
+    jobs = [(driver, name) for driver in drivers for name in names]
+    with ThreadPoolExecutor(max(1, min(workers, len(jobs)))) as pool:
+        paths = list(pool.map(lambda job: stage(*job), jobs))
+    return {(driver.session_id, name): path for (driver, name), path in zip(jobs, paths)}
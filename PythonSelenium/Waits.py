@@ -0,0 +1,108 @@
+import os
+import time
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import Browser
+
+#shared wait engine for the scripts: wait on conditions instead of fixed sleeps
+#WAIT_TIMEOUT -> default seconds for a condition to become true
+#HOLD_OPEN    -> keep the browser open N seconds at the end (debugging only, 0/unset in production runs)
+DEFAULT_TIMEOUT = float(os.environ.get("WAIT_TIMEOUT", "10"))
+IGNORED = (NoSuchElementException, StaleElementReferenceException)
+
+
+class AdaptiveWait(WebDriverWait):
+    #WebDriverWait with adaptive polling: poll quickly at first (most conditions are
+    #already true or become true within a few ms) then back off up to max_poll
+    def __init__(self, driver, timeout=None, poll=0.05, max_poll=0.5, backoff=1.5):
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+        WebDriverWait.__init__(self, driver, timeout, poll_frequency=poll, ignored_exceptions=IGNORED)
+        self.driver = driver
+        self.timeout = timeout
+        self.poll = poll
+        self.max_poll = max_poll
+        self.backoff = backoff
+
+    def until(self, method, message=""):
+        return self._poll_until(method, message, True)
+
+    def until_not(self, method, message=""):
+        return self._poll_until(method, message, False)
+
+    def _poll_until(self, method, message, wanted):
+        end = time.monotonic() + self.timeout
+        delay = self.poll
+        screen = None
+        stacktrace = None
+        while True:
+            try:
+                value = method(self.driver)
+                if bool(value) == wanted:
+                    return value if wanted else True
+            except IGNORED as e:
+                if not wanted:
+                    return True
+                screen = getattr(e, "screen", None)
+                stacktrace = getattr(e, "stacktrace", None)
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay = min(delay * self.backoff, self.max_poll)
+        raise TimeoutException(message, screen, stacktrace)
+
+
+def wait_until(driver, condition, timeout=None, message=""):
+    return AdaptiveWait(driver, timeout).until(condition, message)
+
+
+def wait_until_not(driver, condition, timeout=None, message=""):
+    return AdaptiveWait(driver, timeout).until_not(condition, message)
+
+
+def present(driver, by, value, timeout=None):
+    return wait_until(driver, EC.presence_of_element_located((by, value)), timeout,
+                      "element not present: %s=%s" % (by, value))
+
+
+def visible(driver, by, value, timeout=None):
+    return wait_until(driver, EC.visibility_of_element_located((by, value)), timeout,
+                      "element not visible: %s=%s" % (by, value))
+
+
+def all_visible(driver, by, value, timeout=None):
+    return wait_until(driver, EC.visibility_of_all_elements_located((by, value)), timeout,
+                      "elements not visible: %s=%s" % (by, value))
+
+
+def clickable(driver, by, value, timeout=None):
+    return wait_until(driver, EC.element_to_be_clickable((by, value)), timeout,
+                      "element not clickable: %s=%s" % (by, value))
+
+
+def text_contains(driver, by, value, text, timeout=None):
+    return wait_until(driver, EC.text_to_be_present_in_element((by, value), text), timeout,
+                      "%r not found in %s=%s" % (text, by, value))
+
+
+def page_loaded(driver, timeout=None):
+    return wait_until(driver, lambda d: d.execute_script("return document.readyState") == "complete",
+                      timeout, "page did not finish loading")
+
+
+def hold_open(driver, seconds=None):
+    #the old time.sleep(500) tail, only when explicitly asked for
+    if seconds is None:
+        seconds = float(os.environ.get("HOLD_OPEN", "0") or 0)
+    if seconds > 0:
+        print("HOLD_OPEN: keeping browser open for", seconds, "seconds")
+        time.sleep(seconds)
+
+
+def finish(driver):
+    hold_open(driver)
+    Browser.release(driver)
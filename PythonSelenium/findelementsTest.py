@@ -1,14 +1,12 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.common.by import By
-driver= webdriver.Chrome()
-driver.get("https://rahulshettyacademy.com/dropdownsPractise/")
-driver.find_element(By.ID,'autosuggest').send_keys("ind")
-
-
-
-
-
-time.sleep(500)
\ No newline at end of file
+import Browser
+import Waits
+from Autosuggest import Autosuggest
+from PageObjects import DropdownsPractisePage
+driver= Browser.get_driver()
+DropdownsPractisePage(driver).open()
+#one call types "ind", waits for the list to settle and returns every suggestion text
+country= Autosuggest(driver, DropdownsPractisePage.autosuggest, DropdownsPractisePage.suggestions)
+suggestions= country.type("ind")
+print(len(suggestions))
+country.choose("India")
+Waits.finish(driver)
@@ -0,0 +1,45 @@
+// behaviour of the fixture pages in a real browser; MockWebDriver.py does the same for the
+// data-* attributes below without running this file
+//   form[data-on-submit-show=css]        submit shows the hidden element(s) instead of navigating
+//   input[data-suggest="a|b"][data-suggest-list=css]   typing fills the suggestion list
+//   select[data-child=css] option[data-children="a|b"] choosing an option fills the child select
+document.addEventListener('submit', function (event) {
+    var target = event.target.getAttribute('data-on-submit-show');
+    if (target === null) return;
+    event.preventDefault();
+    document.querySelectorAll(target).forEach(function (e) { e.removeAttribute('hidden'); });
+});
+document.addEventListener('input', function (event) {
+    var input = event.target;
+    if (!input.hasAttribute || !input.hasAttribute('data-suggest')) return;
+    var list = document.querySelector(input.getAttribute('data-suggest-list'));
+    var query = input.value.toLowerCase();
+    list.innerHTML = '';
+    input.getAttribute('data-suggest').split('|').forEach(function (option) {
+        if (!query || option.toLowerCase().indexOf(query) === -1) return;
+        var item = document.createElement('li');
+        item.className = 'ui-menu-item';
+        var link = document.createElement('a');
+        link.className = 'ui-corner-all';
+        link.textContent = option;
+        link.addEventListener('click', function () { input.value = option; list.setAttribute('hidden', ''); });
+        item.appendChild(link);
+        list.appendChild(item);
+    });
+    if (list.children.length) list.removeAttribute('hidden'); else list.setAttribute('hidden', '');
+});
+document.addEventListener('change', function (event) {
+    var select = event.target;
+    if (!select.hasAttribute || !select.hasAttribute('data-child')) return;
+    var child = document.querySelector(select.getAttribute('data-child'));
+    var option = select.options[select.selectedIndex];
+    var first = child.options[0];
+    child.innerHTML = '';
+    if (first && first.value === '') child.appendChild(first);
+    (option.getAttribute('data-children') || '').split('|').filter(Boolean).forEach(function (name) {
+        var o = document.createElement('option');
+        o.value = name;
+        o.textContent = name;
+        child.appendChild(o);
+    });
+});